@@ -0,0 +1,6 @@
+"""Benchmarks for the trend tracker pipeline.
+
+Run ``python -m benchmarks.run --help`` to time every stage on synthetic
+data, and ``python -m benchmarks.compare`` to check two result files for
+regressions.
+"""
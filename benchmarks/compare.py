@@ -0,0 +1,65 @@
+"""Compare two benchmark result files and flag regressions.
+
+Example::
+
+    python -m benchmarks.compare baseline.json bench.json --tolerance 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+def compare(
+    baseline: Dict[str, object], current: Dict[str, object], *, tolerance: float = 0.2
+) -> Tuple[List[str], List[str]]:
+    """Return report lines and the stages whose median grew by more than ``tolerance``."""
+
+    lines = [f"{'stage':<14} {'baseline ms':>12} {'current ms':>12} {'change':>8}"]
+    regressions: List[str] = []
+    old_stages = baseline.get("stages", {})
+    new_stages = current.get("stages", {})
+    for name in sorted(set(old_stages) | set(new_stages)):
+        old, new = old_stages.get(name), new_stages.get(name)
+        if old is None or new is None:
+            lines.append(f"{name:<14} {'-' if old is None else _ms(old):>12} {'-' if new is None else _ms(new):>12}")
+            continue
+        change = new["median"] / old["median"] - 1 if old["median"] else 0.0
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        lines.append(f"{name:<14} {_ms(old):>12} {_ms(new):>12} {change:>+8.1%}{flag}")
+    if baseline.get("parameters") != current.get("parameters"):
+        lines.append("warning: the runs used different parameters")
+    return lines, regressions
+
+
+def _ms(stage: Dict[str, float]) -> str:
+    return f"{stage['median'] * 1000:.1f}"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("current", type=Path)
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Allowed slowdown of a stage median before failing (0.2 = 20%%)"
+    )
+    args = parser.parse_args(argv)
+    lines, regressions = compare(
+        json.loads(args.baseline.read_text(encoding="utf-8")),
+        json.loads(args.current.read_text(encoding="utf-8")),
+        tolerance=args.tolerance,
+    )
+    print("\n".join(lines))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Deterministic synthetic payloads shaped like the TikTok and Instagram APIs."""
+
+from __future__ import annotations
+
+import math
+import random
+from array import array
+from datetime import datetime, timezone
+from itertools import accumulate
+from typing import Dict, List, Sequence
+
+
+PLATFORMS = ("tiktok", "instagram")
+DEFAULT_START = datetime(2024, 5, 1, tzinfo=timezone.utc).timestamp()
+
+_WORDS = (
+    "cat dog vibe prank dance fail remix slow zoom challenge duet ai voice "
+    "glow up office chaos gym tutorial recipe sound trend edit transition "
+    "meme template reaction unboxing storytime pov skit"
+).split()
+
+
+class SyntheticDataset:
+    """Memes of one platform whose counters grow from poll to poll.
+
+    Every meme follows a logistic view curve with its own peak, steepness and
+    midpoint, and derives likes, comments and shares from per-meme rates, so
+    counters only ever grow. Authors and tags follow Zipf-like distributions:
+    a few creators and hashtags account for most memes. ``churn`` is the
+    share of memes missing from any given poll. ``history_length`` earlier
+    snapshots, ``poll_interval`` apart, are embedded in the first poll so the
+    store starts out with long histories.
+
+    The same arguments always produce the same payloads. Per-meme parameters
+    are kept in typed arrays, so a million memes fit comfortably in memory.
+    """
+
+    def __init__(
+        self,
+        platform: str,
+        count: int,
+        *,
+        seed: int = 0,
+        start: float = DEFAULT_START,
+        poll_interval: float = 900.0,
+        history_length: int = 0,
+        churn: float = 0.0,
+    ) -> None:
+        if platform not in PLATFORMS:
+            raise ValueError(f"Unsupported platform: {platform}")
+        self.platform = platform
+        self.count = count
+        self.start = start
+        self.poll_interval = poll_interval
+        self.history_length = history_length
+        self.churn = churn
+        rng = random.Random(f"{platform}:{seed}")
+
+        authors = [f"{platform}_creator_{index}" for index in range(max(count // 20, 10))]
+        tags = [f"#{rng.choice(_WORDS)}{index}" for index in range(min(max(count // 5, 50), 5000))]
+        self._authors = authors
+        self._tags = tags
+        self._author_ids = array("i", rng.choices(range(len(authors)), cum_weights=_zipf(len(authors), 1.1), k=count))
+        tag_weights = _zipf(len(tags), 1.2)
+        tag_counts = rng.choices(range(7), weights=(5, 20, 25, 20, 15, 10, 5), k=count)
+        self._tag_offsets = array("i", accumulate(tag_counts, initial=0))
+        self._tag_ids = array("i", rng.choices(range(len(tags)), cum_weights=tag_weights, k=self._tag_offsets[-1]))
+
+        span = (history_length + 1) * poll_interval
+        self._created = array("d", (start - span - rng.uniform(0, 72 * 3600) for _ in range(count)))
+        self._peaks = array("d", (rng.lognormvariate(11.5, 1.6) for _ in range(count)))
+        self._steepness = array("d", (rng.uniform(0.05, 0.8) for _ in range(count)))
+        self._midpoints = array("d", (rng.uniform(2, 96) for _ in range(count)))
+        self._like_rates = array("d", (rng.uniform(0.02, 0.15) for _ in range(count)))
+        self._words = [rng.sample(_WORDS, 3) for _ in range(min(count, 997))]
+
+    def poll_time(self, poll: int) -> float:
+        return self.start + poll * self.poll_interval
+
+    def poll(self, poll: int) -> List[Dict[str, object]]:
+        """Raw items returned by the API at poll number ``poll``."""
+
+        moment = self.poll_time(poll)
+        items: List[Dict[str, object]] = []
+        for index in range(self.count):
+            if self.churn and _unit(index, poll) < self.churn:
+                continue
+            item = self._item(index, moment)
+            if poll == 0 and self.history_length:
+                item["history"] = [
+                    _snapshot(moment - step * self.poll_interval, self._counters(index, moment - step * self.poll_interval))
+                    for step in range(self.history_length, 0, -1)
+                ]
+            items.append(item)
+        return items
+
+    def _counters(self, index: int, moment: float) -> Sequence[int]:
+        age = (moment - self._created[index]) / 3600
+        exponent = -self._steepness[index] * (age - self._midpoints[index])
+        views = int(self._peaks[index] / (1 + math.exp(min(exponent, 700))))
+        likes = int(views * self._like_rates[index])
+        return views, likes, likes // 12, likes // 8
+
+    def _item(self, index: int, moment: float) -> Dict[str, object]:
+        views, likes, comments, shares = self._counters(index, moment)
+        author = self._authors[self._author_ids[index]]
+        tag_ids = self._tag_ids[self._tag_offsets[index] : self._tag_offsets[index + 1]]
+        tags = list(dict.fromkeys(self._tags[tag] for tag in tag_ids))
+        text = " ".join(self._words[index % len(self._words)])
+        external_id = f"{self.platform[:2]}{index:07d}"
+        if self.platform == "tiktok":
+            return {
+                "id": external_id,
+                "desc": f"{text} {' '.join(tags)}",
+                "author": {"uniqueId": author, "nickname": author.title()},
+                "createTime": int(self._created[index]),
+                # Observation time, so consecutive polls form a history.
+                "timestamp": int(moment),
+                "playCount": views,
+                "diggCount": likes,
+                "commentCount": comments,
+                "shareCount": shares,
+                "video_url": f"https://www.tiktok.com/@{author}/video/{external_id}",
+                "challenges": tags,
+                "music": {"title": f"original sound - {author}"},
+            }
+        return {
+            "id": external_id,
+            "caption": f"{text} {' '.join(tags)}",
+            "username": author,
+            "timestamp": datetime.fromtimestamp(moment, timezone.utc).isoformat().replace("+00:00", "Z"),
+            "view_count": views,
+            "like_count": likes,
+            "comment_count": comments,
+            "share_count": shares,
+            "permalink": f"https://www.instagram.com/reel/{external_id}",
+            "hashtags": tags,
+            "language": "en",
+        }
+
+
+def build_datasets(records: int, **options: object) -> List[SyntheticDataset]:
+    """Split ``records`` evenly across the supported platforms."""
+
+    share, remainder = divmod(records, len(PLATFORMS))
+    return [
+        SyntheticDataset(platform, share + (1 if position < remainder else 0), **options)
+        for position, platform in enumerate(PLATFORMS)
+    ]
+
+
+def _zipf(size: int, exponent: float) -> List[float]:
+    return list(accumulate(1 / (rank**exponent) for rank in range(1, size + 1)))
+
+
+def _unit(index: int, poll: int) -> float:
+    """Cheap deterministic hash of ``(index, poll)`` onto ``[0, 1)``."""
+
+    return ((index * 2654435761 + poll * 40503 + 12345) & 0xFFFFFFFF) / 2**32
+
+
+def _snapshot(moment: float, counters: Sequence[int]) -> Dict[str, object]:
+    views, likes, comments, shares = counters
+    return {
+        "timestamp": datetime.fromtimestamp(moment, timezone.utc).isoformat(),
+        "views": views,
+        "likes": likes,
+        "comments": comments,
+        "shares": shares,
+    }
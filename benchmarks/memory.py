@@ -0,0 +1,140 @@
+"""Measure the memory a store retains per tracked meme.
+
+Example::
+
+    python -m benchmarks.memory --records 50000 --polls 5 --output memory.json
+    python -m benchmarks.compare baseline-memory.json memory.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.generator import build_datasets
+from benchmarks.run import RESULT_VERSION, StageTimer, _max_rss
+from trend_tracker.config import InstagramConfig, TikTokConfig, TrackerConfig
+from trend_tracker.data_models import TrendRecord
+from trend_tracker.data_sources.schema import SchemaMapper
+from trend_tracker.storage import build_store
+
+
+def run_benchmark(args: argparse.Namespace, state_dir: Path) -> Dict[str, object]:
+    datasets = build_datasets(
+        args.records,
+        seed=args.seed,
+        poll_interval=args.poll_interval,
+        history_length=args.history,
+        churn=args.churn,
+    )
+    config = TrackerConfig(
+        tiktok=TikTokConfig(),
+        instagram=InstagramConfig(),
+        storage_backend=args.store,
+        history_format=args.history_format,
+        max_extra_fields=args.max_extra_fields,
+    )
+    mappers = {dataset.platform: SchemaMapper(dataset.platform) for dataset in datasets}
+    timer = StageTimer()
+    tracemalloc.start()
+    store = build_store(config, str(state_dir / "state.json"))
+    store.count()
+    gc.collect()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for poll in range(args.polls):
+        for dataset in datasets:
+            # A round trip through JSON gives every poll its own strings, as an HTTP response would.
+            payloads = json.loads(json.dumps(dataset.poll(poll)))
+            if args.from_dict:
+                records = [TrendRecord.from_dict(payload, dataset.platform) for payload in payloads]
+            else:
+                records = mappers[dataset.platform].map(payloads)
+            del payloads
+            with timer.stage("store_update"):
+                store.update(records)
+            del records
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    tracked = store.count()
+    store.close()
+    return {
+        "version": RESULT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+        },
+        "parameters": {
+            "records": args.records,
+            "polls": args.polls,
+            "history": args.history,
+            "churn": args.churn,
+            "seed": args.seed,
+            "poll_interval": args.poll_interval,
+            "store": args.store,
+            "history_format": args.history_format,
+            "from_dict": args.from_dict,
+            "max_extra_fields": args.max_extra_fields,
+        },
+        "memory": {
+            "tracked_memes": tracked,
+            "retained_bytes": retained,
+            "bytes_per_meme": retained / tracked if tracked else 0.0,
+        },
+        "stages": timer.summary(),
+        "max_rss_bytes": _max_rss(),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure memory retained per tracked meme")
+    parser.add_argument("--records", type=int, default=20_000, help="Memes across both platforms")
+    parser.add_argument("--polls", type=int, default=5, help="Polls to feed through the store")
+    parser.add_argument("--history", type=int, default=24, help="Snapshots of history each meme starts with")
+    parser.add_argument("--churn", type=float, default=0.1, help="Share of memes missing from each poll")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--poll-interval", type=float, default=900.0, help="Seconds between polls")
+    parser.add_argument("--store", choices=("json", "log"), default="log")
+    parser.add_argument("--history-format", choices=("json", "columnar", "delta"), default="json")
+    parser.add_argument(
+        "--from-dict",
+        action="store_true",
+        help="Normalize with TrendRecord.from_dict, which keeps unmapped payload fields in extra",
+    )
+    parser.add_argument("--max-extra-fields", type=int, default=0, help="Unmapped payload fields kept per record")
+    parser.add_argument("--output", type=Path, help="Write the JSON results here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="trend-memory-") as directory:
+        results = run_benchmark(args, Path(directory))
+    payload = json.dumps(results, indent=2)
+    if args.output is None:
+        print(payload)
+    else:
+        args.output.write_text(payload + "\n", encoding="utf-8")
+    memory = results["memory"]
+    print(
+        f"{memory['tracked_memes']} memes, {memory['bytes_per_meme']:,.0f} bytes per meme retained",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
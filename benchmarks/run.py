@@ -0,0 +1,258 @@
+"""Time every stage of the tracker pipeline on synthetic data.
+
+Example::
+
+    python -m benchmarks.run --records 100000 --polls 5 --history 48 --output bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.generator import SyntheticDataset, build_datasets
+from trend_tracker.analyzer import compute_metrics
+from trend_tracker.compat import numpy_available
+from trend_tracker.config import InstagramConfig, TikTokConfig, TrackerConfig
+from trend_tracker.data_models import TrendRecord
+from trend_tracker.data_sources.base import TrendDataSource
+from trend_tracker.data_sources.schema import SchemaMapper
+from trend_tracker.forecaster import compute_forecasts
+from trend_tracker.ranking import TopKRanking
+from trend_tracker.storage import build_store
+from trend_tracker.tracker import TrackerResult, TrendTracker
+
+
+RESULT_VERSION = 1
+
+
+class SyntheticSource(TrendDataSource):
+    """Serve one pre-generated poll, mapped like an HTTP source would."""
+
+    def __init__(self, dataset: SyntheticDataset, payloads: List[Dict[str, object]]) -> None:
+        self.platform = dataset.platform
+        self.name = f"synthetic-{dataset.platform}"
+        self.payloads = payloads
+
+    def fetch_latest(self) -> List[TrendRecord]:
+        return SchemaMapper(self.platform).map(self.payloads)
+
+
+class StageTimer:
+    """Collect wall-clock seconds, and optionally traced peak memory, per stage."""
+
+    def __init__(self, *, trace_memory: bool = False) -> None:
+        self.trace_memory = trace_memory
+        self.seconds: Dict[str, List[float]] = {}
+        self.peaks: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        gc.collect()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds.setdefault(name, []).append(time.perf_counter() - started)
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1] - baseline
+                self.peaks[name] = max(self.peaks.get(name, 0), peak)
+
+    def summary(self) -> Dict[str, Dict[str, object]]:
+        stages: Dict[str, Dict[str, object]] = {}
+        for name, runs in self.seconds.items():
+            stages[name] = {
+                "runs": runs,
+                "min": min(runs),
+                "median": statistics.median(runs),
+                "total": sum(runs),
+            }
+            if name in self.peaks:
+                stages[name]["peak_bytes"] = self.peaks[name]
+        return stages
+
+
+def run_benchmark(args: argparse.Namespace, state_dir: Path) -> Dict[str, object]:
+    datasets = build_datasets(
+        args.records,
+        seed=args.seed,
+        poll_interval=args.poll_interval,
+        history_length=args.history,
+        churn=args.churn,
+    )
+    config = TrackerConfig(
+        tiktok=TikTokConfig(),
+        instagram=InstagramConfig(),
+        storage_backend=args.store,
+        history_format=args.history_format,
+        history_compression=args.history_compression,
+        forecast_model=args.forecast_model,
+        ranking_size=max(args.limit, 50),
+    )
+    state_path = str(state_dir / ("state.db" if args.store == "sqlite" else "state.json"))
+    timer = StageTimer(trace_memory=args.trace_memory)
+    if args.trace_memory:
+        tracemalloc.start()
+
+    store = build_store(config, state_path)
+    tracker = TrendTracker(config, sources=[], storage=store)
+    mappers = {dataset.platform: SchemaMapper(dataset.platform) for dataset in datasets}
+    merged: List[TrendRecord] = []
+    for poll in range(args.polls):
+        payloads = {dataset.platform: dataset.poll(poll) for dataset in datasets}
+        as_of = datetime.fromtimestamp(datasets[0].poll_time(poll), timezone.utc)
+        with timer.stage("normalize"):
+            records = [record for name, items in payloads.items() for record in mappers[name].map(items)]
+        del payloads
+        with timer.stage("store_update"):
+            merged = store.update(records)
+        del records
+        with timer.stage("metrics"):
+            metrics = compute_metrics(merged, as_of=as_of)
+        with timer.stage("forecast"):
+            if store.holt_index is not None:
+                forecasts = list(store.holt_index.lazy(merged))
+            else:
+                forecasts = compute_forecasts(merged)
+        with timer.stage("rank"):
+            ranking = TopKRanking(config.ranking_size)
+            ranking.reset(metrics)
+            ranked = ranking.top()
+        with timer.stage("render_report"):
+            result = TrackerResult(fetched=merged, metrics=metrics, forecasts=forecasts, ranked=ranked)
+            tracker.render_report(result, limit=args.limit)
+        del metrics, forecasts, result
+
+    history_sizes = [len(record.history) for record in merged]
+    with timer.stage("store_save"):
+        store.save()
+    tracker.close()
+    # The state file plus its history archive or log, as the next start reads them.
+    state_bytes = sum(path.stat().st_size for path in state_dir.glob(Path(state_path).name + "*"))
+    del merged, store, tracker
+    with timer.stage("store_load"):
+        store = build_store(config, state_path)
+        loaded = len(store.records())
+
+    poll = args.polls
+    sources = [SyntheticSource(dataset, dataset.poll(poll)) for dataset in datasets]
+    tracker = TrendTracker(config, sources=sources, storage=store)
+    with timer.stage("run_once"):
+        tracker.run_once()
+    tracker.close()
+
+    peak_traced = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+    if args.trace_memory:
+        tracemalloc.stop()
+    return {
+        "version": RESULT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "numpy": numpy_available(),
+        },
+        "parameters": {
+            "records": args.records,
+            "polls": args.polls,
+            "history": args.history,
+            "churn": args.churn,
+            "seed": args.seed,
+            "poll_interval": args.poll_interval,
+            "store": args.store,
+            "history_format": args.history_format,
+            "history_compression": args.history_compression,
+            "forecast_model": args.forecast_model,
+            "limit": args.limit,
+            "trace_memory": args.trace_memory,
+        },
+        "dataset": {
+            "stored_records": loaded,
+            "mean_history": statistics.fmean(history_sizes) if history_sizes else 0.0,
+            "max_history": max(history_sizes, default=0),
+            "state_bytes": state_bytes,
+        },
+        "stages": timer.summary(),
+        "peak_traced_bytes": peak_traced,
+        "max_rss_bytes": _max_rss(),
+    }
+
+
+def _max_rss() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the trend tracker pipeline on synthetic data")
+    parser.add_argument("--records", type=int, default=10_000, help="Memes across both platforms (1k to 1M)")
+    parser.add_argument("--polls", type=int, default=3, help="Polls to feed through the store")
+    parser.add_argument("--history", type=int, default=24, help="Snapshots of history each meme starts with")
+    parser.add_argument("--churn", type=float, default=0.1, help="Share of memes missing from each poll")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--poll-interval", type=float, default=900.0, help="Seconds between polls")
+    parser.add_argument("--store", choices=("json", "log", "sqlite"), default="json")
+    parser.add_argument("--history-format", choices=("json", "columnar", "delta"), default="json")
+    parser.add_argument(
+        "--history-compression", action="store_true", help="zlib-compress the blocks of a delta history archive"
+    )
+    parser.add_argument(
+        "--forecast-model",
+        choices=("linear", "holt"),
+        default="linear",
+        help="Forecast every meme by refitting its history or from the store's smoothed state",
+    )
+    parser.add_argument("--limit", type=int, default=10, help="Memes in the rendered report")
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Record peak memory per stage with tracemalloc (slows every stage down)",
+    )
+    parser.add_argument("--state-dir", type=Path, help="Keep the store here instead of a temporary directory")
+    parser.add_argument("--output", type=Path, help="Write the JSON results here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.state_dir is not None:
+        args.state_dir.mkdir(parents=True, exist_ok=True)
+        results = run_benchmark(args, args.state_dir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="trend-bench-") as directory:
+            results = run_benchmark(args, Path(directory))
+    payload = json.dumps(results, indent=2)
+    if args.output is None:
+        print(payload)
+    else:
+        args.output.write_text(payload + "\n", encoding="utf-8")
+        for name, stage in results["stages"].items():
+            print(f"{name:<14} median {stage['median'] * 1000:10.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
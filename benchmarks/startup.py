@@ -0,0 +1,88 @@
+"""Measure CLI cold-start time, each command in a fresh interpreter.
+
+Example::
+
+    python -m benchmarks.startup --runs 10 --output startup.json
+    python -m benchmarks.compare baseline-startup.json startup.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.run import RESULT_VERSION, StageTimer
+
+
+CLI = str(PROJECT_ROOT / "scripts" / "run_tracker.py")
+
+
+def commands(state: Path) -> Dict[str, List[str]]:
+    """Named commands to time; ``interpreter`` is the floor every other one pays."""
+
+    return {
+        "interpreter": [sys.executable, "-c", "pass"],
+        "import_tracker": [sys.executable, "-c", "import trend_tracker.tracker"],
+        "report_only": [sys.executable, CLI, "--report-only", "--state", str(state)],
+        "help": [sys.executable, CLI, "--help"],
+        "sample_run": [sys.executable, CLI, "--sample-data", "--state", str(state)],
+    }
+
+
+def run_benchmark(args: argparse.Namespace, state_dir: Path) -> Dict[str, object]:
+    state = state_dir / "tracker_state.json"
+    # Leaves a state and a cached report behind for ``report_only``.
+    subprocess.run(commands(state)["sample_run"], cwd=PROJECT_ROOT, check=True, capture_output=True)
+    timer = StageTimer()
+    for _ in range(args.runs):
+        for name, command in commands(state).items():
+            started = time.perf_counter()
+            subprocess.run(command, cwd=PROJECT_ROOT, check=True, capture_output=True)
+            timer.seconds.setdefault(name, []).append(time.perf_counter() - started)
+    return {
+        "version": RESULT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+        },
+        "parameters": {"runs": args.runs},
+        "stages": timer.summary(),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the tracker CLI")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per command")
+    parser.add_argument("--output", type=Path, help="Write the JSON results here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="trend-startup-") as directory:
+        results = run_benchmark(args, Path(directory))
+    payload = json.dumps(results, indent=2)
+    if args.output is None:
+        print(payload)
+    else:
+        args.output.write_text(payload + "\n", encoding="utf-8")
+    for name, stage in results["stages"].items():
+        print(f"{name:<14} median {stage['median'] * 1000:10.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,15 +6,17 @@ import argparse
 import logging
 import sys
 from pathlib import Path
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from trend_tracker import TrendTracker
-from trend_tracker.config import load_config
-from trend_tracker.data_sources.http_source import LocalJSONSource
-from trend_tracker.storage import TrendStore
+from trend_tracker.summary import load_summary, render_summary, summary_path
+
+if TYPE_CHECKING:
+    from trend_tracker.tracker import TrackerResult, TrendTracker
 
 
 def parse_args() -> argparse.Namespace:
@@ -22,26 +24,160 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--sample-data", action="store_true", help="Use bundled sample data instead of hitting live APIs")
     parser.add_argument("--limit", type=int, default=5, help="Number of items to display in the report")
     parser.add_argument("--state", type=Path, default=Path("tracker_state.json"), help="Path for persisted tracker state")
+    parser.add_argument(
+        "--store",
+        choices=("json", "log", "sqlite"),
+        help="Storage backend: rewrite the state file (json), append to a log (log) or use SQLite (sqlite)",
+    )
+    parser.add_argument(
+        "--history-format",
+        choices=("json", "columnar", "delta"),
+        help="Persist snapshot history inline as JSON, in a memory-mapped binary archive or delta-encoded",
+    )
+    parser.add_argument(
+        "--forecast-model",
+        choices=("linear", "holt"),
+        help="Project views with a line fitted to each meme's history or with damped-trend smoothing",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running: poll every TREND_TRACKER_INTERVAL seconds and refresh fast-moving memes in between",
+    )
+    parser.add_argument(
+        "--serve",
+        type=int,
+        metavar="PORT",
+        help="Serve the latest poll over HTTP on this port, on TREND_TRACKER_API_HOST; implies --daemon",
+    )
+    parser.add_argument("--metrics", type=Path, help="Write per-stage timings and counters here in Prometheus text format")
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        help="Sample the pipeline's stacks and write them here in collapsed flamegraph format",
+    )
+    parser.add_argument(
+        "--report-only",
+        action="store_true",
+        help="Print the report cached by the last run for --state, with that run's --limit, without fetching anything",
+    )
+    parser.add_argument(
+        "--export",
+        type=Path,
+        help="Also write every meme of the poll, ranked, with forecasts, to this file (not limited by --limit)",
+    )
+    parser.add_argument(
+        "--export-format",
+        choices=("jsonl", "csv", "columnar"),
+        help="Format for --export; by default .jsonl and .csv select those formats and anything else is columnar",
+    )
     parser.add_argument("--verbose", action="store_true", help="Enable debug logging")
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
+    if args.report_only:
+        print_cached_report(args.state)
+        return
     logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
 
+    # The pipeline is imported only when it runs, which keeps --report-only fast.
+    from trend_tracker.config import load_config
+    from trend_tracker.storage import build_store
+    from trend_tracker.tracker import TrackerResult, TrendTracker
+
     config = load_config()
-    store = TrendStore(str(args.state))
+    if args.store:
+        config.storage_backend = args.store
+    if args.history_format:
+        config.history_format = args.history_format
+    if args.forecast_model:
+        config.forecast_model = args.forecast_model
+    config.ranking_size = max(config.ranking_size, args.limit)
+    if args.serve is not None:
+        config.api_port = args.serve
+    if args.metrics:
+        config.instrument = True
+    if args.profile and not config.profile_interval:
+        config.profile_interval = 0.005
+    try:
+        store = build_store(config, str(args.state))
+    except ValueError as exc:
+        raise SystemExit(f"error: {exc}") from None
     if args.sample_data:
+        from trend_tracker.data_sources.http_source import LocalJSONSource
+
         tiktok = LocalJSONSource("tiktok", "sample_data/tiktok_sample.json")
         instagram = LocalJSONSource("instagram", "sample_data/instagram_sample.json")
         tracker = TrendTracker(config, tiktok_source=tiktok, instagram_source=instagram, storage=store)
     else:
         tracker = TrendTracker(config, storage=store)
 
-    result = tracker.run_once()
-    report = tracker.render_report(result, limit=args.limit)
-    print(report)
+    if args.daemon or args.serve is not None:
+        from trend_tracker.daemon import TrackerDaemon
+        from trend_tracker.server import build_read_api
+
+        api = build_read_api(config)
+        if api is not None:
+            api.start()
+
+        def on_poll(result: TrackerResult) -> None:
+            if api is not None:
+                api.publish(result)
+            print(tracker.render_report(result, limit=args.limit, summary_path=summary_path(args.state)))
+            if args.export:
+                export(tracker, result, args)
+            write_diagnostics(tracker, args)
+
+        daemon = TrackerDaemon(tracker, on_poll=on_poll)
+        try:
+            daemon.run()
+        finally:
+            if api is not None:
+                api.stop()
+        return
+
+    try:
+        result = tracker.run_once()
+        report = tracker.render_report(result, limit=args.limit, summary_path=summary_path(args.state))
+        print(report)
+        if args.export:
+            export(tracker, result, args)
+        write_diagnostics(tracker, args)
+    finally:
+        tracker.close()
+
+
+def export(tracker: TrendTracker, result: TrackerResult, args: argparse.Namespace) -> None:
+    from trend_tracker.export import export_result, open_sink
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    with open_sink(args.export, args.export_format, generated_at=generated_at) as sink:
+        export_result(
+            result,
+            sink,
+            resolution=tracker.config.forecast_resolution,
+            holt_index=getattr(tracker.store, "holt_index", None),
+        )
+    logging.getLogger(__name__).info("Exported %d memes to %s", sink.rows, args.export)
+
+
+def print_cached_report(state: Path) -> None:
+    path = summary_path(state)
+    try:
+        summary = load_summary(path)
+    except FileNotFoundError:
+        sys.exit(f"No cached report at {path}; run the tracker once without --report-only")
+    print(render_summary(summary))
+
+
+def write_diagnostics(tracker: TrendTracker, args: argparse.Namespace) -> None:
+    instrumentation = tracker.instrumentation
+    if args.metrics:
+        args.metrics.write_text(instrumentation.to_prometheus(), encoding="utf-8")
+    if args.profile and instrumentation.profiler is not None:
+        args.profile.write_text(instrumentation.profiler.collapsed() + "\n", encoding="utf-8")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+"""forecast_batch must project every record like forecast."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from trend_tracker.data_models import MetricSnapshot, TrendRecord  # noqa: E402
+from trend_tracker.forecaster import TrendForecast, forecast, forecast_batch  # noqa: E402
+
+START = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def _record(index: int, current: float, samples: Sequence[float]) -> TrendRecord:
+    record = TrendRecord(
+        platform="instagram",
+        external_id=str(index),
+        title="meme",
+        author="someone",
+        url="",
+        caption=None,
+        language=None,
+        timestamp=START + timedelta(hours=current),
+        views=5000 + index * 113,
+        likes=index * 7,
+        comments=index,
+        shares=index % 5,
+    )
+    for position, hours in enumerate(samples):
+        views = 400 * position + (index * position) ** 2
+        record.history.append(MetricSnapshot(START + timedelta(hours=hours), views, 0, 0, 0))
+    return record
+
+
+def _records() -> List[TrendRecord]:
+    histories: List[Sequence[float]] = [
+        [],
+        [1],
+        [1, 2],
+        [0.25, 0.5, 0.75, 1, 3, 6],
+        # Every sample at one instant: the fit has no spread in time.
+        [2, 2],
+        # The poll is older than samples already stored.
+        [1, 5, 9],
+    ]
+    records = []
+    for index in range(60):
+        samples = histories[index % len(histories)]
+        current = samples[-1] + 1 if samples and index % 4 else 4
+        records.append(_record(index, current, samples))
+    return records
+
+
+def _assert_close(actual: Sequence[TrendForecast], expected: Sequence[TrendForecast]) -> None:
+    assert len(actual) == len(expected)
+    for got, wanted in zip(actual, expected):
+        assert (got.record, got.horizon_hours) == (wanted.record, wanted.horizon_hours)
+        times, views = zip(*got.projected_views)
+        wanted_times, wanted_views = zip(*wanted.projected_views)
+        assert times == wanted_times
+        assert views == pytest.approx(wanted_views, rel=1e-6, abs=1e-3)
+        assert got.projected_engagement_rate == pytest.approx(wanted.projected_engagement_rate)
+
+
+@pytest.mark.parametrize("resolution", [None, 3600.0])
+def test_batch_matches_forecast(resolution: Optional[float]) -> None:
+    records = _records()
+    expected = forecast(records, 8, resolution=resolution)
+    batch = forecast_batch(records, 8, resolution=resolution)
+
+    _assert_close(batch, expected)
+    _assert_close([batch.lookup(records[7])], expected[7:8])
+    _assert_close(batch[-3:], expected[-3:])
+
+
+def test_empty_batch() -> None:
+    assert list(forecast_batch([], 6)) == []
@@ -0,0 +1,95 @@
+"""ForecastCache reuses a forecast only while the record it was fitted on is unchanged."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from trend_tracker.data_models import MetricSnapshot, TrendRecord
+from trend_tracker.forecaster import ForecastCache, TrendForecast, forecast
+
+START = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def _record(external_id: str = "1", *, views: int = 5000, samples: int = 4) -> TrendRecord:
+    record = TrendRecord(
+        platform="tiktok",
+        external_id=external_id,
+        title="meme",
+        author="someone",
+        url="",
+        caption=None,
+        language=None,
+        timestamp=START + timedelta(hours=samples),
+        views=views,
+        likes=50,
+    )
+    for hour in range(samples):
+        record.history.append(MetricSnapshot(START + timedelta(hours=hour), 1000 * hour, 10, 0, 0))
+    return record
+
+
+def _views(entry: TrendForecast) -> List[float]:
+    return [views for _, views in entry.projected_views]
+
+
+def test_unchanged_records_hit() -> None:
+    cache = ForecastCache()
+    first = cache.get(_record())
+    again = _record()
+    second = cache.get(again)
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert second.record is again
+    assert _views(second) == _views(first)
+
+
+def test_new_counters_horizon_or_resolution_miss() -> None:
+    cache = ForecastCache()
+    cache.get(_record())
+    cache.get(_record(views=9000))
+    cache.get(_record(views=9000), 12)
+    cache.get(_record(views=9000), 12, resolution=7200.0)
+
+    assert (cache.hits, cache.misses) == (0, 4)
+
+
+def test_history_changes_behind_the_current_snapshot_miss() -> None:
+    cache = ForecastCache()
+    record = _record()
+    cache.get(record)
+
+    # A late sample lands in the middle of the history.
+    record.history.append(MetricSnapshot(START + timedelta(minutes=90), 4000, 10, 0, 0))
+    late = cache.get(record)
+    # A retention roll-up drops samples, keeping the newest.
+    record.history = record.history[2:]
+    rolled_up = cache.get(record)
+
+    assert (cache.hits, cache.misses) == (0, 3)
+    assert _views(late) != _views(rolled_up)
+    assert _views(rolled_up) == _views(forecast([record])[0])
+
+
+def test_batches_and_eviction() -> None:
+    cache = ForecastCache(max_size=100)
+    records = [_record(str(index), views=1000 * index) for index in range(cache.batch_threshold + 50)]
+    batched = cache.get_many(records)
+
+    assert [_views(entry) for entry in batched] == [_views(entry) for entry in forecast(records)]
+    assert len(cache) == 100
+    cache.get(records[-1])
+    cache.get(records[0])
+    assert (cache.hits, cache.misses) == (1, len(records) + 1)
+
+
+def test_lazy_forecasts_prepare_records_first() -> None:
+    cache = ForecastCache()
+    records = [_record(str(index)) for index in range(3)]
+    prepared: List[str] = []
+    lazy = cache.lazy(records, prepare=lambda batch: prepared.extend(record.external_id for record in batch))
+
+    assert cache.misses == 0
+    assert lazy[1].record is records[1]
+    assert [entry.record for entry in lazy] == records
+    assert prepared == ["1", "0", "1", "2"]
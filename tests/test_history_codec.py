@@ -0,0 +1,108 @@
+"""History archives, delta and columnar, must give back exactly the histories that were saved."""
+
+from __future__ import annotations
+
+from array import array
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from trend_tracker import history_codec
+from trend_tracker.data_models import SnapshotHistory, load_histories, save_histories
+from trend_tracker.history_codec import DeltaArchive, load_delta_histories, save_delta_histories
+
+EPOCH = 1_790_000_000.0
+
+
+def _history(timestamps: List[float], views: List[int], *, naive: bool = False) -> SnapshotHistory:
+    return SnapshotHistory.from_columns(
+        array("d", timestamps),
+        array("q", views),
+        array("q", [value // 10 for value in views]),
+        array("q", [value % 7 for value in views]),
+        array("q", [-value for value in views]),
+        naive=naive,
+    )
+
+
+def _histories() -> Dict[str, SnapshotHistory]:
+    return {
+        "tiktok:steady": _history([EPOCH + 900 * step for step in range(50)], [100 * step for step in range(50)]),
+        # Counters that fall and intervals that shrink: negative deltas and deltas of deltas.
+        "tiktok:falling": _history([EPOCH, EPOCH + 3600, EPOCH + 3700, EPOCH + 3701], [9000, 400, 12, 0]),
+        "tiktok:micros": _history([EPOCH + 0.25, EPOCH + 1.000001, EPOCH + 2.5], [1, 2, 3], naive=True),
+        # Not representable in whole microseconds, so stored as raw float bits.
+        "instagram:bits": _history([EPOCH + 1 / 3, EPOCH + 2 / 3], [5, 2**62]),
+        "instagram:single": _history([EPOCH], [-(2**62)]),
+        "instagram:empty": SnapshotHistory(),
+        "instagram:überkey": _history([0.0, 1.0, 1.0], [0, 0, 0]),
+    }
+
+
+def _assert_same(loaded: Dict[str, SnapshotHistory], expected: Dict[str, SnapshotHistory]) -> None:
+    assert list(loaded) == list(expected)
+    for key, history in expected.items():
+        assert loaded[key] == history, key
+        for timestamp in history.timestamps[:1]:
+            assert loaded[key].to_datetime(timestamp) == history.to_datetime(timestamp), key
+
+
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_round_trip(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, compress: bool, vectorized: bool) -> None:
+    if vectorized:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(history_codec, "numpy_available", lambda: False)
+    path = str(tmp_path / "histories.bin")
+    save_delta_histories(path, _histories(), compress=compress)
+
+    _assert_same(load_delta_histories(path), _histories())
+    _assert_same(load_histories(path), _histories())
+    with DeltaArchive(path) as archive:
+        assert archive.samples("tiktok:steady") == 50
+        assert archive.get("instagram:empty") == SnapshotHistory()
+        assert archive.get("tiktok:falling") == _histories()["tiktok:falling"]
+        assert archive.get("missing") is None
+
+
+def test_encoders_agree(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    pytest.importorskip("numpy")
+    vectorized, scalar = tmp_path / "vectorized.bin", tmp_path / "scalar.bin"
+    save_delta_histories(str(vectorized), _histories())
+    monkeypatch.setattr(history_codec, "numpy_available", lambda: False)
+    save_delta_histories(str(scalar), _histories())
+
+    assert vectorized.read_bytes() == scalar.read_bytes()
+
+
+def test_empty_archive(tmp_path: Path) -> None:
+    path = str(tmp_path / "histories.bin")
+    save_delta_histories(path, {})
+
+    assert load_delta_histories(path) == {}
+    with DeltaArchive(path) as archive:
+        assert len(archive) == 0
+
+
+def test_rejects_other_files(tmp_path: Path) -> None:
+    path = tmp_path / "histories.bin"
+    path.write_bytes(b"not an archive at all")
+
+    with pytest.raises(ValueError, match="Not a delta history archive"):
+        DeltaArchive(str(path))
+
+
+def test_columnar_archive_outlives_its_memory_map(tmp_path: Path) -> None:
+    path = str(tmp_path / "histories.bin")
+    histories = {key: history for key, history in _histories().items() if len(history)}
+    save_histories(path, histories)
+
+    loaded = load_histories(path)
+    # The map is closed by now; the columns were copied out of it.
+    loaded["tiktok:steady"].views.append(1)
+    assert {key: history for key, history in loaded.items() if key != "tiktok:steady"} == {
+        key: history for key, history in histories.items() if key != "tiktok:steady"
+    }
+    assert list(loaded["tiktok:steady"].views) == [*histories["tiktok:steady"].views, 1]
@@ -0,0 +1,172 @@
+"""HTTPJSONSource against a local ``http.server``: conditional requests and retries."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from trend_tracker.data_sources.http_source import HTTPJSONSource  # noqa: E402
+
+
+ITEMS = [{"id": str(index), "title": f"meme {index}", "playCount": index * 100} for index in range(25)]
+ETAG = '"v1"'
+
+
+class FeedServer(ThreadingHTTPServer):
+    """Serves ``ITEMS`` with an ETag; ``failures`` are answered first, one per request."""
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), FeedHandler)
+        self.requests: List[Tuple[str, Dict[str, str]]] = []
+        self.failures: List[Tuple[int, Optional[str]]] = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/feed"
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    server: FeedServer
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, dict(self.headers)))
+            failure = server.failures.pop(0) if server.failures else None
+        if failure is not None:
+            status, retry_after = failure
+            self.send_response(status)
+            if retry_after is not None:
+                self.send_header("Retry-After", retry_after)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            return
+        query = parse_qs(urlparse(self.path).query)
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query.get("limit", [str(len(ITEMS))])[0])
+        body = json.dumps(ITEMS[offset : offset + limit]).encode()
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server() -> Iterator[FeedServer]:
+    feed = FeedServer()
+    thread = threading.Thread(target=feed.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield feed
+    finally:
+        feed.shutdown()
+        feed.server_close()
+        thread.join()
+
+
+def _ids(records: List[object]) -> List[str]:
+    return [record.external_id for record in records]
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"stream": True}, {"page_size": 10}, {"page_size": 10, "pages_in_flight": 1}],
+    ids=["buffered", "stream", "pages", "one-page-in-flight"],
+)
+def test_unchanged_dataset_is_served_from_cache(server: FeedServer, options: Dict[str, object]) -> None:
+    source = HTTPJSONSource("tiktok", server.url, **options)
+
+    first = list(source.iter_latest())
+    fetched = len(server.requests)
+    second = list(source.iter_latest())
+
+    assert _ids(first) == [item["id"] for item in ITEMS]
+    assert _ids(second) == _ids(first)
+    assert "If-None-Match" not in server.requests[0][1]
+    # One conditional request answers the whole poll, however many pages the first took.
+    assert len(server.requests) == fetched + 1
+    assert server.requests[-1][1].get("If-None-Match") == ETAG
+    assert source.bytes_received > 0
+
+
+def test_retries_429_and_5xx(server: FeedServer) -> None:
+    server.failures = [(429, "0"), (503, None), (502, None)]
+    source = HTTPJSONSource("tiktok", server.url, max_retries=3, backoff_base=0.01)
+
+    records = source.fetch_latest()
+
+    assert len(records) == len(ITEMS)
+    assert len(server.requests) == 4
+
+
+def test_gives_up_after_max_retries(server: FeedServer) -> None:
+    server.failures = [(500, None)] * 3
+    source = HTTPJSONSource("tiktok", server.url, max_retries=2, backoff_base=0.01)
+
+    with pytest.raises(requests.HTTPError):
+        source.fetch_latest()
+    assert len(server.requests) == 3
+
+
+def test_honours_retry_after(server: FeedServer, monkeypatch: pytest.MonkeyPatch) -> None:
+    slept: List[float] = []
+    monkeypatch.setattr(time, "sleep", slept.append)
+    server.failures = [(429, "2"), (503, "1.5")]
+    source = HTTPJSONSource("tiktok", server.url, backoff_cap=30.0)
+
+    source.fetch_latest()
+
+    assert slept == [2.0, 1.5]
+
+
+def test_retry_after_is_capped_at_backoff_cap(server: FeedServer, monkeypatch: pytest.MonkeyPatch) -> None:
+    slept: List[float] = []
+    monkeypatch.setattr(time, "sleep", slept.append)
+    server.failures = [(429, "3600")]
+    source = HTTPJSONSource("tiktok", server.url, backoff_cap=5.0)
+
+    source.fetch_latest()
+
+    assert slept == [5.0]
+
+
+def test_no_retry_past_the_source_timeout(server: FeedServer, monkeypatch: pytest.MonkeyPatch) -> None:
+    slept: List[float] = []
+    monkeypatch.setattr(time, "sleep", slept.append)
+    server.failures = [(503, "20")]
+    source = HTTPJSONSource("tiktok", server.url, timeout=10.0, backoff_cap=30.0)
+
+    with pytest.raises(requests.HTTPError):
+        source.fetch_latest()
+    assert slept == []
+    assert len(server.requests) == 1
+
+
+def test_item_requests_leave_out_the_listing_params(server: FeedServer) -> None:
+    source = HTTPJSONSource("tiktok", server.url, params={"region": "US"}, item_url=server.url + "/{id}")
+
+    list(source.iter_latest())
+    source.fetch_items(["3", "a b"])
+
+    assert [path for path, _ in server.requests] == ["/feed?region=US", "/feed/3", "/feed/a%20b"]
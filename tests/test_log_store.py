@@ -0,0 +1,117 @@
+"""LogStructuredTrendStore recovery: torn batches, replay after compaction, evictions."""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from trend_tracker.data_models import TrendRecord
+from trend_tracker.retention import RetentionPolicy
+from trend_tracker.storage import LogStructuredTrendStore
+
+START = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def _poll(hours: float, ids: range, views: int) -> List[TrendRecord]:
+    return [
+        TrendRecord(
+            platform="tiktok",
+            external_id=str(index),
+            title=f"meme {index}",
+            author="someone",
+            url="",
+            caption=None,
+            language=None,
+            timestamp=START + timedelta(hours=hours),
+            views=views + index,
+            likes=index,
+            comments=1,
+            shares=0,
+        )
+        for index in ids
+    ]
+
+
+def _state(store: LogStructuredTrendStore) -> Dict[str, Tuple[int, List[float], List[int]]]:
+    return {
+        f"{record.platform}:{record.external_id}": (
+            record.views,
+            list(record.history.timestamps),
+            list(record.history.views),
+        )
+        for record in store.records()
+    }
+
+
+def test_torn_last_batch_is_discarded(tmp_path: Path) -> None:
+    path = str(tmp_path / "state.json")
+    store = LogStructuredTrendStore(path)
+    store.update(_poll(0, range(5), 100))
+    expected = _state(store)
+    store.update(_poll(1, range(5), 200))
+    log = Path(f"{path}.log")
+    lines = log.read_bytes().splitlines(keepends=True)
+    # A crash half way through writing the second batch.
+    log.write_bytes(lines[0] + lines[1][: len(lines[1]) // 2])
+
+    reopened = LogStructuredTrendStore(path)
+
+    assert _state(reopened) == expected
+    assert log.read_bytes() == lines[0]
+
+
+def test_replay_after_compaction(tmp_path: Path) -> None:
+    path = str(tmp_path / "state.json")
+    store = LogStructuredTrendStore(path)
+    store.update(_poll(0, range(5), 100))
+    store.compact()
+    store.update(_poll(1, range(3, 8), 200))
+    store.update(_poll(2, range(8), 300))
+
+    assert _state(LogStructuredTrendStore(path)) == _state(store)
+
+
+def test_crash_between_compaction_and_truncation_replays_nothing_twice(tmp_path: Path) -> None:
+    path = str(tmp_path / "state.json")
+    store = LogStructuredTrendStore(path)
+    store.update(_poll(0, range(5), 100))
+    store.update(_poll(1, range(5), 200))
+    log = Path(f"{path}.log")
+    stale_log = log.read_bytes()
+    store.compact()
+    # The base was replaced but the log was never truncated.
+    log.write_bytes(stale_log)
+
+    assert _state(LogStructuredTrendStore(path)) == _state(store)
+
+
+def test_evictions_are_replayed(tmp_path: Path) -> None:
+    path = str(tmp_path / "state.json")
+    retention = RetentionPolicy(raw_window=None, ttl=60.0)
+    store = LogStructuredTrendStore(path, retention=retention)
+    store.update(_poll(0, range(5), 100))
+    store.compact()
+    store.update(_poll(1, range(2), 200))
+    evicted = store.evict_expired(time.time() + 3600, force=True)
+
+    reopened = LogStructuredTrendStore(path, retention=retention)
+
+    assert sorted(evicted) == [f"tiktok:{index}" for index in range(5)]
+    assert _state(reopened) == _state(store) == {}
+
+
+def test_save_waits_for_a_background_compaction(tmp_path: Path) -> None:
+    path = str(tmp_path / "state.json")
+    store = LogStructuredTrendStore(path, compact_threshold=1, background_compaction=True)
+    for hour in range(20):
+        store.update(_poll(hour, range(50), 100 * hour))
+        saver = threading.Thread(target=store.save)
+        saver.start()
+        store.save()
+        saver.join()
+    store.close()
+
+    assert _state(LogStructuredTrendStore(path)) == _state(store)
@@ -0,0 +1,92 @@
+"""calculate_metrics_batch must score every record like calculate_metrics."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import List, Sequence
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from trend_tracker.analyzer import TrendMetrics, calculate_metrics, calculate_metrics_batch  # noqa: E402
+from trend_tracker.data_models import MetricSnapshot, TrendRecord  # noqa: E402
+
+START = datetime(2026, 10, 1, tzinfo=timezone.utc)
+AS_OF = START + timedelta(hours=30)
+
+
+def _record(index: int, current: float, samples: Sequence[float], *, naive: bool = False) -> TrendRecord:
+    """A record polled ``current`` hours after START, with history at ``samples`` hours."""
+
+    def at(hours: float) -> datetime:
+        timestamp = START + timedelta(hours=hours)
+        return timestamp.replace(tzinfo=None) if naive else timestamp
+
+    record = TrendRecord(
+        platform="tiktok",
+        external_id=str(index),
+        title="meme",
+        author="someone",
+        url="",
+        caption=None,
+        language=None,
+        timestamp=at(current),
+        views=1000 + index * 37,
+        likes=index * 3,
+        comments=index,
+        shares=index % 4,
+    )
+    for position, hours in enumerate(samples):
+        record.history.append(MetricSnapshot(at(hours), 100 * position + index * (position + 1), index, 1, 0))
+    return record
+
+
+def _assert_close(actual: List[TrendMetrics], expected: List[TrendMetrics]) -> None:
+    assert len(actual) == len(expected)
+    for got, wanted in zip(actual, expected):
+        assert got.record is wanted.record
+        assert (got.engagement_rate, got.velocity_per_hour, got.acceleration_per_hour, got.virality_score) == (
+            pytest.approx(
+                (wanted.engagement_rate, wanted.velocity_per_hour, wanted.acceleration_per_hour, wanted.virality_score)
+            )
+        )
+
+
+def _records(*, naive: bool = False) -> List[TrendRecord]:
+    histories = [
+        [],
+        [1],
+        [1, 2],
+        [1, 2, 3, 4, 5],
+        # The same instant twice, so a segment has no duration.
+        [1, 2, 2],
+        # The poll is older than samples already stored.
+        [1, 4, 8],
+        [1, 2, 3, 4, 9, 10],
+    ]
+    records = []
+    for index in range(70):
+        samples = histories[index % len(histories)]
+        current = samples[-1] + 1 if samples and index % 3 else 6
+        records.append(_record(index, current, samples, naive=naive))
+    return records
+
+
+@pytest.mark.parametrize("naive", [False, True])
+def test_batch_matches_calculate_metrics(naive: bool) -> None:
+    records = _records(naive=naive)
+    batch = calculate_metrics_batch(records, as_of=AS_OF).to_metrics()
+
+    _assert_close(batch, calculate_metrics(records, as_of=AS_OF))
+
+
+def test_batch_mixes_naive_and_aware_timestamps() -> None:
+    records = [*_records(), *_records(naive=True)]
+    batch = calculate_metrics_batch(records, as_of=AS_OF).to_metrics()
+
+    _assert_close(batch, calculate_metrics(records, as_of=AS_OF))
+
+
+def test_empty_batch() -> None:
+    assert calculate_metrics_batch([], as_of=AS_OF).to_metrics() == []
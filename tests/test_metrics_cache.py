@@ -0,0 +1,72 @@
+"""MetricsCache must give the same metrics as scoring from scratch."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+from trend_tracker.analyzer import MetricsCache, TrendMetrics, calculate_metrics
+from trend_tracker.data_models import TrendRecord
+from trend_tracker.storage import TrendStore
+
+START = datetime(2026, 10, 1, tzinfo=timezone.utc)
+AS_OF = START + timedelta(hours=12)
+
+
+def _poll(hours: float, views: int, external_id: str = "t57") -> TrendRecord:
+    return TrendRecord(
+        platform="tiktok",
+        external_id=external_id,
+        title="meme",
+        author="someone",
+        url="",
+        caption=None,
+        language=None,
+        timestamp=START + timedelta(hours=hours),
+        views=views,
+        likes=views // 10,
+        comments=3,
+        shares=1,
+    )
+
+
+def _values(metrics: List[TrendMetrics]) -> List[tuple]:
+    return [
+        (m.engagement_rate, m.velocity_per_hour, m.acceleration_per_hour, m.virality_score) for m in metrics
+    ]
+
+
+def test_out_of_order_poll_then_flat_poll(tmp_path: Path) -> None:
+    store = TrendStore(str(tmp_path / "state.json"))
+    cache = MetricsCache()
+    polls = [
+        [_poll(0, 100), _poll(0, 10, "steady")],
+        [_poll(2, 30_000), _poll(1, 10, "steady")],
+        # Older than the sample already stored: lands mid-history.
+        [_poll(1, 500), _poll(2, 10, "steady")],
+        # Flat, but still older than the newest sample.
+        [_poll(1.5, 500), _poll(3, 10, "steady")],
+        [_poll(4, 500), _poll(4, 10, "steady")],
+        [_poll(5, 500), _poll(5, 10, "steady")],
+    ]
+    for poll in polls:
+        merged = store.update(poll)
+        cached = cache.compute(merged, store.changed, as_of=AS_OF)
+        assert _values(cached) == _values(calculate_metrics(merged, as_of=AS_OF))
+    assert cache.hits
+
+
+def test_entry_is_not_reused_when_the_current_snapshot_was_not_the_newest() -> None:
+    record = _poll(2, 30_000)
+    record.history.append(_poll(0, 100).current_snapshot())
+    record.history.append(_poll(3, 40_000).current_snapshot())
+    cache = MetricsCache()
+    cache.compute([record], set(), as_of=AS_OF)
+
+    # A flat poll pushes the 2h snapshot into the middle of the history.
+    record.history.append(record.current_snapshot())
+    cached = cache.compute([record], set(), as_of=AS_OF)
+
+    assert cache.hits == 0
+    assert _values(cached) == _values(calculate_metrics([record], as_of=AS_OF))
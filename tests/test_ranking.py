@@ -0,0 +1,92 @@
+"""TopKRanking order, ties included, and the sharded leaders that seed it."""
+
+from __future__ import annotations
+
+import random
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from trend_tracker.analyzer import TrendMetrics, calculate_metrics
+from trend_tracker.config import InstagramConfig, TikTokConfig, TrackerConfig
+from trend_tracker.data_models import TrendRecord
+from trend_tracker.ranking import TopKRanking
+from trend_tracker.sharding import ShardedAnalytics
+from trend_tracker.storage import TrendStore
+from trend_tracker.tracker import TrackerResult, TrendTracker
+
+
+def _record(platform: str, external_id: str, views: int) -> TrendRecord:
+    return TrendRecord(
+        platform=platform,
+        external_id=external_id,
+        title="meme",
+        author="someone",
+        url="",
+        caption=None,
+        language=None,
+        timestamp=datetime(2026, 10, 1, tzinfo=timezone.utc),
+        views=views,
+        likes=views // 10,
+    )
+
+
+def _metric(platform: str, external_id: str, score: float) -> TrendMetrics:
+    return TrendMetrics(_record(platform, external_id, 1000), 0.1, 0.0, 0.0, score)
+
+
+def _keys(metrics: List[TrendMetrics]) -> List[str]:
+    return [f"{metric.record.platform}:{metric.record.external_id}" for metric in metrics]
+
+
+def test_ties_are_ordered_by_key_whatever_the_fetch_order() -> None:
+    metrics = [_metric(platform, str(index), 5.0) for platform in ("tiktok", "instagram") for index in range(6)]
+    metrics.append(_metric("tiktok", "best", 9.0))
+    orders = []
+    for seed in range(5):
+        random.Random(seed).shuffle(metrics)
+        ranking = TopKRanking(capacity=4)
+        ranking.reset(metrics)
+        orders.append((_keys(ranking.top()), _keys(ranking.top(platform="instagram"))))
+
+    assert orders == [orders[0]] * 5
+    assert orders[0] == (
+        ["tiktok:best", "tiktok:5", "tiktok:4", "tiktok:3"],
+        ["instagram:5", "instagram:4", "instagram:3", "instagram:2"],
+    )
+
+
+def test_ties_survive_updates_and_rebuilds() -> None:
+    ranking = TopKRanking(capacity=2)
+    ranking.reset([_metric("tiktok", "a", 5.0), _metric("tiktok", "c", 5.0)])
+    ranking.update([_metric("tiktok", "b", 5.0)])
+    assert _keys(ranking.top()) == ["tiktok:c", "tiktok:b"]
+
+    # Dropping a ranked meme rebuilds the board from every entry.
+    ranking.update([_metric("tiktok", "c", 1.0)])
+    assert _keys(ranking.top()) == ["tiktok:b", "tiktok:a"]
+
+
+def test_sharded_leaders_keep_ties_at_the_cut() -> None:
+    # Identical records score the same, so only the key can break the tie.
+    records = [_record("tiktok", str(index), 1000) for index in range(20)]
+    outcome = ShardedAnalytics(1, shards=3, ranking_size=3).analyze(records)
+    metrics = list(calculate_metrics(records))
+    loaded, reset = TopKRanking(3), TopKRanking(3)
+    loaded.load(metrics, outcome.leaders)
+    reset.reset(metrics)
+
+    assert len(outcome.leaders[None]) == 20
+    assert _keys(loaded.top()) == _keys(reset.top()) == ["tiktok:9", "tiktok:8", "tiktok:7"]
+
+
+def test_report_limit_cannot_exceed_the_ranking(tmp_path: Path) -> None:
+    config = TrackerConfig(TikTokConfig(), InstagramConfig(), ranking_size=3)
+    tracker = TrendTracker(config, storage=TrendStore(str(tmp_path / "state.json")))
+    result = TrackerResult(fetched=[], metrics=[], forecasts=[])
+
+    with pytest.raises(ValueError, match="ranking size"):
+        tracker.render_report(result, limit=4)
+    tracker.close()
@@ -0,0 +1,135 @@
+"""AdaptiveScheduler intervals and budget, and the daemon loop around it."""
+
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+
+from trend_tracker.analyzer import TrendMetrics
+from trend_tracker.config import InstagramConfig, TikTokConfig, TrackerConfig
+from trend_tracker.daemon import TrackerDaemon
+from trend_tracker.data_models import TrendRecord
+from trend_tracker.scheduler import AdaptiveScheduler
+from trend_tracker.storage import TrendStore
+
+
+def _metric(external_id: str, velocity: float, views: int = 1000) -> TrendMetrics:
+    record = TrendRecord(
+        platform="tiktok",
+        external_id=external_id,
+        title="meme",
+        author="someone",
+        url="",
+        caption=None,
+        language=None,
+        timestamp=datetime(2026, 10, 1, tzinfo=timezone.utc),
+        views=views,
+    )
+    return TrendMetrics(record, 0.1, velocity, 0.0, 10.0)
+
+
+def _scheduler(**options: float) -> AdaptiveScheduler:
+    settings = dict(min_interval=60.0, max_interval=3600.0, base_interval=900.0, budget=100, budget_window=900.0)
+    settings.update(options)
+    return AdaptiveScheduler(**settings)
+
+
+def test_hot_memes_are_refreshed_sooner() -> None:
+    scheduler = _scheduler()
+    scheduler.observe([_metric("hot", 500.0), _metric("warm", 20.0), _metric("flat", 0.0)], now=0.0)
+
+    assert scheduler.due(60.0) == ["tiktok:hot"]
+    assert "tiktok:warm" in scheduler.due(450.0)
+    # A flat meme backs off past the base interval.
+    assert "tiktok:flat" not in scheduler.due(1799.0)
+    assert "tiktok:flat" in scheduler.due(1800.0)
+
+
+def test_flat_memes_back_off_up_to_max_interval() -> None:
+    scheduler = _scheduler()
+    wakeups = []
+    now = 0.0
+    for _ in range(4):
+        scheduler.observe([_metric("flat", 0.0)], now=now)
+        wakeups.append(scheduler.next_wakeup() - now)
+        now += wakeups[-1]
+    assert wakeups == [1800.0, 3600.0, 3600.0, 3600.0]
+
+
+def test_budget_caps_refreshes_per_window_hottest_first() -> None:
+    scheduler = _scheduler(budget=2)
+    scheduler.observe([_metric(str(index), 100.0 * (index + 1)) for index in range(5)], now=0.0)
+
+    first = scheduler.due(1000.0)
+    assert first == ["tiktok:4", "tiktok:3"]
+    assert scheduler.due(1001.0) == []
+    # The spent window delays the next wakeup until it ends.
+    assert scheduler.next_wakeup() == 1900.0
+    # The longest overdue relative to its interval wins over a slightly hotter meme.
+    assert scheduler.due(1900.0) == ["tiktok:2", "tiktok:4"]
+
+
+def test_handed_out_memes_are_pushed_back_until_observed() -> None:
+    scheduler = _scheduler()
+    scheduler.observe([_metric("hot", 500.0)], now=0.0)
+    assert scheduler.due(100.0) == ["tiktok:hot"]
+    assert scheduler.due(101.0) == []
+
+
+def test_forgotten_memes_are_never_due() -> None:
+    scheduler = _scheduler()
+    scheduler.observe([_metric("gone", 500.0), _metric("kept", 500.0)], now=0.0)
+    scheduler.forget(["tiktok:gone"])
+
+    assert scheduler.due(10_000.0) == ["tiktok:kept"]
+    assert len(scheduler) == 1
+
+
+class _FlakyTracker:
+    """Stands in for TrendTracker: the first full polls raise, then the daemon stops."""
+
+    def __init__(self, failures: int) -> None:
+        self.config = TrackerConfig(TikTokConfig(), InstagramConfig(), polling_interval=3600)
+        self.store = SimpleNamespace(save=lambda: None)
+        self.supports_refresh = False
+        self.failures = failures
+        self.polls = 0
+        self.closed = False
+
+    def run_once(self) -> SimpleNamespace:
+        self.polls += 1
+        if self.polls <= self.failures:
+            raise ConnectionError("feed unavailable")
+        return SimpleNamespace(evicted=[], metrics=[])
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_daemon_survives_a_failing_poll() -> None:
+    tracker = _FlakyTracker(failures=2)
+    polled: List[object] = []
+    daemon = TrackerDaemon(tracker, _scheduler(), tick=0.01)
+    daemon.on_poll = lambda result: (polled.append(result), daemon.stop())
+    thread = threading.Thread(target=daemon.run)
+    thread.start()
+    thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    assert tracker.polls == 3
+    assert len(polled) == 1
+    assert tracker.closed
+
+
+def test_refresh_updates_do_not_rewrite_the_json_state(tmp_path: Path) -> None:
+    path = tmp_path / "state.json"
+    store = TrendStore(str(path))
+    record = _metric("1", 0.0).record
+
+    store.update([record], save=False)
+    assert not path.exists()
+    store.update([record])
+    assert path.exists()
@@ -0,0 +1,112 @@
+"""SchemaMapper must build the records the hand-written normalizer built."""
+
+from __future__ import annotations
+
+import random
+from datetime import datetime
+from typing import Dict, List
+
+from trend_tracker.data_models import TrendRecord
+from trend_tracker.data_sources.schema import SchemaMapper
+
+
+def _legacy_normalize(payload: Dict[str, object], platform: str) -> TrendRecord:
+    """``HTTPJSONSource._normalize`` as it was before the schema mapper."""
+
+    timestamp = payload.get("timestamp") or payload.get("createTime")
+    if isinstance(timestamp, (int, float)):
+        timestamp = datetime.fromtimestamp(float(timestamp))
+    item = {
+        "id": payload.get("id") or payload.get("video_id") or payload.get("aweme_id"),
+        "title": payload.get("title") or payload.get("desc") or payload.get("caption", ""),
+        "author": payload.get("author", {}).get("uniqueId")
+        if isinstance(payload.get("author"), dict)
+        else payload.get("author") or payload.get("username") or payload.get("user"),
+        "url": payload.get("permalink") or payload.get("video_url") or payload.get("share_url") or payload.get("url"),
+        "caption": payload.get("caption") or payload.get("desc"),
+        "language": payload.get("language"),
+        "tags": payload.get("hashtags") or payload.get("challenges") or [],
+        "timestamp": timestamp,
+        "views": payload.get("playCount") or payload.get("view_count") or payload.get("views") or 0,
+        "likes": payload.get("diggCount") or payload.get("like_count") or payload.get("likes") or 0,
+        "comments": payload.get("commentCount") or payload.get("comment_count") or payload.get("comments") or 0,
+        "shares": payload.get("shareCount") or payload.get("share_count") or payload.get("shares") or 0,
+        "history": payload.get("history", []),
+    }
+    return TrendRecord.from_dict(item, platform)
+
+
+# Every key the normalizer reads, with values that include the falsy ones an
+# or-chain skips.
+_CANDIDATES: Dict[str, List[object]] = {
+    "id": ["a1", 17, "", 0, None],
+    "video_id": ["v2", 0],
+    "aweme_id": ["w3", None],
+    "title": ["Cats", "", None],
+    "desc": ["dancing cat", ""],
+    "caption": ["caption", "", None],
+    "author": ["someone", {"uniqueId": "tt_user"}, {"nickname": "no id"}, "", None],
+    "username": ["user_name", ""],
+    "user": ["plain_user", None],
+    "permalink": ["https://example.com/p", ""],
+    "video_url": ["https://example.com/v", None],
+    "share_url": ["https://example.com/s"],
+    "url": ["https://example.com/u", ""],
+    "language": ["en", None, ""],
+    "hashtags": [["cats", "dogs"], [], None],
+    "challenges": [["dance"], []],
+    "playCount": [1200, 0, None],
+    "view_count": [300, "45"],
+    "views": [7, 0],
+    "diggCount": [12, 0],
+    "like_count": [5, None],
+    "likes": [3],
+    "commentCount": [4, 0],
+    "comment_count": [2],
+    "comments": [1, None],
+    "shareCount": [9, 0],
+    "share_count": [8],
+    "shares": [6, None],
+    "history": [[], [{"timestamp": "2026-10-01T10:00:00+00:00", "views": 5, "likes": 1, "comments": 0, "shares": 0}]],
+    "region": ["US"],
+    "music": [{"title": "song"}],
+}
+_TIMESTAMPS: List[object] = [1_790_000_000, 1_790_000_000.5, "2026-10-01T12:00:00Z", "2026-10-01T12:00:00"]
+
+
+def _payloads(count: int, seed: int) -> List[Dict[str, object]]:
+    rng = random.Random(seed)
+    names = list(_CANDIDATES)
+    payloads = []
+    for _ in range(count):
+        payload = {name: rng.choice(_CANDIDATES[name]) for name in rng.sample(names, rng.randint(0, len(names)))}
+        # A timestamp is always present, since a missing one reads the clock.
+        if rng.random() < 0.5:
+            payload["timestamp"] = rng.choice(_TIMESTAMPS)
+            if rng.random() < 0.3:
+                payload["createTime"] = rng.choice(_TIMESTAMPS)
+        else:
+            payload["timestamp"] = rng.choice([0, "", None]) if rng.random() < 0.3 else None
+            payload["createTime"] = rng.choice(_TIMESTAMPS)
+            if payload["timestamp"] is None:
+                del payload["timestamp"]
+        payloads.append(payload)
+    return payloads
+
+
+def test_mapped_records_match_the_legacy_normalizer() -> None:
+    payloads = _payloads(800, seed=13)
+    mapper = SchemaMapper("tiktok")
+
+    expected = [_legacy_normalize(payload, "tiktok") for payload in payloads]
+    assert mapper.map(payloads) == expected
+    assert [mapper.map_one(payload) for payload in payloads] == expected
+
+
+def test_layouts_past_the_limit_are_recompiled() -> None:
+    payloads = _payloads(200, seed=5)
+    mapper = SchemaMapper("instagram")
+    mapper.max_layouts = 8
+
+    # Alternating layouts keep evicting each other's compiled functions.
+    assert mapper.map(payloads * 2) == [_legacy_normalize(payload, "instagram") for payload in payloads * 2]
@@ -0,0 +1,165 @@
+"""SQLiteTrendStore against the JSON store, plus retention sweeps and queries."""
+
+from __future__ import annotations
+
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pytest
+
+from trend_tracker.analyzer import MetricsCache, calculate_metrics
+from trend_tracker.data_models import MetricSnapshot, SnapshotHistory, TrendRecord
+from trend_tracker.retention import HOUR, RetentionPolicy
+from trend_tracker.sqlite_storage import SQLiteTrendStore
+from trend_tracker.storage import TrendStore
+
+START = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def _poll(hours: float, ids: range, views: int, *, naive: bool = False) -> List[TrendRecord]:
+    timestamp = START + timedelta(hours=hours)
+    if naive:
+        timestamp = timestamp.replace(tzinfo=None)
+    return [
+        TrendRecord(
+            platform="tiktok" if index % 2 else "instagram",
+            external_id=f"m{index}",
+            title=f"meme {index}",
+            author="someone",
+            url=f"https://example.com/{index}",
+            caption=None,
+            language="en",
+            tags=["cats"],
+            timestamp=timestamp,
+            views=views + index,
+            likes=index,
+            comments=1,
+            shares=0,
+        )
+        for index in ids
+    ]
+
+
+def _state(records: List[TrendRecord]) -> Dict[str, Tuple[object, ...]]:
+    return {
+        f"{record.platform}:{record.external_id}": (
+            record.title,
+            record.tags,
+            record.timestamp,
+            record.views,
+            record.likes,
+            list(record.history.timestamps),
+            list(record.history.views),
+        )
+        for record in records
+    }
+
+
+def _polls() -> List[List[TrendRecord]]:
+    return [
+        _poll(0, range(6), 100),
+        _poll(1, range(3, 9), 200),
+        # Out of order: lands before the samples already stored.
+        _poll(0.5, range(2), 150),
+        _poll(2, range(9), 300),
+    ]
+
+
+def test_matches_the_json_store(tmp_path: Path) -> None:
+    json_store = TrendStore(str(tmp_path / "state.json"))
+    sqlite_store = SQLiteTrendStore(str(tmp_path / "state.db"))
+    for poll, copy in zip(_polls(), _polls()):
+        expected = json_store.update(poll)
+        merged = sqlite_store.update(copy)
+        assert _state(merged) == _state(expected)
+        assert sqlite_store.changed == json_store.changed
+
+    assert _state(sqlite_store.records()) == _state(json_store.records())
+    reopened = SQLiteTrendStore(str(tmp_path / "state.db"))
+    assert _state(reopened.records()) == _state(json_store.records())
+
+
+def test_long_histories_are_merged_from_the_newest_samples(tmp_path: Path) -> None:
+    json_store = TrendStore(str(tmp_path / "state.json"))
+    sqlite_store = SQLiteTrendStore(str(tmp_path / "state.db"))
+    cache = MetricsCache()
+    as_of = START + timedelta(hours=12)
+    # An out-of-order poll at 4.5h, then flat polls the cache can reuse.
+    polls = [(0, 100), (1, 200), (2, 300), (3, 400), (4, 500), (5, 600), (4.5, 550), (6, 700), (7, 700), (8, 700)]
+    for hour, views in polls:
+        expected = json_store.update(_poll(hour, range(4), views))
+        merged = sqlite_store.update(_poll(hour, range(4), views))
+        metrics = cache.compute(merged, sqlite_store.changed, as_of=as_of)
+        assert max(len(record.history) for record in merged) <= 4
+        scores = [(metric.velocity_per_hour, metric.virality_score) for metric in metrics]
+        assert scores == [
+            (metric.velocity_per_hour, metric.virality_score) for metric in calculate_metrics(expected, as_of=as_of)
+        ]
+        sqlite_store.load_histories(merged)
+        assert _state(merged) == _state(expected)
+    assert cache.hits
+
+
+def test_naive_timestamps_round_trip(tmp_path: Path) -> None:
+    store = SQLiteTrendStore(str(tmp_path / "state.db"))
+    store.update(_poll(0, range(3), 100, naive=True))
+    store.update(_poll(1, range(3), 200, naive=True))
+
+    for record in SQLiteTrendStore(str(tmp_path / "state.db")).records():
+        assert record.timestamp.tzinfo is None
+        assert record.history.to_datetime(record.history.timestamps[0]) == START.replace(tzinfo=None)
+
+
+def test_queries_load_histories(tmp_path: Path) -> None:
+    store = SQLiteTrendStore(str(tmp_path / "state.db"))
+    for poll in _polls():
+        store.update(poll)
+    everything = _state(store.records())
+
+    top = store.top_by_views("tiktok", 2, with_history=True)
+    assert [record.external_id for record in top] == ["m7", "m5"]
+    assert _state(top) == {key: everything[key] for key in ("tiktok:m7", "tiktok:m5")}
+    assert _state(store.recent(1, with_history=True)) == everything
+    history = store.history("tiktok:m1", since=START + timedelta(minutes=20))
+    assert [snapshot.views for snapshot in history] == [151]
+
+
+def test_retention_rolls_up_and_evicts(tmp_path: Path) -> None:
+    now = time.time()
+    history = SnapshotHistory(
+        MetricSnapshot(datetime.fromtimestamp(now - minutes * 60, timezone.utc), minutes, 0, 0, 0)
+        for minutes in range(595, 0, -10)
+    )
+    record = _poll(0, range(1), 100)[0]
+    record.timestamp = datetime.fromtimestamp(now, timezone.utc)
+    record.history = history
+    archive = tmp_path / "archive.jsonl"
+    policy = RetentionPolicy(raw_window=2 * HOUR, hourly_window=4 * HOUR, max_age=9 * HOUR, ttl=60.0)
+    store = SQLiteTrendStore(str(tmp_path / "state.db"), retention=policy, archive_path=str(archive))
+    store.update([record])
+
+    assert store.evict_expired(now, force=True) == []
+    ages = [(now - snapshot.timestamp.timestamp()) / HOUR for snapshot in store.history("instagram:m0")]
+    raw = [age for age in ages if age < 2]
+    hourly = [age for age in ages if 2 <= age < 4]
+    daily = [age for age in ages if age >= 4]
+    assert len(raw) == 12
+    assert len({int((now - age * HOUR) // HOUR) for age in hourly}) == len(hourly)
+    assert len({int((now - age * HOUR) // (24 * HOUR)) for age in daily}) == len(daily)
+
+    assert store.evict_expired(now + 120, force=True) == ["instagram:m0"]
+    assert store.count() == 0
+    assert store.history("instagram:m0") == []
+    archived = [json.loads(line) for line in archive.read_text().splitlines()]
+    assert [(item["id"], len(item["history"])) for item in archived] == [("m0", len(ages))]
+
+
+def test_refuses_a_json_state_file(tmp_path: Path) -> None:
+    path = tmp_path / "state.json"
+    TrendStore(str(path)).update(_poll(0, range(2), 100))
+
+    with pytest.raises(ValueError, match="not an SQLite database"):
+        SQLiteTrendStore(str(path))
@@ -0,0 +1,86 @@
+"""iter_json_array must decode chunked arrays like json.loads and reject anything that is not one array."""
+
+from __future__ import annotations
+
+import json
+from typing import Iterator, List
+
+import pytest
+
+from trend_tracker.data_sources.streaming import iter_json_array
+
+DOCUMENT = json.dumps(
+    [
+        {"id": "a1", "title": "cat ] } \" \\ dance", "tags": ["x", ["y", {}]], "views": 1200},
+        -12.5e3,
+        "überkatze €",
+        True,
+        None,
+        [],
+        {},
+        "",
+        1234567890,
+    ],
+    ensure_ascii=False,
+).encode()
+
+
+def _split(data: bytes, size: int) -> Iterator[bytes]:
+    return (data[start : start + size] for start in range(0, len(data), size))
+
+
+@pytest.mark.parametrize("size", range(1, 12))
+def test_every_split_decodes_like_json_loads(size: int) -> None:
+    assert list(iter_json_array(_split(DOCUMENT, size))) == json.loads(DOCUMENT)
+
+
+def test_split_at_every_position() -> None:
+    expected = json.loads(DOCUMENT)
+    for cut in range(len(DOCUMENT) + 1):
+        assert list(iter_json_array([DOCUMENT[:cut], DOCUMENT[cut:]])) == expected, cut
+
+
+def test_text_chunks_and_empty_arrays() -> None:
+    assert list(iter_json_array([' [ 1 ,', "2 ] \n"])) == [1, 2]
+    assert list(iter_json_array([b"[", b"", b"]"])) == []
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        "",
+        "{}",
+        "[1 2]",
+        "[1,]",
+        "[,1]",
+        "[1] 2",
+        "[1]]",
+        "[1",
+        "[1,",
+        '["open',
+        "[[1}]",
+        '[{"a" 1}]',
+        "[tru]",
+        "[12x]",
+        "[1}",
+        '[{"a": 1}, }]',
+    ],
+)
+def test_malformed_documents_raise(document: str) -> None:
+    with pytest.raises(ValueError):
+        list(iter_json_array(_split(document.encode(), 2)))
+
+
+def test_errors_are_raised_without_reading_ahead() -> None:
+    read: List[bytes] = []
+
+    def chunks() -> Iterator[bytes]:
+        for chunk in [b"[1, 2", b" 3", b", 4]", *[b"[5]"] * 100]:
+            read.append(chunk)
+            yield chunk
+
+    elements = iter_json_array(chunks())
+    assert [next(elements), next(elements)] == [1, 2]
+    with pytest.raises(ValueError, match="Expected ','"):
+        next(elements)
+    assert read == [b"[1, 2", b" 3"]
@@ -1,5 +1,20 @@
 """Trend tracker package for meme trend analytics."""
 
-from .tracker import TrendTracker
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .tracker import TrendTracker
 
 __all__ = ["TrendTracker"]
+
+
+def __getattr__(name: str) -> object:
+    # Importing the tracker pulls in every module; short CLI paths such as
+    # ``--report-only`` only need a couple of them.
+    if name == "TrendTracker":
+        from .tracker import TrendTracker
+
+        return TrendTracker
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,9 +4,20 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Iterable, List
+from operator import attrgetter
+from typing import Any, Callable, Container, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from .data_models import MetricSnapshot, TrendRecord
+from .compat import numpy_available
+from .data_models import TrendRecord
+
+
+_TIMESTAMP = attrgetter("timestamp")
+_TZINFO = attrgetter("tzinfo")
+_HISTORY = attrgetter("history")
+_SAMPLE_TIMES = attrgetter("timestamps")
+_SAMPLE_VIEWS = attrgetter("views")
+_COUNTERS = tuple(attrgetter(name) for name in ("views", "likes", "comments", "shares"))
+_COUNTS = attrgetter("views", "likes", "comments", "shares")
 
 
 @dataclass(slots=True)
@@ -18,18 +29,58 @@ class TrendMetrics:
     virality_score: float
 
 
-def calculate_metrics(records: Iterable[TrendRecord]) -> List[TrendMetrics]:
-    """Return computed metrics for each meme clip."""
+@dataclass(slots=True)
+class MetricsBatch:
+    """Column-wise metrics for a batch of records, aligned with ``records``."""
+
+    records: List[TrendRecord]
+    engagement_rate: Any
+    velocity_per_hour: Any
+    acceleration_per_hour: Any
+    virality_score: Any
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def to_metrics(self) -> List[TrendMetrics]:
+        return [
+            TrendMetrics(
+                record=record,
+                engagement_rate=engagement_rate,
+                velocity_per_hour=velocity,
+                acceleration_per_hour=acceleration,
+                virality_score=virality_score,
+            )
+            for record, engagement_rate, velocity, acceleration, virality_score in zip(
+                self.records,
+                self.engagement_rate.tolist(),
+                self.velocity_per_hour.tolist(),
+                self.acceleration_per_hour.tolist(),
+                self.virality_score.tolist(),
+            )
+        ]
+
+
+def calculate_metrics(
+    records: Iterable[TrendRecord], *, as_of: Optional[datetime] = None
+) -> List[TrendMetrics]:
+    """Return computed metrics for each meme clip.
 
+    Virality freshness is measured against ``as_of`` (default: now), which is
+    read once so every record in the call is scored against the same instant.
+    """
+
+    now = _as_of_epoch(as_of)
     metrics: List[TrendMetrics] = []
     for record in records:
-        snapshots = list(record.iter_history())
-        if len(snapshots) < 2:
-            snapshots.append(record.current_snapshot())
+        times, views = record.view_series(last=3)
+        if len(times) < 2:
+            times.append(record.timestamp.timestamp())
+            views.append(record.views)
         engagement_rate = _engagement_rate(record)
-        velocity = _velocity_per_hour(snapshots)
-        acceleration = _acceleration_per_hour(snapshots)
-        virality_score = _virality(record, engagement_rate, velocity)
+        velocity = _velocity_per_hour(times, views)
+        acceleration = _acceleration_per_hour(times, views)
+        virality_score = _virality(record, engagement_rate, velocity, now)
         metrics.append(
             TrendMetrics(
                 record=record,
@@ -42,39 +93,231 @@ def calculate_metrics(records: Iterable[TrendRecord]) -> List[TrendMetrics]:
     return metrics
 
 
+def compute_metrics(records: Iterable[TrendRecord], *, as_of: Optional[datetime] = None) -> List[TrendMetrics]:
+    """Compute metrics with the vectorized engine when NumPy is installed."""
+
+    if numpy_available():
+        return calculate_metrics_batch(records, as_of=as_of).to_metrics()
+    return calculate_metrics(records, as_of=as_of)
+
+
+class MetricsCache:
+    """Reuse the metrics of memes whose counters did not move since they were scored.
+
+    A meme outside the store's ``changed`` keys only gained a flat snapshot,
+    so its velocity is zero, its acceleration is minus the velocity it had
+    last time and its engagement is unchanged. With zero velocity, freshness
+    drops out of the virality score, so not even its timestamp is read.
+    Results are identical to scoring from scratch. An entry is only trusted
+    when the snapshot that was current when the meme was scored was newer
+    than its whole history, and the history sample that was newest then is
+    now second newest, i.e. that snapshot was appended at the end; anything
+    else is scored again. Scoring reads no further back than that, so the
+    check holds for stores that hand back only the newest samples. The store
+    marks a poll older than the newest sample as changed, so a hit stays at
+    the end. Once a meme has been flat for two polls its metrics object
+    itself is reused.
+
+    ``scored`` holds the positions, in the last result, of the records that
+    were handed to ``score``.
+    """
+
+    def __init__(self) -> None:
+        # key -> (counters, metrics, newest history sample, whether the current snapshot is newer)
+        self._entries: Dict[str, Tuple[Tuple[int, int, int, int], TrendMetrics, Optional[float], bool]] = {}
+        self.scored: List[int] = []
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def compute(
+        self,
+        records: Sequence[TrendRecord],
+        changed: Container[str],
+        *,
+        as_of: Optional[datetime] = None,
+        full: bool = True,
+        score: Optional[Callable[..., List[TrendMetrics]]] = None,
+    ) -> List[TrendMetrics]:
+        """Metrics for ``records`` in order, scoring only the changed ones.
+
+        ``score`` (default ``compute_metrics``) is called with the records to
+        score and ``as_of``. A ``full`` pass forgets memes it did not see.
+        """
+
+        entries = self._entries
+        fresh = {} if full else entries
+        metrics: List[Optional[TrendMetrics]] = []
+        pending: List[Tuple[int, str]] = []
+        for record in records:
+            key = f"{record.platform}:{record.external_id}"
+            entry = None if key in changed else entries.get(key)
+            if entry is not None:
+                counters, metric, last, newest = entry
+                times = record.history.timestamps
+                size = len(times)
+                appended = size >= 2 and times[-2] == last if last is not None else size == 1
+                if newest and appended and _COUNTS(record) == counters:
+                    velocity = metric.velocity_per_hour
+                    if velocity != 0.0 or metric.acceleration_per_hour != 0.0 or metric.record is not record:
+                        engagement = metric.engagement_rate
+                        acceleration = 0.0 - velocity if size >= 2 else 0.0
+                        metric = TrendMetrics(record, engagement, 0.0, acceleration, (engagement * 0.6 + 0.0) * 100)
+                    metrics.append(metric)
+                    fresh[key] = (counters, metric, times[-1], True)
+                    continue
+            pending.append((len(metrics), key))
+            metrics.append(None)
+        self.hits += len(metrics) - len(pending)
+        self.misses += len(pending)
+        self.scored = [position for position, _ in pending]
+        if pending:
+            scored = (score or compute_metrics)([records[position] for position, _ in pending], as_of=as_of)
+            for (position, key), metric in zip(pending, scored):
+                metrics[position] = metric
+                record = metric.record
+                times = record.history.timestamps
+                last = times[-1] if times else None
+                newest = last is None or record.timestamp.timestamp() >= last
+                fresh[key] = (_COUNTS(record), metric, last, newest)
+        self._entries = fresh
+        return metrics
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def calculate_metrics_batch(
+    records: Iterable[TrendRecord], *, as_of: Optional[datetime] = None
+) -> MetricsBatch:
+    """Vectorized equivalent of ``calculate_metrics`` backed by NumPy.
+
+    The last three snapshots of every record are gathered into ``(N, 4)``
+    arrays once, after which every metric is a handful of array operations.
+    Results match ``calculate_metrics`` for the same ``as_of``.
+    """
+
+    import numpy as np
+
+    records = list(records)
+    now = _as_of_epoch(as_of)
+    count = len(records)
+
+    # Gather through C-level ``map`` calls rather than a Python loop per record.
+    timestamps = list(map(_TIMESTAMP, records))
+    epochs = np.fromiter(map(datetime.timestamp, timestamps), dtype=np.float64, count=count)
+    current = np.empty((count, 4), dtype=np.int64)
+    for column, getter in enumerate(_COUNTERS):
+        current[:, column] = np.fromiter(map(getter, records), dtype=np.int64, count=count)
+
+    # One ``join`` per column copies every history into a flat buffer, which is
+    # about twice as fast as three ``itemgetter`` passes over a million arrays.
+    histories = list(map(_HISTORY, records))
+    history_times = list(map(_SAMPLE_TIMES, histories))
+    lengths = np.fromiter(map(len, history_times), dtype=np.int64, count=count)
+    flat_times = np.frombuffer(b"".join(history_times), dtype=np.float64)
+    flat_views = np.frombuffer(b"".join(map(_SAMPLE_VIEWS, histories)), dtype=np.int64)
+    ends = np.cumsum(lengths)
+    times = np.full((count, 4), -np.inf)
+    views = np.zeros((count, 4), dtype=np.float64)
+    for offset in (1, 2, 3):
+        rows = lengths >= offset
+        picks = ends[rows] - offset
+        times[rows, 3 - offset] = flat_times[picks]
+        views[rows, 3 - offset] = flat_views[picks]
+    times[:, 3] = epochs
+    views[:, 3] = current[:, 0]
+
+    # Virality reads naive timestamps as UTC, unlike ``datetime.timestamp``.
+    freshness_epochs = epochs
+    if not all(map(_TZINFO, timestamps)):
+        freshness_epochs = np.fromiter(map(_utc_epoch, timestamps), dtype=np.float64, count=count)
+
+    return MetricsBatch(records, *score_columns(np, now, current, freshness_epochs, lengths, times, views))
+
+
+def score_columns(
+    np: Any, now: float, current: Any, freshness_epochs: Any, lengths: Any, times: Any, views: Any
+) -> Tuple[Any, Any, Any, Any]:
+    """Engagement, velocity, acceleration and virality arrays from gathered columns.
+
+    ``current`` holds the four counters per record, ``lengths`` the history
+    sizes, and ``times``/``views`` are ``(N, 4)`` arrays with the last three
+    history samples (left-padded) followed by the current snapshot. Rows of
+    ``times`` and ``views`` may be reordered in place.
+    """
+
+    # The current snapshot sits last unless history holds later samples; only
+    # those rows need a (stable) reorder to mirror ``iter_history``.
+    unordered = np.flatnonzero(times[:, 3] < times[:, 2])
+    if unordered.size:
+        order = np.argsort(times[unordered], axis=1, kind="stable")
+        times[unordered] = np.take_along_axis(times[unordered], order, axis=1)
+        views[unordered] = np.take_along_axis(views[unordered], order, axis=1)
+
+    denominators = np.maximum(current[:, 0], 1)
+    engagement = (current[:, 1] + current[:, 2] + current[:, 3]) / denominators
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        velocity = _segment_velocities(np, times[:, 2], times[:, 3], views[:, 2], views[:, 3])
+        previous = _segment_velocities(np, times[:, 1], times[:, 2], views[:, 1], views[:, 2])
+    velocity = np.where(lengths >= 1, velocity, 0.0)
+    acceleration = np.where(lengths >= 2, velocity - previous, 0.0)
+
+    freshness = np.maximum((now - freshness_epochs) / 3600, 1)
+    weighted = velocity / freshness
+    virality = (engagement * 0.6 + np.minimum(weighted / denominators, 1.0) * 0.4) * 100
+    return engagement, velocity, acceleration, virality
+
+
+def segment_velocity(start_time: float, end_time: float, start_views: int, end_views: int) -> float:
+    """Views gained per hour between two samples given as epoch seconds."""
+
+    delta_time = (end_time - start_time) / 3600 or 1e-6
+    return (end_views - start_views) / delta_time
+
+
+def _segment_velocities(np: Any, start_times: Any, end_times: Any, start_views: Any, end_views: Any) -> Any:
+    delta_time = (end_times - start_times) / 3600
+    delta_time = np.where(delta_time == 0, 1e-6, delta_time)
+    return (end_views - start_views) / delta_time
+
+
 def _engagement_rate(record: TrendRecord) -> float:
     denominator = max(record.views, 1)
     return (record.likes + record.comments + record.shares) / denominator
 
 
-def _velocity_per_hour(snapshots: List[MetricSnapshot]) -> float:
-    if len(snapshots) < 2:
+def _velocity_per_hour(times: Sequence[float], views: Sequence[int]) -> float:
+    if len(times) < 2:
         return 0.0
-    start, end = snapshots[-2], snapshots[-1]
-    delta_views = end.views - start.views
-    delta_time = (end.timestamp - start.timestamp).total_seconds() / 3600 or 1e-6
-    return delta_views / delta_time
+    return segment_velocity(times[-2], times[-1], views[-2], views[-1])
 
 
-def _acceleration_per_hour(snapshots: List[MetricSnapshot]) -> float:
-    if len(snapshots) < 3:
-        return 0.0
-    velocities = []
-    for first, second in zip(snapshots[:-1], snapshots[1:]):
-        delta_views = second.views - first.views
-        delta_time = (second.timestamp - first.timestamp).total_seconds() / 3600 or 1e-6
-        velocities.append(delta_views / delta_time)
-    if len(velocities) < 2:
+def _acceleration_per_hour(times: Sequence[float], views: Sequence[int]) -> float:
+    if len(times) < 3:
         return 0.0
-    return velocities[-1] - velocities[-2]
+    latest = segment_velocity(times[-2], times[-1], views[-2], views[-1])
+    previous = segment_velocity(times[-3], times[-2], views[-3], views[-2])
+    return latest - previous
 
 
-def _virality(record: TrendRecord, engagement_rate: float, velocity: float) -> float:
-    now = datetime.now(timezone.utc)
-    timestamp = record.timestamp
-    if timestamp.tzinfo is None:
-        timestamp = timestamp.replace(tzinfo=timezone.utc)
-    freshness_hours = max((now - timestamp).total_seconds() / 3600, 1)
+def _virality(record: TrendRecord, engagement_rate: float, velocity: float, now: float) -> float:
+    freshness_hours = max((now - _utc_epoch(record.timestamp)) / 3600, 1)
     weighted_velocity = velocity / freshness_hours
     normalization = max(record.views, 1)
     return (engagement_rate * 0.6 + min(weighted_velocity / normalization, 1.0) * 0.4) * 100
+
+
+def _as_of_epoch(as_of: Optional[datetime]) -> float:
+    return _utc_epoch(as_of) if as_of is not None else datetime.now(timezone.utc).timestamp()
+
+
+def _utc_epoch(timestamp: datetime) -> float:
+    """Epoch seconds, reading naive timestamps as UTC like the virality score always has."""
+
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
@@ -0,0 +1,394 @@
+"""Near-duplicate clustering of memes with MinHash signatures and an LSH index."""
+
+from __future__ import annotations
+
+import random
+import re
+import zlib
+from array import array
+from operator import eq
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .analyzer import TrendMetrics
+from .compat import numpy_available
+from .config import TrackerConfig
+from .data_models import TrendRecord
+from .forecaster import TrendForecast
+
+
+_WORD = re.compile(r"\w\w+")
+_MASK = (1 << 64) - 1
+_LOW_BITS = (1 << 32) - 1
+_BAND_MULTIPLIER = 1_000_003
+# splitmix64 finalizer constants; each MinHash permutation mixes ``hash ^ seed``.
+_MIX1 = 0xBF58476D1CE4E5B9
+_MIX2 = 0x94D049BB133111EB
+_BATCH = 4096
+_BUCKET_SIZE = 4  # memes kept per LSH bucket, newest last
+
+
+@dataclass(slots=True)
+class ClusterSummary:
+    """Aggregates over the memes of one cluster, best member first.
+
+    ``views`` and ``velocity_per_hour`` are summed over the members, and
+    ``virality_score`` is the best member's.
+    """
+
+    cluster_id: str
+    members: List[TrendMetrics]
+    views: int
+    velocity_per_hour: float
+    virality_score: float
+    platforms: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def projected_views(
+        self, forecast_for: Callable[[TrendRecord], Optional[TrendForecast]]
+    ) -> List[Tuple[int, float]]:
+        """Projected views of all members summed per hour ahead.
+
+        ``forecast_for`` is typically ``TrackerResult.forecast_for``; members
+        without a forecast count with their current views.
+        """
+
+        totals: List[float] = []
+        current = 0
+        for metric in self.members:
+            forecast = forecast_for(metric.record)
+            if forecast is None or not forecast.projected_views:
+                current += metric.record.views
+                continue
+            for hour, (_, views) in enumerate(forecast.projected_views):
+                if hour < len(totals):
+                    totals[hour] += views
+                else:
+                    totals.append(views)
+        return [(hour, total + current) for hour, total in enumerate(totals, start=1)]
+
+
+class ClusterIndex:
+    """Incrementally assign memes to clusters of near-duplicate text.
+
+    Each meme's ``title``, ``caption`` and ``tags`` are reduced to a set of
+    lower-cased words (hashtags lose their ``#``) and summarized by a MinHash
+    signature of ``num_perm`` values. The signature is cut into ``bands``
+    bands, and a new meme is only compared with memes that share a band, so
+    it costs ``bands`` dict lookups rather than a comparison with every other
+    meme. Pairs whose word sets have a Jaccard similarity above about
+    ``(1 / bands) ** (bands / num_perm)`` share a band with high probability;
+    they are merged when their signatures agree on at least ``threshold`` of
+    their values, which keeps short, unrelated texts from chaining together.
+
+    Only memes that are new or whose text changed are hashed again. Clusters
+    only ever merge: a meme whose text is edited joins the clusters it now
+    matches but stays in its old one. A cluster is named after the key of its
+    oldest member. Each band bucket remembers the last ``_BUCKET_SIZE`` memes
+    that fell into it.
+
+    ``discard`` drops evicted memes. A cluster is forgotten with its last
+    member, and relinked around the discarded ones once they outnumber the
+    members left, so the index stays proportional to the memes it holds.
+    """
+
+    def __init__(self, *, num_perm: int = 32, bands: int = 8, threshold: float = 0.5, seed: int = 1) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.threshold = threshold
+        self.rows = num_perm // bands
+        generator = random.Random(seed)
+        self._seeds = [generator.getrandbits(64) for _ in range(num_perm)]
+        self._texts: Dict[str, int] = {}
+        # Low 32 bits of each MinHash value, to confirm band matches.
+        self._signatures: Dict[str, array] = {}
+        # Band values of each signature, to leave their buckets again.
+        self._band_values: Dict[str, array] = {}
+        self._parent: Dict[str, str] = {}
+        # Cluster root -> every key linked below it, and how many are not discarded.
+        self._members: Dict[str, List[str]] = {}
+        self._live: Dict[str, int] = {}
+        # Combined hash of (band, band values) -> the last keys that had it.
+        self._buckets: Dict[int, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def update(self, records: Iterable[TrendRecord]) -> int:
+        """Index new memes and memes whose text changed; return how many."""
+
+        pending: List[Tuple[str, List[str]]] = []
+        texts = self._texts
+        for record in records:
+            key = f"{record.platform}:{record.external_id}"
+            text = hash((record.title, record.caption, tuple(record.tags)))
+            previous = texts.get(key)
+            if previous == text:
+                continue
+            if previous is None and key in self._parent:
+                # Discarded, but its cluster lived on: it counts again.
+                self._live[self.cluster_of(key)] += 1
+            texts[key] = text
+            pending.append((key, _tokens(record)))
+        if not pending:
+            return 0
+        if numpy_available():
+            bands = self._bands_batch([tokens for _, tokens in pending])
+        else:
+            bands = [self._bands(tokens) for _, tokens in pending]
+        for (key, _), (values, signature) in zip(pending, bands):
+            self._insert(key, values, signature)
+        return len(pending)
+
+    def cluster_of(self, key: str) -> str:
+        """Cluster id of ``key``; a meme that was never indexed is its own cluster."""
+
+        parent = self._parent
+        root = parent.get(key)
+        if root is None:
+            return key
+        while True:
+            above = parent[root]
+            if above == root:
+                return root
+            # Path halving keeps later lookups short.
+            parent[root] = root = parent[above]
+
+    def summarize(self, metrics: Iterable[TrendMetrics], *, min_size: int = 2) -> List[ClusterSummary]:
+        """Group ``metrics`` by cluster, fastest growing clusters first.
+
+        Clusters with fewer than ``min_size`` of the given memes are left out.
+        """
+
+        groups: Dict[str, List[TrendMetrics]] = {}
+        cluster_of = self.cluster_of
+        for metric in metrics:
+            record = metric.record
+            cluster = cluster_of(f"{record.platform}:{record.external_id}")
+            members = groups.get(cluster)
+            if members is None:
+                groups[cluster] = [metric]
+            else:
+                members.append(metric)
+        summaries = []
+        for cluster, members in groups.items():
+            if len(members) < min_size:
+                continue
+            members.sort(key=_virality, reverse=True)
+            summaries.append(
+                ClusterSummary(
+                    cluster_id=cluster,
+                    members=members,
+                    views=sum(metric.record.views for metric in members),
+                    velocity_per_hour=sum(metric.velocity_per_hour for metric in members),
+                    virality_score=members[0].virality_score,
+                    platforms=sorted({metric.record.platform for metric in members}),
+                )
+            )
+        summaries.sort(key=_velocity, reverse=True)
+        return summaries
+
+    def discard(self, keys: Iterable[str]) -> None:
+        """Forget ``keys``, e.g. memes the store evicted; they are hashed
+        again if seen later.
+
+        Their cluster links stay while the cluster has other members, so the
+        clusters they joined hold together.
+        """
+
+        texts = self._texts
+        for key in keys:
+            if texts.pop(key, None) is None:
+                continue
+            self._signatures.pop(key, None)
+            self._leave_buckets(key)
+            root = self.cluster_of(key)
+            self._live[root] -= 1
+            live = self._live[root]
+            if live == 0:
+                del self._live[root]
+                for member in self._members.pop(root):
+                    del self._parent[member]
+            elif len(self._members[root]) > 2 * live:
+                self._relink(root)
+
+    def _relink(self, root: str) -> None:
+        """Link the remaining members of ``root``'s cluster directly to its
+        root, dropping the discarded ones."""
+
+        texts = self._texts
+        parent = self._parent
+        members = self._members.pop(root)
+        del self._live[root]
+        kept = [member for member in members if member in texts]
+        if root not in texts:
+            # A member that is left names the cluster from now on.
+            root = kept[0]
+        for member in members:
+            if member in texts:
+                parent[member] = root
+            else:
+                del parent[member]
+        self._members[root] = kept
+        self._live[root] = len(kept)
+
+    def _insert(self, key: str, values: Optional[List[int]], signature: Optional[array]) -> None:
+        parent = self._parent
+        if key not in parent:
+            parent[key] = key
+            self._members[key] = [key]
+            self._live[key] = 1
+        self._leave_buckets(key)
+        signatures = self._signatures
+        if values is None:
+            signatures.pop(key, None)
+            return
+        signatures[key] = signature
+        self._band_values[key] = array("Q", values)
+        buckets = self._buckets
+        needed = self.threshold * self.num_perm
+        root = self.cluster_of(key)
+        for value in values:
+            bucket = buckets.get(value)
+            if bucket is None:
+                buckets[value] = [key]
+                continue
+            for other in bucket:
+                other_root = self.cluster_of(other)
+                if other_root == root or sum(map(eq, signature, signatures[other])) < needed:
+                    continue
+                # The cluster found first is older, so it keeps its name.
+                root = self._union(root, other_root)
+            if len(bucket) >= _BUCKET_SIZE:
+                del bucket[0]
+            bucket.append(key)
+
+    def _union(self, root: str, other_root: str) -> str:
+        """Link cluster ``root`` below ``other_root`` and return the latter."""
+
+        self._parent[root] = other_root
+        members = self._members
+        moved, kept = members.pop(root), members[other_root]
+        if len(moved) > len(kept):
+            moved, kept = kept, moved
+        kept.extend(moved)
+        members[other_root] = kept
+        self._live[other_root] += self._live.pop(root)
+        return other_root
+
+    def _leave_buckets(self, key: str) -> None:
+        values = self._band_values.pop(key, None)
+        if values is None:
+            return
+        buckets = self._buckets
+        for value in values:
+            bucket = buckets.get(value)
+            if bucket is not None and key in bucket:
+                bucket.remove(key)
+                if not bucket:
+                    del buckets[value]
+
+    def _bands(self, tokens: List[str]) -> Tuple[Optional[List[int]], Optional[array]]:
+        """LSH band values and compact signature of one meme's words."""
+
+        if not tokens:
+            return None, None
+        hashes = [zlib.crc32(token.encode()) for token in tokens]
+        signature = [min(_mix(value ^ seed) for value in hashes) for seed in self._seeds]
+        rows = self.rows
+        values = []
+        for band in range(self.bands):
+            combined = band
+            for value in signature[band * rows : (band + 1) * rows]:
+                combined = ((combined * _BAND_MULTIPLIER) ^ value) & _MASK
+            values.append(combined)
+        return values, array("I", [value & _LOW_BITS for value in signature])
+
+    def _bands_batch(
+        self, token_lists: Sequence[List[str]]
+    ) -> List[Tuple[Optional[List[int]], Optional[array]]]:
+        """``_bands`` for many memes at once, in chunks of ``_BATCH`` memes."""
+
+        import numpy as np
+
+        seeds = np.array(self._seeds, dtype=np.uint64)
+        multiplier = np.uint64(_BAND_MULTIPLIER)
+        low_bits = np.uint64(_LOW_BITS)
+        results: List[Tuple[Optional[List[int]], Optional[array]]] = []
+        for start in range(0, len(token_lists), _BATCH):
+            chunk = token_lists[start : start + _BATCH]
+            present = [tokens for tokens in chunk if tokens]
+            if not present:
+                results.extend([(None, None)] * len(chunk))
+                continue
+            lengths = np.fromiter(map(len, present), dtype=np.int64, count=len(present))
+            words = list(chain.from_iterable(present))
+            hashes = np.fromiter(map(zlib.crc32, map(str.encode, words)), dtype=np.uint64, count=len(words))
+            permuted = _mix_array(np, hashes[:, None] ^ seeds)
+            offsets = np.concatenate(([0], np.cumsum(lengths[:-1])))
+            signatures = np.minimum.reduceat(permuted, offsets, axis=0)
+            banded = signatures.reshape(len(present), self.bands, self.rows)
+            combined = np.broadcast_to(np.arange(self.bands, dtype=np.uint64), banded.shape[:2]).copy()
+            for row in range(self.rows):
+                combined = (combined * multiplier) ^ banded[:, :, row]
+            compact = (signatures & low_bits).astype(np.uint32).tobytes()
+            width = 4 * self.num_perm
+            found = enumerate(combined.tolist())
+            for tokens in chunk:
+                if not tokens:
+                    results.append((None, None))
+                    continue
+                position, values = next(found)
+                signature = array("I")
+                signature.frombytes(compact[position * width : (position + 1) * width])
+                results.append((values, signature))
+        return results
+
+
+def build_cluster_index(config: TrackerConfig) -> Optional[ClusterIndex]:
+    """Create the cluster index if clustering is enabled in the configuration."""
+
+    if not config.clustering:
+        return None
+    return ClusterIndex(
+        num_perm=config.cluster_permutations, bands=config.cluster_bands, threshold=config.cluster_threshold
+    )
+
+
+def _tokens(record: TrendRecord) -> List[str]:
+    words = set(_WORD.findall(record.title.lower()))
+    if record.caption:
+        words.update(_WORD.findall(record.caption.lower()))
+    words.update(tag.lstrip("#").lower() for tag in record.tags if tag)
+    words.discard("")
+    return list(words)
+
+
+def _mix(value: int) -> int:
+    value = ((value ^ (value >> 30)) * _MIX1) & _MASK
+    value = ((value ^ (value >> 27)) * _MIX2) & _MASK
+    return value ^ (value >> 31)
+
+
+def _mix_array(np: Any, values: Any) -> Any:
+    """``_mix`` over a ``uint64`` array; the multiplications wrap like the mask."""
+
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(_MIX1)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(_MIX2)
+    return values ^ (values >> np.uint64(31))
+
+
+def _virality(metric: TrendMetrics) -> float:
+    return metric.virality_score
+
+
+def _velocity(summary: ClusterSummary) -> float:
+    return summary.velocity_per_hour
+
+
+__all__ = ["ClusterIndex", "ClusterSummary", "build_cluster_index"]
@@ -0,0 +1,11 @@
+"""Checks for optional dependencies shared by the vectorized code paths."""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from importlib.util import find_spec
+
+
+@lru_cache(maxsize=None)
+def numpy_available() -> bool:
+    return find_spec("numpy") is not None
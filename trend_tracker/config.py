@@ -14,6 +14,8 @@ class TikTokConfig:
     rapidapi_key: Optional[str] = None
     apify_token: Optional[str] = None
     country: Optional[str] = None
+    page_size: Optional[int] = None  # paginate dataset_url with offset/limit
+    item_url: Optional[str] = None  # per-item endpoint template, e.g. ".../{id}"
 
 
 @dataclass(slots=True)
@@ -23,6 +25,8 @@ class InstagramConfig:
     dataset_url: Optional[str] = None
     apify_token: Optional[str] = None
     country: Optional[str] = None
+    page_size: Optional[int] = None  # paginate dataset_url with offset/limit
+    item_url: Optional[str] = None  # per-item endpoint template, e.g. ".../{id}"
 
 
 @dataclass(slots=True)
@@ -31,6 +35,39 @@ class TrackerConfig:
     instagram: InstagramConfig
     polling_interval: int = 900  # seconds
     storage_path: str = "tracker_state.json"
+    storage_backend: str = "json"  # "json", "log" (append per poll) or "sqlite"
+    history_format: str = "json"  # "json" inline, "columnar" binary archive or "delta" varint-packed archive
+    history_compression: bool = False  # zlib-compress each record's block of a "delta" archive
+    fetch_workers: int = 4
+    fetch_timeout: float = 30.0  # seconds per source
+    ingest_chunk_size: int = 1000  # records handed from fetch workers to the store at a time
+    refresh_budget: int = 100  # per-meme refresh requests per polling interval (daemon mode)
+    min_refresh_interval: float = 60.0  # seconds
+    max_refresh_interval: float = 3600.0  # seconds
+    retention_raw_hours: Optional[float] = None  # raw snapshots kept this long, rolled up after; None keeps all
+    retention_hourly_days: float = 7.0  # hourly rollups until this age, daily after
+    retention_max_age_days: Optional[float] = None  # drop rollups older than this
+    record_ttl_days: Optional[float] = None  # evict records no poll has returned for this long
+    archive_path: Optional[str] = None  # append evicted records to this JSON lines file
+    max_extra_fields: int = 0  # unmapped payload fields kept per stored record
+    forecast_resolution: Optional[float] = None  # seconds; fit forecasts on history resampled to this
+    forecast_model: str = "linear"  # "linear" refits the history, "holt" reads smoothed state kept by the store
+    holt_alpha: float = 0.5  # weight of each new snapshot in the smoothed level
+    holt_beta: float = 0.3  # weight of each new slope in the smoothed trend
+    holt_damping: float = 0.9  # per-hour decay of the trend; 1 extends it linearly
+    ranking_size: int = 50  # memes kept in the incremental top-K ranking
+    forecast_cache_size: int = 10_000  # forecasts memoized across polls
+    analytics_workers: int = 0  # experimental: processes scoring polls in shards; 0 or 1 scores in-process
+    clustering: bool = False  # group near-duplicate memes by their text
+    cluster_permutations: int = 32  # MinHash values per meme
+    cluster_bands: int = 8  # LSH bands; more bands match less similar text
+    cluster_threshold: float = 0.5  # share of MinHash values two memes must agree on to merge
+    tag_index: bool = False  # keep per-hashtag aggregates up to date in the store
+    tag_half_life: float = 3600.0  # seconds; half-life of each tag's moving average velocity
+    api_host: str = "127.0.0.1"  # interface the read API listens on
+    api_port: Optional[int] = None  # serve the latest poll over HTTP on this port (daemon mode); None disables
+    instrument: bool = False  # collect per-stage timings and counters
+    profile_interval: Optional[float] = None  # seconds between profiler samples; None disables profiling
 
 
 def load_config() -> TrackerConfig:
@@ -42,6 +79,8 @@ def load_config() -> TrackerConfig:
         rapidapi_key=getenv("TIKTOK_RAPIDAPI_KEY"),
         apify_token=getenv("TIKTOK_APIFY_TOKEN"),
         country=getenv("TIKTOK_COUNTRY"),
+        page_size=_optional_int(getenv("TIKTOK_PAGE_SIZE")),
+        item_url=getenv("TIKTOK_ITEM_URL"),
     )
 
     instagram = InstagramConfig(
@@ -50,14 +89,88 @@ def load_config() -> TrackerConfig:
         rapidapi_key=getenv("INSTAGRAM_RAPIDAPI_KEY"),
         apify_token=getenv("INSTAGRAM_APIFY_TOKEN"),
         country=getenv("INSTAGRAM_COUNTRY"),
+        page_size=_optional_int(getenv("INSTAGRAM_PAGE_SIZE")),
+        item_url=getenv("INSTAGRAM_ITEM_URL"),
     )
 
     polling_interval = int(getenv("TREND_TRACKER_INTERVAL", "900"))
     storage_path = getenv("TREND_TRACKER_STATE", "tracker_state.json")
+    storage_backend = getenv("TREND_TRACKER_STORE", "json")
+    history_format = getenv("TREND_TRACKER_HISTORY_FORMAT", "json")
+    history_compression = getenv("TREND_TRACKER_HISTORY_COMPRESSION", "").lower() in ("1", "true", "yes")
+    fetch_workers = int(getenv("TREND_TRACKER_FETCH_WORKERS", "4"))
+    fetch_timeout = float(getenv("TREND_TRACKER_FETCH_TIMEOUT", "30"))
+    refresh_budget = int(getenv("TREND_TRACKER_REFRESH_BUDGET", "100"))
+    min_refresh_interval = float(getenv("TREND_TRACKER_MIN_REFRESH", "60"))
+    max_refresh_interval = float(getenv("TREND_TRACKER_MAX_REFRESH", "3600"))
+    retention_raw_hours = _optional_float(getenv("TREND_TRACKER_RETAIN_RAW_HOURS"))
+    retention_hourly_days = float(getenv("TREND_TRACKER_RETAIN_HOURLY_DAYS", "7"))
+    retention_max_age_days = _optional_float(getenv("TREND_TRACKER_RETAIN_MAX_AGE_DAYS"))
+    record_ttl_days = _optional_float(getenv("TREND_TRACKER_RECORD_TTL_DAYS"))
+    archive_path = getenv("TREND_TRACKER_ARCHIVE")
+    max_extra_fields = int(getenv("TREND_TRACKER_MAX_EXTRA_FIELDS", "0"))
+    forecast_resolution = _optional_float(getenv("TREND_TRACKER_FORECAST_RESOLUTION"))
+    forecast_model = getenv("TREND_TRACKER_FORECAST_MODEL", "linear")
+    holt_alpha = float(getenv("TREND_TRACKER_HOLT_ALPHA", "0.5"))
+    holt_beta = float(getenv("TREND_TRACKER_HOLT_BETA", "0.3"))
+    holt_damping = float(getenv("TREND_TRACKER_HOLT_DAMPING", "0.9"))
+    ranking_size = int(getenv("TREND_TRACKER_RANKING_SIZE", "50"))
+    forecast_cache_size = int(getenv("TREND_TRACKER_FORECAST_CACHE", "10000"))
+    analytics_workers = int(getenv("TREND_TRACKER_ANALYTICS_WORKERS", "0"))
+    clustering = getenv("TREND_TRACKER_CLUSTERING", "").lower() in ("1", "true", "yes")
+    cluster_permutations = int(getenv("TREND_TRACKER_CLUSTER_PERMUTATIONS", "32"))
+    cluster_bands = int(getenv("TREND_TRACKER_CLUSTER_BANDS", "8"))
+    cluster_threshold = float(getenv("TREND_TRACKER_CLUSTER_THRESHOLD", "0.5"))
+    tag_index = getenv("TREND_TRACKER_TAG_INDEX", "").lower() in ("1", "true", "yes")
+    tag_half_life = float(getenv("TREND_TRACKER_TAG_HALF_LIFE", "3600"))
+    api_host = getenv("TREND_TRACKER_API_HOST", "127.0.0.1")
+    api_port = _optional_int(getenv("TREND_TRACKER_API_PORT"))
+    instrument = getenv("TREND_TRACKER_INSTRUMENT", "").lower() in ("1", "true", "yes")
+    profile_interval = _optional_float(getenv("TREND_TRACKER_PROFILE_INTERVAL"))
 
     return TrackerConfig(
         tiktok=tiktok,
         instagram=instagram,
         polling_interval=polling_interval,
         storage_path=storage_path,
+        storage_backend=storage_backend,
+        history_format=history_format,
+        history_compression=history_compression,
+        fetch_workers=fetch_workers,
+        fetch_timeout=fetch_timeout,
+        refresh_budget=refresh_budget,
+        min_refresh_interval=min_refresh_interval,
+        max_refresh_interval=max_refresh_interval,
+        retention_raw_hours=retention_raw_hours,
+        retention_hourly_days=retention_hourly_days,
+        retention_max_age_days=retention_max_age_days,
+        record_ttl_days=record_ttl_days,
+        archive_path=archive_path,
+        max_extra_fields=max_extra_fields,
+        forecast_resolution=forecast_resolution,
+        forecast_model=forecast_model,
+        holt_alpha=holt_alpha,
+        holt_beta=holt_beta,
+        holt_damping=holt_damping,
+        ranking_size=ranking_size,
+        forecast_cache_size=forecast_cache_size,
+        analytics_workers=analytics_workers,
+        clustering=clustering,
+        cluster_permutations=cluster_permutations,
+        cluster_bands=cluster_bands,
+        cluster_threshold=cluster_threshold,
+        tag_index=tag_index,
+        tag_half_life=tag_half_life,
+        api_host=api_host,
+        api_port=api_port,
+        instrument=instrument,
+        profile_interval=profile_interval,
     )
+
+
+def _optional_int(value: Optional[str]) -> Optional[int]:
+    return int(value) if value else None
+
+
+def _optional_float(value: Optional[str]) -> Optional[float]:
+    return float(value) if value else None
@@ -0,0 +1,108 @@
+"""Long-running tracker loop with adaptive per-meme refreshes."""
+
+from __future__ import annotations
+
+import logging
+import signal
+import threading
+import time
+from typing import Callable, Optional
+
+from .scheduler import AdaptiveScheduler
+from .tracker import TrackerResult, TrendTracker
+
+
+logger = logging.getLogger(__name__)
+
+
+class TrackerDaemon:
+    """Keep the store in memory and poll continuously.
+
+    A full poll of every source runs each ``config.polling_interval`` seconds
+    to discover new memes. In between, the scheduler picks individual memes
+    to refresh through sources that support item refreshes, favouring those
+    that are gaining views fastest. A step that raises is logged and retried
+    after a backoff that doubles from ``tick`` up to the polling interval.
+    Stopping the daemon (``stop()``, SIGINT or SIGTERM) finishes the current
+    step, then flushes the store and closes the tracker.
+    """
+
+    def __init__(
+        self,
+        tracker: TrendTracker,
+        scheduler: Optional[AdaptiveScheduler] = None,
+        *,
+        on_poll: Optional[Callable[[TrackerResult], None]] = None,
+        tick: float = 5.0,
+    ) -> None:
+        config = tracker.config
+        self.tracker = tracker
+        if scheduler is None:
+            scheduler = AdaptiveScheduler(
+                min_interval=config.min_refresh_interval,
+                max_interval=config.max_refresh_interval,
+                base_interval=config.polling_interval,
+                budget=config.refresh_budget,
+                budget_window=config.polling_interval,
+            )
+        self.scheduler = scheduler
+        self.on_poll = on_poll
+        self.tick = tick
+        self._stop = threading.Event()
+
+    def stop(self, *_: object) -> None:
+        self._stop.set()
+
+    def run(self) -> None:
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self.stop)
+            signal.signal(signal.SIGTERM, self.stop)
+        interval = self.tracker.config.polling_interval
+        refreshable = self.tracker.supports_refresh
+        next_poll = time.monotonic()
+        failures = 0
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                try:
+                    if now >= next_poll:
+                        self._step(self.tracker.run_once(), full=True)
+                        next_poll = now + interval
+                    elif refreshable:
+                        keys = self.scheduler.due(now)
+                        if keys:
+                            logger.debug("Refreshing %d memes", len(keys))
+                            self._step(self.tracker.refresh(keys), full=False)
+                except Exception:
+                    # A failed full poll keeps ``next_poll`` and is retried after the backoff.
+                    failures += 1
+                    delay = min(self.tick * 2 ** (failures - 1), interval)
+                    logger.exception("Tracker step failed, retrying in %.1fs", delay)
+                    self._stop.wait(delay)
+                    continue
+                failures = 0
+                self._stop.wait(self._sleep_for(next_poll, refreshable))
+        finally:
+            logger.info("Flushing tracker state")
+            try:
+                self.tracker.store.save()
+            finally:
+                self.tracker.close()
+
+    def _step(self, result: TrackerResult, *, full: bool) -> None:
+        # Evicted memes must not be refreshed back into the store.
+        self.scheduler.forget(result.evicted)
+        self.scheduler.observe(result.metrics)
+        if full and self.on_poll is not None:
+            self.on_poll(result)
+
+    def _sleep_for(self, next_poll: float, refreshable: bool) -> float:
+        wake = next_poll
+        if refreshable:
+            wakeup = self.scheduler.next_wakeup()
+            if wakeup is not None:
+                wake = min(wake, wakeup)
+        return min(max(wake - time.monotonic(), 0.0), self.tick)
+
+
+__all__ = ["TrackerDaemon"]
@@ -2,9 +2,15 @@
 
 from __future__ import annotations
 
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import Dict, Iterable, List, Optional
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 
 @dataclass(slots=True)
@@ -28,6 +34,304 @@ class MetricSnapshot:
         )
 
 
+_COUNTER_FIELDS = ("views", "likes", "comments", "shares")
+_HISTORY_HEADER = struct.Struct("<QB")
+_ARCHIVE_MAGIC = b"TTHA\x01"
+_ARCHIVE_ENTRY = struct.Struct("<I")
+_EMPTY_FLOATS = array("d")
+_EMPTY_INTS = array("q")
+# Payload keys ``TrendRecord.from_dict`` consumes; everything else goes to ``extra``.
+_RECORD_FIELDS = frozenset(
+    {
+        "id",
+        "external_id",
+        "title",
+        "description",
+        "author",
+        "username",
+        "url",
+        "permalink",
+        "caption",
+        "language",
+        "tags",
+        "country",
+        "timestamp",
+        "views",
+        "likes",
+        "comments",
+        "shares",
+        "history",
+    }
+)
+
+
+class SnapshotHistory:
+    """Columnar, time-ordered container of metric snapshots.
+
+    Timestamps are kept as epoch seconds in a ``float64`` array and the counters
+    in ``int64`` arrays, so a sample costs 40 bytes instead of a dataclass plus
+    a ``datetime`` and four boxed ints. Iterating or indexing still produces
+    ``MetricSnapshot`` objects. Appends keep the columns sorted by timestamp;
+    snapshots sharing a timestamp stay in insertion order.
+    """
+
+    __slots__ = ("timestamps", "views", "likes", "comments", "shares", "_naive")
+
+    def __init__(self, snapshots: Iterable[MetricSnapshot] = ()) -> None:
+        # Slicing an empty array is about twice as fast as ``array(typecode)``,
+        # which matters because every freshly fetched record starts empty.
+        self.timestamps = _EMPTY_FLOATS[:]
+        self.views = _EMPTY_INTS[:]
+        self.likes = _EMPTY_INTS[:]
+        self.comments = _EMPTY_INTS[:]
+        self.shares = _EMPTY_INTS[:]
+        self._naive: Optional[bool] = None
+        for snapshot in snapshots:
+            self.append(snapshot)
+
+    @classmethod
+    def from_columns(
+        cls,
+        timestamps: array,
+        views: array,
+        likes: array,
+        comments: array,
+        shares: array,
+        *,
+        naive: Optional[bool] = False,
+    ) -> "SnapshotHistory":
+        """Adopt already sorted columns without copying them."""
+
+        history = cls()
+        history.timestamps = timestamps
+        history.views = views
+        history.likes = likes
+        history.comments = comments
+        history.shares = shares
+        history._naive = naive if len(timestamps) else None
+        return history
+
+    def append(self, snapshot: MetricSnapshot) -> None:
+        if self._naive is None:
+            self._naive = snapshot.timestamp.tzinfo is None
+        self.append_values(
+            snapshot.timestamp.timestamp(),
+            snapshot.views,
+            snapshot.likes,
+            snapshot.comments,
+            snapshot.shares,
+        )
+
+    def append_values(self, timestamp: float, views: int, likes: int, comments: int, shares: int) -> None:
+        """Insert a sample given as epoch seconds and raw counters."""
+
+        if self._naive is None:
+            self._naive = False
+        timestamps = self.timestamps
+        if not timestamps or timestamp >= timestamps[-1]:
+            timestamps.append(timestamp)
+            self.views.append(views)
+            self.likes.append(likes)
+            self.comments.append(comments)
+            self.shares.append(shares)
+            return
+        index = bisect_right(timestamps, timestamp)
+        timestamps.insert(index, timestamp)
+        self.views.insert(index, views)
+        self.likes.insert(index, likes)
+        self.comments.insert(index, comments)
+        self.shares.insert(index, shares)
+
+    def extend(self, snapshots: Iterable[MetricSnapshot]) -> None:
+        for snapshot in snapshots:
+            self.append(snapshot)
+
+    def copy(self) -> "SnapshotHistory":
+        return self.from_columns(*(array(column.typecode, column) for column in self._columns()), naive=self._naive)
+
+    def select(self, indices: Iterable[int]) -> "SnapshotHistory":
+        """Return a new history holding the samples at ascending ``indices``."""
+
+        indices = list(indices)
+        return self.from_columns(
+            *(array(column.typecode, map(column.__getitem__, indices)) for column in self._columns()),
+            naive=self._naive,
+        )
+
+    def rollup_indices(self, resolution: float, start: int = 0, stop: Optional[int] = None) -> List[int]:
+        """Indices of the last sample in each ``resolution``-second bucket of
+        ``[start, stop)``.
+
+        Counters are cumulative, so the last sample of a bucket carries
+        everything the earlier ones did.
+        """
+
+        timestamps = self.timestamps
+        stop = len(timestamps) if stop is None else stop
+        kept = [
+            index
+            for index in range(start, stop - 1)
+            if timestamps[index] // resolution != timestamps[index + 1] // resolution
+        ]
+        if stop > start:
+            kept.append(stop - 1)
+        return kept
+
+    def resample(self, resolution: float) -> "SnapshotHistory":
+        """Keep the last sample of every ``resolution``-second bucket.
+
+        Returns this history itself when no bucket holds more than one sample.
+        """
+
+        indices = self.rollup_indices(resolution)
+        if len(indices) == len(self.timestamps):
+            return self
+        return self.select(indices)
+
+    def to_datetime(self, timestamp: float) -> datetime:
+        if self._naive:
+            return datetime.fromtimestamp(timestamp)
+        return datetime.fromtimestamp(timestamp, timezone.utc)
+
+    def as_numpy(self) -> Dict[str, Any]:
+        """Return zero-copy NumPy views over the columns.
+
+        The views share memory with this history, so the history cannot grow
+        while any of them is alive.
+        """
+
+        import numpy as np
+
+        return {
+            "timestamps": np.frombuffer(self.timestamps, dtype=np.float64),
+            **{name: np.frombuffer(getattr(self, name), dtype=np.int64) for name in _COUNTER_FIELDS},
+        }
+
+    def write(self, handle: BinaryIO) -> None:
+        """Write the columns as a length-prefixed little-endian block."""
+
+        handle.write(_HISTORY_HEADER.pack(len(self.timestamps), 1 if self._naive else 0))
+        for column in self._columns():
+            if sys.byteorder == "big":
+                column = array(column.typecode, column)
+                column.byteswap()
+            column.tofile(handle)
+
+    @classmethod
+    def read(cls, buffer: Union[bytes, memoryview, mmap.mmap], offset: int = 0) -> Tuple["SnapshotHistory", int]:
+        """Decode a block written by ``write``; return it and the next offset.
+
+        Each column is copied straight out of ``buffer`` once, so the history
+        stays valid after a memory-mapped ``buffer`` is closed.
+        """
+
+        count, naive = _HISTORY_HEADER.unpack_from(buffer, offset)
+        offset += _HISTORY_HEADER.size
+        columns = []
+        with memoryview(buffer) as view:
+            for typecode in "dqqqq":
+                column = array(typecode)
+                end = offset + count * column.itemsize
+                column.frombytes(view[offset:end])
+                if sys.byteorder == "big":
+                    column.byteswap()
+                columns.append(column)
+                offset = end
+        return cls.from_columns(*columns, naive=bool(naive)), offset
+
+    def _columns(self) -> Tuple[array, array, array, array, array]:
+        return self.timestamps, self.views, self.likes, self.comments, self.shares
+
+    def _snapshot(self, index: int) -> MetricSnapshot:
+        return MetricSnapshot(
+            timestamp=self.to_datetime(self.timestamps[index]),
+            views=self.views[index],
+            likes=self.likes[index],
+            comments=self.comments[index],
+            shares=self.shares[index],
+        )
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __bool__(self) -> bool:
+        return bool(self.timestamps)
+
+    def __iter__(self) -> Iterator[MetricSnapshot]:
+        for index in range(len(self.timestamps)):
+            yield self._snapshot(index)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[MetricSnapshot, "SnapshotHistory"]:
+        if isinstance(index, slice):
+            return self.from_columns(*(column[index] for column in self._columns()), naive=self._naive)
+        if index < 0:
+            index += len(self.timestamps)
+        if not 0 <= index < len(self.timestamps):
+            raise IndexError("history index out of range")
+        return self._snapshot(index)
+
+    def __add__(self, other: Iterable[MetricSnapshot]) -> "SnapshotHistory":
+        combined = self.copy()
+        combined.extend(other)
+        return combined
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, list):
+            other = SnapshotHistory(other)
+        if not isinstance(other, SnapshotHistory):
+            return NotImplemented
+        return self._columns() == other._columns()
+
+    def __repr__(self) -> str:
+        return f"SnapshotHistory({len(self.timestamps)} snapshots)"
+
+
+def save_histories(path: str, histories: Dict[str, SnapshotHistory]) -> None:
+    """Write many keyed histories into one binary archive."""
+
+    with open(path, "wb") as handle:
+        handle.write(_ARCHIVE_MAGIC)
+        for key, history in histories.items():
+            encoded = key.encode("utf-8")
+            handle.write(_ARCHIVE_ENTRY.pack(len(encoded)))
+            handle.write(encoded)
+            history.write(handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+
+
+def load_histories(path: str) -> Dict[str, SnapshotHistory]:
+    """Read an archive written by ``save_histories`` through a memory map.
+
+    Every column is copied out of the map once, into the arrays the
+    histories keep; nothing refers to the file afterwards. Delta archives
+    (``history_codec.save_delta_histories``) are recognized by their magic
+    and decoded with that module.
+    """
+
+    histories: Dict[str, SnapshotHistory] = {}
+    with open(path, "rb") as handle:
+        if not handle.seek(0, 2):
+            return histories
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            # ``history_codec`` imports this module, so it is imported here.
+            from .history_codec import DELTA_MAGIC, load_delta_histories
+
+            if buffer[: len(DELTA_MAGIC)] == DELTA_MAGIC:
+                return load_delta_histories(path)
+            if buffer[: len(_ARCHIVE_MAGIC)] != _ARCHIVE_MAGIC:
+                raise ValueError(f"Not a history archive: {path}")
+            offset = len(_ARCHIVE_MAGIC)
+            size = len(buffer)
+            while offset < size:
+                (key_length,) = _ARCHIVE_ENTRY.unpack_from(buffer, offset)
+                offset += _ARCHIVE_ENTRY.size
+                key = buffer[offset : offset + key_length].decode("utf-8")
+                offset += key_length
+                histories[key], offset = SnapshotHistory.read(buffer, offset)
+    return histories
+
+
 @dataclass(slots=True)
 class TrendRecord:
     """Normalized payload across the supported platforms."""
@@ -46,15 +350,17 @@ class TrendRecord:
     likes: int = 0
     comments: int = 0
     shares: int = 0
-    history: List[MetricSnapshot] = field(default_factory=list)
+    history: SnapshotHistory = field(default_factory=SnapshotHistory)
     extra: Dict[str, object] = field(default_factory=dict)
 
+    def __post_init__(self) -> None:
+        if not isinstance(self.history, SnapshotHistory):
+            self.history = SnapshotHistory(self.history)
+
     @classmethod
     def from_dict(cls, payload: Dict[str, object], platform: str) -> "TrendRecord":
         history_payload = payload.get("history") or []
-        history: List[MetricSnapshot] = [
-            MetricSnapshot.from_dict(item) for item in history_payload
-        ]
+        history = SnapshotHistory(MetricSnapshot.from_dict(item) for item in history_payload)
         return cls(
             platform=platform,
             external_id=str(payload.get("id") or payload.get("external_id")),
@@ -71,30 +377,48 @@ class TrendRecord:
             comments=int(payload.get("comments", 0)),
             shares=int(payload.get("shares", 0)),
             history=history,
-            extra={k: v for k, v in payload.items() if k not in {
-                "id",
-                "external_id",
-                "title",
-                "description",
-                "author",
-                "username",
-                "url",
-                "permalink",
-                "caption",
-                "language",
-                "tags",
-                "country",
-                "timestamp",
-                "views",
-                "likes",
-                "comments",
-                "shares",
-                "history",
-            }},
+            extra={k: v for k, v in payload.items() if k not in _RECORD_FIELDS},
         )
 
     def iter_history(self) -> Iterable[MetricSnapshot]:
-        yield from sorted(self.history + [self.current_snapshot()], key=lambda snap: snap.timestamp)
+        history = self.history
+        index = bisect_right(history.timestamps, self.timestamp.timestamp())
+        for position in range(index):
+            yield history[position]
+        yield self.current_snapshot()
+        for position in range(index, len(history)):
+            yield history[position]
+
+    def view_series(
+        self, last: Optional[int] = None, *, resolution: Optional[float] = None
+    ) -> Tuple[array, array]:
+        """Return epoch timestamps and view counts of the history plus the
+        current snapshot, in time order, optionally limited to the ``last`` ones.
+
+        With ``resolution`` the stored history is first reduced to its last
+        sample per ``resolution`` seconds.
+        """
+
+        history = self.history if resolution is None else self.history.resample(resolution)
+        start = 0 if last is None else max(len(history) - last, 0)
+        times = history.timestamps[start:]
+        views = history.views[start:]
+        current = self.timestamp.timestamp()
+        index = bisect_right(times, current)
+        times.insert(index, current)
+        views.insert(index, self.views)
+        if last is not None and len(times) > last:
+            del times[: len(times) - last]
+            del views[: len(views) - last]
+        return times, views
+
+    def last_timestamp(self) -> datetime:
+        """Timestamp of the most recent snapshot including the current one."""
+
+        history = self.history
+        if history and history.timestamps[-1] > self.timestamp.timestamp():
+            return history.to_datetime(history.timestamps[-1])
+        return self.timestamp
 
     def current_snapshot(self) -> MetricSnapshot:
         return MetricSnapshot(
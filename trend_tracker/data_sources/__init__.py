@@ -13,21 +13,25 @@ def build_tiktok_source(config: TikTokConfig, sample_path: Optional[str] = None)
     if sample_path:
         return LocalJSONSource("tiktok", sample_path)
     if config.dataset_url:
-        return HTTPJSONSource("tiktok", config.dataset_url)
+        return HTTPJSONSource(
+            "tiktok", config.dataset_url, stream=True, page_size=config.page_size, item_url=config.item_url
+        )
     headers = {
         "User-Agent": "Mozilla/5.0",
     }
     params = {}
     if config.country:
         params["region"] = config.country
-    return HTTPJSONSource("tiktok", config.api_url, headers=headers, params=params)
+    return HTTPJSONSource("tiktok", config.api_url, headers=headers, params=params, item_url=config.item_url)
 
 
 def build_instagram_source(config: InstagramConfig, sample_path: Optional[str] = None) -> TrendDataSource:
     if sample_path:
         return LocalJSONSource("instagram", sample_path)
     if config.dataset_url:
-        return HTTPJSONSource("instagram", config.dataset_url)
+        return HTTPJSONSource(
+            "instagram", config.dataset_url, stream=True, page_size=config.page_size, item_url=config.item_url
+        )
     headers = {"User-Agent": "Mozilla/5.0"}
     if config.rapidapi_key:
         headers.update(
@@ -39,4 +43,11 @@ def build_instagram_source(config: InstagramConfig, sample_path: Optional[str] =
     params = {}
     if config.country:
         params["country"] = config.country
-    return HTTPJSONSource("instagram", config.api_url, headers=headers, params=params, payload_path="result")
+    return HTTPJSONSource(
+        "instagram",
+        config.api_url,
+        headers=headers,
+        params=params,
+        payload_path="result",
+        item_url=config.item_url,
+    )
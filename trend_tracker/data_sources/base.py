@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Iterable, List
+from typing import Iterable, Iterator, List, Optional, Sequence
 
 from ..data_models import TrendRecord
 
@@ -12,10 +12,33 @@ class TrendDataSource(ABC):
     """Interface for retrieving normalized trend records."""
 
     platform: str
+    name: Optional[str] = None
+    bytes_received: int = 0  # payload bytes read so far, for instrumentation
+    normalize_seconds: float = 0.0  # time spent turning payload items into records so far
 
     @abstractmethod
     def fetch_latest(self) -> List[TrendRecord]:
         """Retrieve the most recent records from the platform."""
 
+    def iter_latest(self) -> Iterator[TrendRecord]:
+        """Yield the most recent records as they are parsed.
+
+        Sources that can parse their payload incrementally override this so
+        callers can consume large datasets without holding them in memory.
+        """
+
+        yield from self.fetch_latest()
+
+    @property
+    def supports_item_refresh(self) -> bool:
+        """Whether ``fetch_items`` can re-fetch individual records."""
+
+        return False
+
+    def fetch_items(self, external_ids: Sequence[str]) -> List[TrendRecord]:
+        """Re-fetch specific records by their platform id."""
+
+        raise NotImplementedError(f"{type(self).__name__} cannot refresh individual records")
+
     def __iter__(self) -> Iterable[TrendRecord]:
-        return iter(self.fetch_latest())
+        return self.iter_latest()
@@ -3,17 +3,79 @@
 from __future__ import annotations
 
 import json
-from datetime import datetime
-from typing import Dict, List, Optional
-
-import requests
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from importlib.util import find_spec
+from itertools import count
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Sequence
+from urllib.parse import quote
 
 from ..data_models import TrendRecord
 from .base import TrendDataSource
+from .schema import SchemaMapper
+from .streaming import chunked, iter_json_array
+
+if TYPE_CHECKING:
+    import requests
+
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_BATCH_SIZE = 256  # streamed items mapped to records at a time
+
+
+def _accept_encoding() -> str:
+    # urllib3 only decodes brotli when one of the brotli packages is installed.
+    if find_spec("brotli") or find_spec("brotlicffi"):
+        return "gzip, deflate, br"
+    return "gzip, deflate"
+
+
+def build_session(pool_size: int = 4) -> requests.Session:
+    """Create a keep-alive session with a connection pool per host."""
+
+    # Imported here: ``requests`` takes longer to import than the rest of the CLI.
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["Accept-Encoding"] = _accept_encoding()
+    return session
 
 
 class HTTPJSONSource(TrendDataSource):
-    """Generic HTTP source that expects JSON payloads."""
+    """Generic HTTP source that expects JSON payloads.
+
+    Requests go through a pooled keep-alive session and are conditional on the
+    last ``ETag``/``Last-Modified`` seen, so an unchanged dataset answers 304
+    and the previously normalized records are returned as they are. Connection
+    errors, timeouts, 429 and 5xx responses are retried up to ``max_retries``
+    times with full-jitter exponential backoff, honouring ``Retry-After`` up
+    to ``backoff_cap`` seconds. With a ``timeout``, no retry is made that
+    would start after ``timeout`` seconds from the first attempt; the last
+    response or error is returned or raised instead.
+
+    With ``stream`` or ``page_size`` set, a top-level JSON array is parsed
+    incrementally and ``iter_latest`` yields records as they arrive. Pages are
+    requested with ``offset``/``limit`` parameters, at most ``pages_in_flight``
+    at a time, until a page comes back short. The first streamed or paged
+    request is conditional as well; a 304 there replays the records of the
+    last complete fetch, which are kept when the response had a validator.
+
+    ``item_url`` is an optional template such as ``.../video/{id}`` used by
+    ``fetch_items`` to refresh individual records, one request per id.
+    """
 
     def __init__(
         self,
@@ -22,77 +84,317 @@ class HTTPJSONSource(TrendDataSource):
         headers: Optional[Dict[str, str]] = None,
         params: Optional[Dict[str, str]] = None,
         payload_path: Optional[str] = None,
+        *,
+        name: Optional[str] = None,
+        timeout: Optional[float] = None,
+        session: Optional[requests.Session] = None,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+        stream: bool = False,
+        page_size: Optional[int] = None,
+        pages_in_flight: int = 2,
+        offset_param: str = "offset",
+        limit_param: str = "limit",
+        item_url: Optional[str] = None,
+        item_payload_path: Optional[str] = None,
     ) -> None:
         self.platform = platform
+        self.name = name
         self.url = url
         self.headers = headers or {}
         self.params = params or {}
         self.payload_path = payload_path
+        self.timeout = timeout
+        self._session = session
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.stream = stream
+        self.page_size = page_size
+        self.pages_in_flight = max(pages_in_flight, 1)
+        self.offset_param = offset_param
+        self.limit_param = limit_param
+        self.item_url = item_url
+        self.item_payload_path = item_payload_path
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._cached: Optional[List[TrendRecord]] = None
+        self._mapper = SchemaMapper(platform)
+        self._stats_lock = threading.Lock()
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        """The pooled session, created on first use."""
+
+        if self._session is None:
+            # Pages may be requested from several threads at once.
+            with self._session_lock:
+                if self._session is None:
+                    self._session = build_session()
+        return self._session
 
     def fetch_latest(self) -> List[TrendRecord]:  # noqa: D401 - see base class
-        response = requests.get(self.url, headers=self.headers, params=self.params, timeout=30)
+        if self._streaming:
+            return list(self.iter_latest())
+        response = self._request(self._conditional_headers())
+        if self._unchanged(response):
+            return self._cached
         response.raise_for_status()
-        data = response.json()
-        if self.payload_path:
-            for segment in self.payload_path.split("."):
-                data = data[segment]
-        if isinstance(data, dict):
-            data = data.get("items") or data.get("list") or data.get("data") or []
+        self._received(len(response.content))
+        records = self._parse(response.json())
+        self._remember(response, records)
+        return records
+
+    def iter_latest(self) -> Iterator[TrendRecord]:  # noqa: D401 - see base class
+        if not self._streaming:
+            yield from self.fetch_latest()
+        elif self.page_size:
+            yield from self._iter_pages()
+        else:
+            yield from self._iter_stream()
+
+    @property
+    def supports_item_refresh(self) -> bool:
+        return self.item_url is not None
+
+    def fetch_items(self, external_ids: Sequence[str]) -> List[TrendRecord]:
+        if self.item_url is None:
+            return super().fetch_items(external_ids)
         records: List[TrendRecord] = []
-        for entry in data:
-            normalized = self._normalize(entry)
-            records.append(normalized)
+        for external_id in external_ids:
+            url = self.item_url.format(id=quote(str(external_id), safe=""))
+            # The listing's query parameters do not apply to the item endpoint.
+            response = self._request(dict(self.headers), params={}, url=url)
+            response.raise_for_status()
+            self._received(len(response.content))
+            data = _follow(response.json(), self.item_payload_path)
+            records.extend(self._mapped(data if isinstance(data, list) else [data]))
         return records
 
-    def _normalize(self, payload: Dict[str, object]) -> TrendRecord:
-        timestamp = payload.get("timestamp") or payload.get("createTime")
-        if isinstance(timestamp, (int, float)):
-            timestamp = datetime.fromtimestamp(float(timestamp))
-        item = {
-            "id": payload.get("id") or payload.get("video_id") or payload.get("aweme_id"),
-            "title": payload.get("title") or payload.get("desc") or payload.get("caption", ""),
-            "author": payload.get("author", {}).get("uniqueId")
-            if isinstance(payload.get("author"), dict)
-            else payload.get("author")
-            or payload.get("username")
-            or payload.get("user"),
-            "url": payload.get("permalink")
-            or payload.get("video_url")
-            or payload.get("share_url")
-            or payload.get("url"),
-            "caption": payload.get("caption") or payload.get("desc"),
-            "language": payload.get("language"),
-            "tags": payload.get("hashtags") or payload.get("challenges") or [],
-            "timestamp": timestamp,
-            "views": payload.get("playCount")
-            or payload.get("view_count")
-            or payload.get("views")
-            or 0,
-            "likes": payload.get("diggCount")
-            or payload.get("like_count")
-            or payload.get("likes")
-            or 0,
-            "comments": payload.get("commentCount")
-            or payload.get("comment_count")
-            or payload.get("comments")
-            or 0,
-            "shares": payload.get("shareCount")
-            or payload.get("share_count")
-            or payload.get("shares")
-            or 0,
-            "history": payload.get("history", []),
-        }
-        return TrendRecord.from_dict(item, self.platform)
+    @property
+    def _streaming(self) -> bool:
+        return (self.stream or bool(self.page_size)) and not self.payload_path
+
+    def _iter_pages(self) -> Iterator[TrendRecord]:
+        offsets = count(0, self.page_size)
+        # Only the first page is conditional: its 304 means nothing changed.
+        first = self._request(self._conditional_headers(), params=self._page_params(next(offsets)), stream=True)
+        if self._unchanged(first):
+            yield from self._cached
+            return
+        kept: Optional[List[TrendRecord]] = [] if _validated(first) else None
+        with ThreadPoolExecutor(max_workers=self.pages_in_flight, thread_name_prefix="trend-page") as executor:
+            pending = deque(executor.submit(self._fetch_page, next(offsets)) for _ in range(self.pages_in_flight - 1))
+            try:
+                page = [record for chunk in self._read_stream(first) for record in chunk]
+                while True:
+                    if kept is not None:
+                        kept.extend(page)
+                    yield from page
+                    if len(page) < self.page_size:
+                        break
+                    pending.append(executor.submit(self._fetch_page, next(offsets)))
+                    page = pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+        self._remember(first, kept)
+
+    def _fetch_page(self, offset: int) -> List[TrendRecord]:
+        response = self._request(dict(self.headers), params=self._page_params(offset), stream=True)
+        return [record for chunk in self._read_stream(response) for record in chunk]
+
+    def _page_params(self, offset: int) -> Dict[str, object]:
+        return {**self.params, self.offset_param: offset, self.limit_param: self.page_size}
+
+    def _iter_stream(self) -> Iterator[TrendRecord]:
+        response = self._request(self._conditional_headers(), stream=True)
+        if self._unchanged(response):
+            yield from self._cached
+            return
+        kept: Optional[List[TrendRecord]] = [] if _validated(response) else None
+        for chunk in self._read_stream(response):
+            if kept is not None:
+                kept.extend(chunk)
+            yield from chunk
+        self._remember(response, kept)
+
+    def _read_stream(self, response: requests.Response) -> Iterator[List[TrendRecord]]:
+        with response:
+            response.raise_for_status()
+            entries = iter_json_array(self._counted(response.iter_content(chunk_size=STREAM_CHUNK_SIZE)))
+            for chunk in chunked(entries, STREAM_BATCH_SIZE):
+                yield self._mapped(chunk)
+
+    def _conditional_headers(self) -> Dict[str, str]:
+        """Request headers, with the last validators once there are records to reuse."""
+
+        headers = dict(self.headers)
+        if self._cached is not None:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+        return headers
+
+    def _unchanged(self, response: requests.Response) -> bool:
+        if response.status_code != 304 or self._cached is None:
+            return False
+        response.close()
+        logger.debug("%s unchanged since last poll", self.url)
+        return True
+
+    def _remember(self, response: requests.Response, records: Optional[List[TrendRecord]]) -> None:
+        """Keep ``records`` and the response's validators for the next conditional request."""
+
+        self._etag = response.headers.get("ETag")
+        self._last_modified = response.headers.get("Last-Modified")
+        self._cached = records if _validated(response) else None
+
+    def _counted(self, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            self._received(len(chunk))
+            yield chunk
+
+    def _received(self, size: int) -> None:
+        # Pages are fetched from several threads at once.
+        with self._stats_lock:
+            self.bytes_received += size
+
+    def _mapped(self, payloads: Iterable[Dict[str, object]]) -> List[TrendRecord]:
+        started = time.perf_counter()
+        records = self._mapper.map(payloads)
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self.normalize_seconds += elapsed
+        return records
+
+    def _request(
+        self,
+        headers: Dict[str, str],
+        *,
+        params: Optional[Dict[str, object]] = None,
+        stream: bool = False,
+        url: Optional[str] = None,
+    ) -> requests.Response:
+        import requests
+
+        url = url or self.url
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        attempt = 0
+        while True:
+            try:
+                response = self.session.get(
+                    url,
+                    headers=headers,
+                    params=self.params if params is None else params,
+                    timeout=self.timeout or 30,
+                    stream=stream,
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                delay = self._backoff(attempt)
+                if attempt >= self.max_retries or _past(deadline, delay):
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = _retry_after(response)
+                delay = self._backoff(attempt) if delay is None else min(delay, self.backoff_cap)
+                if _past(deadline, delay):
+                    return response
+                response.close()
+            attempt += 1
+            logger.debug("Retrying %s in %.2fs (attempt %d)", url, delay, attempt)
+            time.sleep(delay)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2**attempt))
+
+    def _parse(self, data: object) -> List[TrendRecord]:
+        data = _follow(data, self.payload_path)
+        if isinstance(data, dict):
+            data = data.get("items") or data.get("list") or data.get("data") or []
+        return self._mapped(data)
+
+
+def _follow(data: object, payload_path: Optional[str]) -> object:
+    if payload_path:
+        for segment in payload_path.split("."):
+            data = data[segment]
+    return data
+
+
+def _past(deadline: Optional[float], delay: float) -> bool:
+    """Whether waiting ``delay`` seconds would overrun ``deadline``."""
+
+    return deadline is not None and time.monotonic() + delay >= deadline
+
+
+def _validated(response: requests.Response) -> bool:
+    """Whether ``response`` carries a validator for conditional requests."""
+
+    return bool(response.headers.get("ETag") or response.headers.get("Last-Modified"))
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """Seconds to wait according to a ``Retry-After`` header, if any."""
+
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max((moment - datetime.now(timezone.utc)).total_seconds(), 0.0)
 
 
 class LocalJSONSource(TrendDataSource):
     """Local file source used for sample or offline runs."""
 
-    def __init__(self, platform: str, path: str) -> None:
+    def __init__(self, platform: str, path: str, *, name: Optional[str] = None) -> None:
         self.platform = platform
+        self.name = name
         self.path = path
 
     def fetch_latest(self) -> List[TrendRecord]:  # noqa: D401 - see base class
-        with open(self.path, "r", encoding="utf-8") as handle:
-            data = json.load(handle)
-        return [TrendRecord.from_dict(item, self.platform) for item in data]
+        with open(self.path, "rb") as handle:
+            content = handle.read()
+        self.bytes_received += len(content)
+        data = json.loads(content)
+        return self._mapped(data)
+
+    @property
+    def supports_item_refresh(self) -> bool:
+        return True
+
+    def fetch_items(self, external_ids: Sequence[str]) -> List[TrendRecord]:
+        wanted = set(external_ids)
+        return [record for record in self.iter_latest() if record.external_id in wanted]
+
+    def iter_latest(self) -> Iterator[TrendRecord]:  # noqa: D401 - see base class
+        with open(self.path, "rb") as handle:
+            items = iter_json_array(self._counted(iter(partial(handle.read, STREAM_CHUNK_SIZE), b"")))
+            for chunk in chunked(items, STREAM_BATCH_SIZE):
+                yield from self._mapped(chunk)
+
+    def _counted(self, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            self.bytes_received += len(chunk)
+            yield chunk
+
+    def _mapped(self, items: Iterable[Dict[str, object]]) -> List[TrendRecord]:
+        started = time.perf_counter()
+        records = [TrendRecord.from_dict(item, self.platform) for item in items]
+        self.normalize_seconds += time.perf_counter() - started
+        return records
@@ -0,0 +1,201 @@
+"""Compiled mapping of raw platform items into ``TrendRecord`` objects."""
+
+from __future__ import annotations
+
+from dataclasses import MISSING, fields
+from datetime import datetime
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from ..data_models import MetricSnapshot, SnapshotHistory, TrendRecord, _ensure_datetime
+
+
+# Candidate keys per field, in the order they are tried. The first truthy
+# value wins, so a compiled mapper only has to know which keys are present.
+_ID_KEYS = ("id", "video_id", "aweme_id")
+_TITLE_KEYS = ("title", "desc", "caption")
+_AUTHOR_KEYS = ("author", "username", "user")
+_URL_KEYS = ("permalink", "video_url", "share_url", "url")
+_CAPTION_KEYS = ("caption", "desc")
+_TAG_KEYS = ("hashtags", "challenges")
+_TIMESTAMP_KEYS = ("timestamp", "createTime")
+_VIEW_KEYS = ("playCount", "view_count", "views")
+_LIKE_KEYS = ("diggCount", "like_count", "likes")
+_COMMENT_KEYS = ("commentCount", "comment_count", "comments")
+_SHARE_KEYS = ("shareCount", "share_count", "shares")
+
+_RELEVANT_KEYS = frozenset(
+    _ID_KEYS
+    + _TITLE_KEYS
+    + _AUTHOR_KEYS
+    + _URL_KEYS
+    + _CAPTION_KEYS
+    + _TAG_KEYS
+    + _TIMESTAMP_KEYS
+    + _VIEW_KEYS
+    + _LIKE_KEYS
+    + _COMMENT_KEYS
+    + _SHARE_KEYS
+    + ("language", "history")
+)
+
+Normalizer = Callable[[Dict[str, object], Callable[[object], datetime]], TrendRecord]
+
+
+class SchemaMapper:
+    """Map raw API items of one platform straight into ``TrendRecord`` objects.
+
+    The first item's key layout is compiled into a function that indexes the
+    present keys directly and skips the absent ones, instead of trying every
+    alternative name with ``.get``. Items with a different layout get their
+    own compiled function, so mixed payloads stay correct. Fields not found
+    fall back as before: ``"unknown"`` author, zero counters, the current
+    time for a missing timestamp, and epoch timestamps read as local time.
+    """
+
+    max_layouts = 64
+
+    def __init__(self, platform: str) -> None:
+        self.platform = platform
+        # The last layout seen and its normalizer, swapped as one tuple so
+        # threads mapping pages concurrently never pair them up wrongly.
+        self._current: Optional[Tuple[FrozenSet[str], Normalizer]] = None
+        self._by_layout: Dict[FrozenSet[str], Normalizer] = {}
+        self._compiled: Dict[FrozenSet[str], Normalizer] = {}
+
+    def map_one(self, payload: Dict[str, object]) -> TrendRecord:
+        return self._resolve(payload)[1](payload, convert_timestamp)
+
+    def map(self, payloads: Iterable[Dict[str, object]]) -> List[TrendRecord]:
+        """Map many items, converting repeated timestamps only once."""
+
+        convert = TimestampConverter()
+        layout, normalizer = self._current or (None, None)
+        records: List[TrendRecord] = []
+        append = records.append
+        for payload in payloads:
+            if payload.keys() != layout:
+                layout, normalizer = self._resolve(payload)
+            append(normalizer(payload, convert))
+        return records
+
+    def _resolve(self, payload: Dict[str, object]) -> Tuple[FrozenSet[str], Normalizer]:
+        current = self._current
+        if current is not None and payload.keys() == current[0]:
+            return current
+        layout = frozenset(payload)
+        normalizer = self._by_layout.get(layout)
+        if normalizer is None:
+            if len(self._by_layout) >= self.max_layouts:
+                self._by_layout.clear()
+                self._compiled.clear()
+            relevant = layout & _RELEVANT_KEYS
+            normalizer = self._compiled.get(relevant)
+            if normalizer is None:
+                normalizer = self._compiled[relevant] = _compile(self.platform, relevant)
+            self._by_layout[layout] = normalizer
+        current = self._current = (layout, normalizer)
+        return current
+
+
+class TimestampConverter:
+    """Convert raw timestamps like ``convert_timestamp``, memoizing repeats.
+
+    Items of one response often share timestamps (``createTime`` buckets,
+    identical ISO strings), so each distinct value is parsed once.
+    """
+
+    __slots__ = ("_seen", "_now")
+
+    def __init__(self) -> None:
+        self._seen: Dict[Tuple[type, object], datetime] = {}
+        self._now: Optional[datetime] = None
+
+    def __call__(self, value: object) -> datetime:
+        if not value and not isinstance(value, (int, float)):
+            if self._now is None:
+                self._now = datetime.utcnow()
+            return self._now
+        key = (type(value), value)
+        try:
+            return self._seen[key]
+        except KeyError:
+            converted = self._seen[key] = convert_timestamp(value)
+            return converted
+        except TypeError:  # unhashable, e.g. a dict
+            return convert_timestamp(value)
+
+
+def convert_timestamp(value: object) -> datetime:
+    """Epoch seconds are read as local time, anything else as in ``TrendRecord``."""
+
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(float(value))
+    return _ensure_datetime(value or datetime.utcnow())
+
+
+def _history(payload: object) -> SnapshotHistory:
+    return SnapshotHistory(MetricSnapshot.from_dict(item) for item in payload or [])
+
+
+def _chain(keys: Tuple[str, ...], layout: FrozenSet[str], *, default: Optional[str] = None) -> str:
+    """Source for ``p.get(k1) or p.get(k2) or ... [or default]`` given ``layout``.
+
+    Absent keys read as ``None``, so they drop out of the chain; only a
+    missing last key leaves a ``None`` behind when there is no default.
+    """
+
+    terms = [f"p[{key!r}]" for key in keys if key in layout]
+    if default is not None:
+        terms.append(default)
+    elif keys[-1] not in layout:
+        terms.append("None")
+    return " or ".join(terms)
+
+
+def _compile(platform: str, layout: FrozenSet[str]) -> Normalizer:
+    if "author" in layout:
+        author = (
+            "a = p['author']\n"
+            f"    a = a.get('uniqueId') if isinstance(a, dict) else ({_chain(_AUTHOR_KEYS, layout)})"
+        )
+    else:
+        author = f"a = {_chain(_AUTHOR_KEYS, layout)}"
+    # ``title`` falls back to ``payload.get("caption", "")``.
+    title = _chain(_TITLE_KEYS, layout, default=None if "caption" in layout else '""')
+    values = {
+        "platform": "platform",
+        "external_id": f"str(({_chain(_ID_KEYS, layout)}) or None)",
+        "title": f'str(({title}) or "")',
+        "author": 'str(a or "unknown")',
+        "url": f'str(({_chain(_URL_KEYS, layout)}) or "")',
+        "caption": _chain(_CAPTION_KEYS, layout),
+        "language": "p['language']" if "language" in layout else "None",
+        "tags": f"list({_chain(_TAG_KEYS, layout, default='[]')})",
+        "timestamp": f"convert({_chain(_TIMESTAMP_KEYS, layout)})",
+        "views": f"int({_chain(_VIEW_KEYS, layout, default='0')})",
+        "likes": f"int({_chain(_LIKE_KEYS, layout, default='0')})",
+        "comments": f"int({_chain(_COMMENT_KEYS, layout, default='0')})",
+        "shares": f"int({_chain(_SHARE_KEYS, layout, default='0')})",
+    }
+    if "history" in layout:
+        values["history"] = "_history(p['history'])"
+    namespace: Dict[str, object] = {"TrendRecord": TrendRecord, "platform": platform, "_history": _history}
+    # Positional arguments are noticeably cheaper than keywords for a
+    # sixteen-field dataclass; unmapped fields get their declared defaults.
+    arguments = []
+    for spec in fields(TrendRecord):
+        if spec.name in values:
+            arguments.append(values[spec.name])
+        elif spec.default is not MISSING:
+            namespace[f"_default_{spec.name}"] = spec.default
+            arguments.append(f"_default_{spec.name}")
+        else:
+            namespace[f"_factory_{spec.name}"] = spec.default_factory
+            arguments.append(f"_factory_{spec.name}()")
+    source = (
+        "def normalize(p, convert):\n"
+        f"    {author}\n"
+        f"    return TrendRecord({', '.join(arguments)})\n"
+    )
+    exec(source, namespace)
+    return namespace["normalize"]
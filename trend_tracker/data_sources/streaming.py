@@ -0,0 +1,202 @@
+"""Incremental JSON parsing helpers for large dataset payloads."""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from itertools import islice
+from typing import Iterable, Iterator, List, TypeVar, Union
+
+
+T = TypeVar("T")
+
+_DECODER = json.JSONDecoder()
+_NON_WHITESPACE = re.compile(r"[^ \t\n\r]")
+# What ends an element: brackets and whole strings outside strings (a lone
+# quote opens one that continues in the next chunk), quotes and escapes
+# inside them, and a delimiter after a bare number or literal.
+_STRUCTURAL = re.compile(r'"(?:[^"\\]++|\\.)*+"|[][{}"]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r"[ \t\n\r,\]]")
+_OPENERS = {"]": "[", "}": "{"}
+# The usual gap between two elements, when the next one starts in the same chunk.
+_NEXT_ELEMENT = re.compile(r"[ \t\n\r]*,[ \t\n\r]*(?=[^ \t\n\r\]])")
+
+
+def iter_json_array(chunks: Iterable[Union[bytes, str]]) -> Iterator[object]:
+    """Yield the elements of a top-level JSON array as the chunks arrive.
+
+    Only the element being read and the unread rest of the current chunk
+    are buffered, so memory stays proportional to the largest element
+    rather than to the whole document, and an element cut by a chunk
+    boundary is decoded once it is complete rather than retried on every
+    chunk. Anything but one well-formed array, e.g. a missing or trailing
+    comma, mismatched brackets or data after the closing bracket, raises
+    ``ValueError``.
+    """
+
+    stream = _JSONStream(chunks)
+    if stream.peek() != "[":
+        raise ValueError("Expected a JSON array")
+    stream.position += 1
+    char = stream.peek()
+    if char == "]":
+        stream.position += 1
+    else:
+        while True:
+            if not char:
+                raise ValueError("Truncated JSON array")
+            yield stream.decode()
+            match = _NEXT_ELEMENT.match(stream.text, stream.position)
+            if match is not None:
+                stream.position = match.end()
+                char = stream.text[stream.position]
+                continue
+            char = stream.peek()
+            if char == "]":
+                stream.position += 1
+                break
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}" if char else "Truncated JSON array")
+            stream.position += 1
+            char = stream.peek()
+            if char == "]":
+                raise ValueError("Trailing comma in JSON array")
+    if stream.peek():
+        raise ValueError("Unexpected data after the JSON array")
+
+
+class _JSONStream:
+    """A chunked UTF-8 document, held one chunk at a time."""
+
+    __slots__ = ("text", "position", "_chunks", "_decoder", "_exhausted")
+
+    def __init__(self, chunks: Iterable[Union[bytes, str]]) -> None:
+        self.text = ""
+        self.position = 0
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._exhausted = False
+
+    def read(self) -> bool:
+        """Replace ``text`` with the next chunk; ``False`` once the input is used up."""
+
+        while not self._exhausted:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                text = self._decoder.decode(b"", final=True)
+                self._exhausted = True
+            else:
+                text = self._decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if text:
+                self.text, self.position = text, 0
+                return True
+        self.text, self.position = "", 0
+        return False
+
+    def peek(self) -> str:
+        """Move to the next non-whitespace character and return it, or "" at the end."""
+
+        while True:
+            match = _NON_WHITESPACE.search(self.text, self.position)
+            if match is not None:
+                self.position = match.start()
+                return match.group()
+            if not self.read():
+                return ""
+
+    def decode(self) -> object:
+        """Decode the element at ``position`` and move past it.
+
+        An element within the current chunk is decoded in place. One that
+        runs past it is scanned for its end, carrying the bracket and string
+        nesting from chunk to chunk, and decoded once from its joined pieces.
+        """
+
+        text, start = self.text, self.position
+        first = text[start]
+        if first in "]},:":
+            raise ValueError(f"Unexpected {first!r} in JSON array")
+        scalar = first not in '[{"'
+        try:
+            value, end = _DECODER.raw_decode(text, start)
+        except ValueError:
+            pass
+        else:
+            # A bare number is only whole once a delimiter follows; it may go on in the next chunk.
+            if not scalar or _SCALAR_END.match(text, end):
+                self.position = end
+                return value
+        parts: List[str] = []
+        stack: List[str] = []
+        in_string = escaped = False
+        scan = start
+        while True:
+            end = -1
+            if scalar:
+                match = _SCALAR_END.search(text, scan)
+                if match is not None:
+                    end = match.start()
+            else:
+                while True:
+                    if escaped:
+                        if scan >= len(text):
+                            break
+                        scan += 1
+                        escaped = False
+                    if in_string:
+                        match = _STRING_SPECIAL.search(text, scan)
+                        if match is None:
+                            break
+                        scan = match.end()
+                        if match.group() == "\\":
+                            escaped = True
+                            continue
+                        in_string = False
+                    else:
+                        match = _STRUCTURAL.search(text, scan)
+                        if match is None:
+                            break
+                        scan = match.end()
+                        token = match.group()
+                        if token == '"':
+                            in_string = True
+                            continue
+                        if token in "[{":
+                            stack.append(token)
+                            continue
+                        if token in "]}" and stack.pop() != _OPENERS[token]:
+                            raise ValueError("Mismatched brackets in JSON array element")
+                    if not stack:
+                        end = scan
+                        break
+            if end >= 0:
+                break
+            parts.append(text[start:])
+            if not self.read():
+                if not scalar:
+                    raise ValueError("Truncated JSON array")
+                # The input ends right after a bare value; the caller reports the missing ']'.
+                text, start, end = "", 0, 0
+                break
+            text, start, scan = self.text, 0, 0
+        self.position = end
+        if parts:
+            parts.append(text[start:end])
+            text, start, end = "".join(parts), 0, sum(map(len, parts))
+        value, stop = _DECODER.raw_decode(text, start)
+        if stop != end:
+            raise ValueError(f"Malformed JSON array element: {text[start:end][:80]!r}")
+        return value
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Group ``items`` into lists of at most ``size`` elements."""
+
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
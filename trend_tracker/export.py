@@ -0,0 +1,362 @@
+"""Stream tracker results to JSON Lines, CSV or a compact columnar file."""
+
+from __future__ import annotations
+
+import csv
+import json
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .analyzer import TrendMetrics, _utc_epoch
+from .forecaster import BatchForecast, HoltForecasts, HoltIndex, LazyForecasts, compute_forecasts
+from .ranking import rank_of
+
+if TYPE_CHECKING:
+    from .tracker import TrackerResult
+
+# Column name and type: "str" (nullable), "i64" or "f64" (NaN when missing).
+METRIC_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("rank", "i64"),
+    ("platform", "str"),
+    ("external_id", "str"),
+    ("title", "str"),
+    ("author", "str"),
+    ("url", "str"),
+    ("country", "str"),
+    ("timestamp", "f64"),
+    ("views", "i64"),
+    ("likes", "i64"),
+    ("comments", "i64"),
+    ("shares", "i64"),
+    ("engagement_rate", "f64"),
+    ("velocity_per_hour", "f64"),
+    ("acceleration_per_hour", "f64"),
+    ("virality_score", "f64"),
+)
+FORECAST_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("projected_views", "f64"),
+    ("projected_engagement_rate", "f64"),
+)
+FORMATS = ("jsonl", "csv", "columnar")
+
+_COLUMNAR_MAGIC = b"TTCX\x01"
+_LENGTH = struct.Struct("<I")
+_BUFFER_SIZE = 1 << 20
+_TYPECODES = {"i64": "q", "f64": "d"}
+
+Row = Tuple[Any, ...]
+
+
+class ExportSink:
+    """Write rows of ``columns`` to ``path`` through a large write buffer.
+
+    Rows arrive in batches from ``export_result``; a sink never keeps more
+    than the batch it is writing. Use as a context manager, or call
+    ``close()``.
+    """
+
+    binary = False
+
+    def __init__(self, path: Union[str, Path], columns: Sequence[Tuple[str, str]], **metadata: Any) -> None:
+        self.path = Path(path)
+        self.columns = tuple(columns)
+        self.metadata = metadata
+        self.rows = 0
+        if self.binary:
+            self._handle = open(self.path, "wb", buffering=_BUFFER_SIZE)
+        else:
+            self._handle = open(self.path, "w", encoding="utf-8", newline="", buffering=_BUFFER_SIZE)
+        self._start()
+
+    def __enter__(self) -> "ExportSink":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def write_rows(self, rows: List[Row]) -> None:
+        self._write(rows)
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        if self._handle.closed:
+            return
+        self._finish()
+        self._handle.close()
+
+    def _start(self) -> None:
+        pass
+
+    def _write(self, rows: List[Row]) -> None:
+        raise NotImplementedError
+
+    def _finish(self) -> None:
+        pass
+
+
+class JSONLinesSink(ExportSink):
+    """One JSON object per row; timestamps as ISO 8601 UTC, missing values as null."""
+
+    def _write(self, rows: List[Row]) -> None:
+        names = [name for name, _ in self.columns]
+        dumps = json.dumps
+        self._handle.write(
+            "".join(dumps(dict(zip(names, values))) + "\n" for values in _text_rows(rows, self.columns))
+        )
+
+
+class CSVSink(ExportSink):
+    """A header line, then one line per row; missing values are empty fields."""
+
+    def _start(self) -> None:
+        self._writer = csv.writer(self._handle)
+        self._writer.writerow([name for name, _ in self.columns])
+
+    def _write(self, rows: List[Row]) -> None:
+        # ``csv`` already writes None as an empty field.
+        self._writer.writerows(_text_rows(rows, self.columns))
+
+
+class ColumnarSink(ExportSink):
+    """Little-endian column batches, readable with ``read_columnar``.
+
+    The file starts with a magic string and a JSON header holding the
+    columns and metadata. Each batch stores its row count, then every column
+    in turn: numbers as packed 8-byte arrays, strings as a validity byte per
+    row, ``rows + 1`` offsets and the UTF-8 data. A zero row count ends the
+    file, so a truncated export is detected.
+    """
+
+    binary = True
+
+    def _start(self) -> None:
+        header = json.dumps({"columns": self.columns, "metadata": self.metadata}).encode("utf-8")
+        self._handle.write(_COLUMNAR_MAGIC + _LENGTH.pack(len(header)) + header)
+
+    def _write(self, rows: List[Row]) -> None:
+        if not rows:
+            return
+        write = self._handle.write
+        write(_LENGTH.pack(len(rows)))
+        for (_, kind), values in zip(self.columns, zip(*rows)):
+            if kind == "str":
+                encoded = [b"" if value is None else value.encode("utf-8") for value in values]
+                offsets = array("q", [0])
+                total = 0
+                for item in encoded:
+                    total += len(item)
+                    offsets.append(total)
+                write(bytes(value is not None for value in values))
+                write(_little_endian(offsets))
+                write(b"".join(encoded))
+            else:
+                write(_little_endian(array(_TYPECODES[kind], values)))
+
+    def _finish(self) -> None:
+        self._handle.write(_LENGTH.pack(0))
+
+
+_SINKS = {"jsonl": JSONLinesSink, "csv": CSVSink, "columnar": ColumnarSink}
+
+
+def open_sink(
+    path: Union[str, Path], format: Optional[str] = None, *, forecasts: bool = True, **metadata: Any
+) -> ExportSink:
+    """Create the sink for ``format``, or for the suffix of ``path`` when omitted.
+
+    ``.jsonl``/``.ndjson`` select JSON Lines, ``.csv`` CSV and anything else
+    the columnar format.
+    """
+
+    if format is None:
+        suffix = Path(path).suffix.lower()
+        format = "jsonl" if suffix in (".jsonl", ".ndjson") else "csv" if suffix == ".csv" else "columnar"
+    sink = _SINKS.get(format)
+    if sink is None:
+        raise ValueError(f"Unsupported export format: {format}")
+    columns = METRIC_COLUMNS + (FORECAST_COLUMNS if forecasts else ())
+    return sink(path, columns, **metadata)
+
+
+def export_result(
+    result: TrackerResult,
+    sink: ExportSink,
+    *,
+    ranked: bool = True,
+    horizon_hours: Optional[int] = None,
+    resolution: Optional[float] = None,
+    holt_index: Optional[HoltIndex] = None,
+    batch_size: int = 8192,
+) -> int:
+    """Stream every meme of ``result`` into ``sink``, not just the ranked top.
+
+    With ``ranked``, rows go out in ``TopKRanking`` order, best virality
+    first, so ``rank`` matches the report; otherwise they follow
+    ``result.metrics``. Forecast columns, when the sink has them, are computed per batch with
+    the model behind ``result.forecasts``: projected from ``holt_index``
+    (taken from Holt forecasts when omitted), or fitted without going
+    through the forecast cache, which would otherwise evict the entries
+    reports rely on. ``horizon_hours`` and ``resolution`` default to those
+    of ``result.forecasts``. Fitted forecasts read whole histories, which
+    ``result.load_histories`` restores batch by batch. Returns the number of
+    rows written.
+    """
+
+    metrics = result.metrics
+    count = len(metrics)
+    if ranked:
+        order: Sequence[int] = sorted(range(count), key=lambda position: rank_of(metrics[position]), reverse=True)
+    else:
+        order = range(count)
+    with_forecasts = len(sink.columns) > len(METRIC_COLUMNS)
+    forecasts = result.forecasts
+    if horizon_hours is None:
+        horizon_hours = getattr(forecasts, "horizon_hours", 6)
+    if resolution is None and isinstance(forecasts, LazyForecasts):
+        resolution = forecasts.resolution
+    if holt_index is None and isinstance(forecasts, HoltForecasts):
+        holt_index = forecasts.index
+    for start in range(0, count, batch_size):
+        batch = [metrics[position] for position in order[start : start + batch_size]]
+        rows = [_metric_row(rank, metric) for rank, metric in enumerate(batch, start=start + 1)]
+        if with_forecasts:
+            records = [metric.record for metric in batch]
+            if holt_index is None and result.load_histories is not None:
+                result.load_histories(records)
+            projected = _final_projections(records, horizon_hours, resolution, holt_index)
+            rows = [row + extra for row, extra in zip(rows, projected)]
+        sink.write_rows(rows)
+    return count
+
+
+def read_columnar(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Yield each batch of a columnar export as a dict of column lists or arrays.
+
+    The header is available as the ``__header__`` key of every batch.
+    """
+
+    with open(path, "rb") as handle:
+        if handle.read(len(_COLUMNAR_MAGIC)) != _COLUMNAR_MAGIC:
+            raise ValueError(f"Not a columnar export: {path}")
+        header = json.loads(_read_exact(handle, _read_length(handle)))
+        columns = header["columns"]
+        while True:
+            rows = _read_length(handle)
+            if not rows:
+                return
+            batch: Dict[str, Any] = {"__header__": header}
+            for name, kind in columns:
+                if kind == "str":
+                    valid = _read_exact(handle, rows)
+                    offsets = _read_array(handle, "q", rows + 1)
+                    data = _read_exact(handle, offsets[-1])
+                    batch[name] = [
+                        data[offsets[index] : offsets[index + 1]].decode("utf-8") if valid[index] else None
+                        for index in range(rows)
+                    ]
+                else:
+                    batch[name] = _read_array(handle, _TYPECODES[kind], rows)
+            yield batch
+
+
+def _metric_row(rank: int, metric: TrendMetrics) -> Row:
+    record = metric.record
+    return (
+        rank,
+        record.platform,
+        record.external_id,
+        record.title,
+        record.author,
+        record.url,
+        record.country,
+        _utc_epoch(record.timestamp),
+        record.views,
+        record.likes,
+        record.comments,
+        record.shares,
+        metric.engagement_rate,
+        metric.velocity_per_hour,
+        metric.acceleration_per_hour,
+        metric.virality_score,
+    )
+
+
+def _final_projections(
+    records: List[Any], horizon_hours: int, resolution: Optional[float], holt_index: Optional[HoltIndex] = None
+) -> List[Row]:
+    """Last projected views and projected engagement per record."""
+
+    if not records:
+        return []
+    if holt_index is not None:
+        forecasts = holt_index.lazy(records, horizon_hours)
+    else:
+        forecasts = compute_forecasts(records, horizon_hours, resolution=resolution)
+    if isinstance(forecasts, BatchForecast):
+        return list(
+            zip(forecasts.projected_views[:, -1].tolist(), forecasts.projected_engagement_rate.tolist())
+        )
+    return [
+        (item.projected_views[-1][1] if item.projected_views else None, item.projected_engagement_rate)
+        for item in forecasts
+    ]
+
+
+def _text_rows(rows: List[Row], columns: Sequence[Tuple[str, str]]) -> List[List[Any]]:
+    """``rows`` for the text formats: timestamps as ISO strings, NaN as None."""
+
+    from datetime import datetime, timezone
+
+    stamp = next(position for position, (name, _) in enumerate(columns) if name == "timestamp")
+    floats = [position for position, (name, kind) in enumerate(columns) if kind == "f64" and position != stamp]
+    fromtimestamp = datetime.fromtimestamp
+    utc = timezone.utc
+    converted = []
+    for row in rows:
+        values = list(row)
+        values[stamp] = fromtimestamp(values[stamp], utc).isoformat()
+        for position in floats:
+            value = values[position]
+            if value != value:
+                values[position] = None
+        converted.append(values)
+    return converted
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _read_length(handle: BinaryIO) -> int:
+    return _LENGTH.unpack(_read_exact(handle, _LENGTH.size))[0]
+
+
+def _read_exact(handle: BinaryIO, size: int) -> bytes:
+    data = handle.read(size)
+    if len(data) != size:
+        raise ValueError(f"Truncated columnar export: {handle.name}")
+    return data
+
+
+def _read_array(handle: BinaryIO, typecode: str, count: int) -> array:
+    values = array(typecode)
+    values.frombytes(_read_exact(handle, count * values.itemsize))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+__all__ = [
+    "CSVSink",
+    "ColumnarSink",
+    "ExportSink",
+    "JSONLinesSink",
+    "export_result",
+    "open_sink",
+    "read_columnar",
+]
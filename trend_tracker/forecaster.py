@@ -2,13 +2,25 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timedelta
-from typing import List, Tuple
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union, overload
 
+from .compat import numpy_available
 from .data_models import MetricSnapshot, TrendRecord
 
 
+_TIMESTAMP = attrgetter("timestamp")
+_HISTORY = attrgetter("history")
+_TIMES = attrgetter("timestamps")
+_VIEWS = attrgetter("views")
+_COUNTERS = tuple(attrgetter(name) for name in ("views", "likes", "comments", "shares"))
+_LAZY_CHUNK = 1024
+
+
 @dataclass(slots=True)
 class TrendForecast:
     record: TrendRecord
@@ -17,18 +29,25 @@ class TrendForecast:
     projected_engagement_rate: float
 
 
-def forecast(records: List[TrendRecord], horizon_hours: int = 6) -> List[TrendForecast]:
-    """Return linear projections for the supplied records."""
+def forecast(
+    records: List[TrendRecord], horizon_hours: int = 6, *, resolution: Optional[float] = None
+) -> List[TrendForecast]:
+    """Return linear projections for the supplied records.
+
+    ``resolution`` (seconds) fits each line on the history resampled to one
+    sample per bucket, so dense recent polls do not outweigh rolled-up data.
+    """
 
     outputs: List[TrendForecast] = []
     for record in records:
-        snapshots = list(record.iter_history())
-        if len(snapshots) < 2:
+        times, views = record.view_series(resolution=resolution)
+        last_timestamp = record.last_timestamp()
+        if len(times) < 2:
             snapshots = _bootstrap_snapshots(record)
-        times, views = _snapshots_to_series(snapshots)
+            times, views = _snapshots_to_series(snapshots)
+            last_timestamp = snapshots[-1].timestamp
         slope, intercept = _linear_regression(times, views)
         projections: List[Tuple[datetime, float]] = []
-        last_timestamp = snapshots[-1].timestamp
         for hour in range(1, horizon_hours + 1):
             future_time = last_timestamp + timedelta(hours=hour)
             future_epoch = future_time.timestamp()
@@ -46,6 +65,507 @@ def forecast(records: List[TrendRecord], horizon_hours: int = 6) -> List[TrendFo
     return outputs
 
 
+@dataclass(slots=True)
+class BatchForecast(Sequence[TrendForecast]):
+    """Linear projections for many records held as arrays.
+
+    ``projected_views[i, j]`` is the projection for ``records[i]`` at
+    ``anchors[i] + hours[j]`` hours, where ``anchors`` are the epoch seconds
+    of each record's latest snapshot and ``hours`` is the time axis shared by
+    every record. ``TrendForecast`` objects are only built when indexed.
+    """
+
+    records: List[TrendRecord]
+    horizon_hours: int
+    hours: Any
+    anchors: Any
+    slopes: Any
+    intercepts: Any
+    projected_views: Any
+    projected_engagement_rate: Any
+    _positions: Optional[Dict[int, int]] = field(default=None, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @overload
+    def __getitem__(self, index: int) -> TrendForecast: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[TrendForecast]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[TrendForecast, List[TrendForecast]]:
+        if isinstance(index, slice):
+            return [self._materialize(position) for position in range(len(self.records))[index]]
+        if index < 0:
+            index += len(self.records)
+        if not 0 <= index < len(self.records):
+            raise IndexError("forecast index out of range")
+        return self._materialize(index)
+
+    def __iter__(self) -> Iterator[TrendForecast]:
+        for position in range(len(self.records)):
+            yield self._materialize(position)
+
+    def lookup(self, record: TrendRecord) -> Optional[TrendForecast]:
+        """Return the forecast computed for ``record`` (matched by identity)."""
+
+        if self._positions is None:
+            self._positions = {id(item): position for position, item in enumerate(self.records)}
+        position = self._positions.get(id(record))
+        return None if position is None else self._materialize(position)
+
+    def _materialize(self, position: int) -> TrendForecast:
+        record = self.records[position]
+        last_timestamp = record.last_timestamp()
+        row = self.projected_views[position].tolist()
+        return TrendForecast(
+            record=record,
+            horizon_hours=self.horizon_hours,
+            projected_views=[
+                (last_timestamp + timedelta(hours=hour), views)
+                for hour, views in zip(range(1, self.horizon_hours + 1), row)
+            ],
+            projected_engagement_rate=float(self.projected_engagement_rate[position]),
+        )
+
+
+def forecast_batch(
+    records: Sequence[TrendRecord], horizon_hours: int = 6, *, resolution: Optional[float] = None
+) -> BatchForecast:
+    """Fit every record's least-squares line at once with NumPy.
+
+    Histories are ragged, so all samples are flattened into one array with a
+    segment id per record and the centred regression sums are accumulated
+    with ``bincount``. Sample order does not matter for the sums, so the
+    current snapshot is simply appended to its record's segment.
+    ``resolution`` works as in ``forecast``.
+    """
+
+    import numpy as np
+
+    records = list(records)
+    count = len(records)
+    epochs = np.fromiter(map(datetime.timestamp, map(_TIMESTAMP, records)), dtype=np.float64, count=count)
+    counters = [np.fromiter(map(getter, records), dtype=np.int64, count=count) for getter in _COUNTERS]
+
+    histories = list(map(_HISTORY, records))
+    if resolution:
+        histories = [history.resample(resolution) for history in histories]
+    history_times = list(map(_TIMES, histories))
+    lengths = np.fromiter(map(len, history_times), dtype=np.int64, count=count)
+    flat_times = np.frombuffer(b"".join(history_times), dtype=np.float64)
+    flat_views = np.frombuffer(b"".join(map(_VIEWS, histories)), dtype=np.int64)
+    return fit_columns(np, records, horizon_hours, epochs, counters, lengths, flat_times, flat_views)
+
+
+def fit_columns(
+    np: Any,
+    records: List[TrendRecord],
+    horizon_hours: int,
+    epochs: Any,
+    counters: Sequence[Any],
+    lengths: Any,
+    flat_times: Any,
+    flat_views: Any,
+) -> BatchForecast:
+    """Fit projections from gathered columns, as ``forecast_batch`` does.
+
+    ``counters`` are the views, likes, comments and shares arrays, and
+    ``flat_times``/``flat_views`` hold every record's history back to back,
+    ``lengths[i]`` samples for record ``i``.
+    """
+
+    count = len(epochs)
+    positions = np.arange(count)
+    current_views = counters[0]
+    anchors = epochs
+    if flat_times.size:
+        last_history = np.full(count, -np.inf)
+        filled = lengths > 0
+        last_history[filled] = flat_times[np.cumsum(lengths)[filled] - 1]
+        anchors = np.maximum(epochs, last_history)
+
+    # Records without history are fitted against a synthetic sample one hour
+    # earlier, as in ``_bootstrap_snapshots``.
+    bootstrap = np.flatnonzero(lengths == 0)
+    xs = np.concatenate([flat_times, epochs, epochs[bootstrap] - 3600])
+    ys = np.concatenate(
+        [flat_views, current_views, np.maximum(current_views[bootstrap] - 1000, 0)]
+    ).astype(np.float64)
+    segments = np.concatenate([np.repeat(positions, lengths), positions, bootstrap])
+
+    sizes = np.bincount(segments, minlength=count)
+    mean_x = np.bincount(segments, weights=xs, minlength=count) / sizes
+    mean_y = np.bincount(segments, weights=ys, minlength=count) / sizes
+    dx = xs - mean_x[segments]
+    dy = ys - mean_y[segments]
+    numerator = np.bincount(segments, weights=dx * dy, minlength=count)
+    denominator = np.bincount(segments, weights=dx * dx, minlength=count)
+    denominator[denominator == 0] = 1e-6
+    slopes = numerator / denominator
+    intercepts = mean_y - slopes * mean_x
+
+    hours = np.arange(1, horizon_hours + 1)
+    future = anchors[:, None] + hours[None, :] * 3600.0
+    projected = np.maximum(slopes[:, None] * future + intercepts[:, None], 0)
+    interactions = counters[1] + counters[2] + counters[3]
+    engagement = interactions / np.maximum(current_views, 1)
+    return BatchForecast(
+        records=records,
+        horizon_hours=horizon_hours,
+        hours=hours,
+        anchors=anchors,
+        slopes=slopes,
+        intercepts=intercepts,
+        projected_views=projected,
+        projected_engagement_rate=engagement,
+    )
+
+
+def compute_forecasts(
+    records: Sequence[TrendRecord], horizon_hours: int = 6, *, resolution: Optional[float] = None
+) -> Sequence[TrendForecast]:
+    """Forecast with the batch path when NumPy is installed."""
+
+    if numpy_available():
+        return forecast_batch(records, horizon_hours, resolution=resolution)
+    return forecast(list(records), horizon_hours, resolution=resolution)
+
+
+class ForecastCache:
+    """Size-bounded LRU of forecasts keyed by ``platform:external_id``.
+
+    An entry stays valid while the record's current snapshot (timestamp and
+    counters), its history's length and newest sample, the horizon and the
+    resolution are unchanged. Polls that bring nothing new for a meme reuse
+    its forecast; a late sample or a retention roll-up, which change the
+    history behind an unchanged current snapshot, refit it. Thread safe.
+    """
+
+    # Below this many misses the per-record path beats setting up NumPy arrays.
+    batch_threshold = 64
+
+    def __init__(self, max_size: int = 10_000) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[Tuple[Any, ...], TrendForecast]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self, record: TrendRecord, horizon_hours: int = 6, *, resolution: Optional[float] = None
+    ) -> TrendForecast:
+        return self.get_many([record], horizon_hours, resolution=resolution)[0]
+
+    def get_many(
+        self, records: Sequence[TrendRecord], horizon_hours: int = 6, *, resolution: Optional[float] = None
+    ) -> List[TrendForecast]:
+        """Return forecasts for ``records``, computing only the stale ones."""
+
+        results: List[Optional[TrendForecast]] = [None] * len(records)
+        missing: List[int] = []
+        versions = [_version(record, horizon_hours, resolution) for record in records]
+        with self._lock:
+            entries = self._entries
+            for position, record in enumerate(records):
+                entry = entries.get(versions[position][0])
+                if entry is None or entry[0] != versions[position][1]:
+                    missing.append(position)
+                    continue
+                entries.move_to_end(versions[position][0])
+                cached = entry[1]
+                results[position] = cached if cached.record is record else replace(cached, record=record)
+            self.hits += len(records) - len(missing)
+            self.misses += len(missing)
+        if missing:
+            stale = [records[position] for position in missing]
+            if len(stale) >= self.batch_threshold and numpy_available():
+                computed: Sequence[TrendForecast] = forecast_batch(stale, horizon_hours, resolution=resolution)
+            else:
+                computed = forecast(stale, horizon_hours, resolution=resolution)
+            with self._lock:
+                for position, entry in zip(missing, computed):
+                    key, version = versions[position]
+                    self._entries[key] = (version, entry)
+                    self._entries.move_to_end(key)
+                    results[position] = entry
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return results  # type: ignore[return-value]
+
+    def lazy(
+        self,
+        records: Sequence[TrendRecord],
+        horizon_hours: int = 6,
+        *,
+        resolution: Optional[float] = None,
+        prepare: Optional[Callable[[List[TrendRecord]], None]] = None,
+    ) -> "LazyForecasts":
+        return LazyForecasts(list(records), horizon_hours, resolution, self, prepare)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+@dataclass(slots=True)
+class LazyForecasts(Sequence[TrendForecast]):
+    """Forecasts for ``records`` that are only computed when accessed.
+
+    Every access goes through ``cache``, so reading the same item twice or
+    across polls costs a dictionary lookup. ``prepare`` is handed the records
+    about to be forecast first, e.g. ``TrendStore.load_histories`` for a store
+    whose merged records only carry their newest samples.
+    """
+
+    records: List[TrendRecord]
+    horizon_hours: int
+    resolution: Optional[float]
+    cache: ForecastCache
+    prepare: Optional[Callable[[List[TrendRecord]], None]] = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @overload
+    def __getitem__(self, index: int) -> TrendForecast: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[TrendForecast]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[TrendForecast, List[TrendForecast]]:
+        records = self.records[index] if isinstance(index, slice) else [self.records[index]]
+        if self.prepare is not None:
+            self.prepare(records)
+        if isinstance(index, slice):
+            return self.cache.get_many(records, self.horizon_hours, resolution=self.resolution)
+        return self.cache.get(records[0], self.horizon_hours, resolution=self.resolution)
+
+    def __iter__(self) -> Iterator[TrendForecast]:
+        for start in range(0, len(self.records), _LAZY_CHUNK):
+            yield from self[start : start + _LAZY_CHUNK]
+
+
+@dataclass(slots=True)
+class HoltState:
+    """Smoothed views of one record: ``level`` at ``updated_at`` (epoch
+    seconds) and ``trend`` in views per hour, after ``samples`` snapshots."""
+
+    level: float
+    trend: float
+    updated_at: float
+    samples: int = 1
+
+
+class HoltIndex:
+    """Damped-trend exponential smoothing (Holt) kept per record.
+
+    ``update`` is called with every merged record and folds in its current
+    snapshot in constant time: the level moves ``alpha`` of the way to the
+    observed views, the trend ``beta`` of the way to the slope between the
+    old and new level. Snapshots arrive at irregular intervals, so the trend
+    is per hour and decays by ``damping`` for every hour it is carried
+    forward. A projection ``h`` hours ahead is therefore
+    ``level + trend * (damping + damping**2 + ... + damping**h)``, which
+    flattens out as a meme's growth slows instead of extending the line
+    forever. Projections only read the state, never the history.
+
+    The state is not persisted: a record seen for the first time, including
+    every record of a freshly opened store, is replayed from its history.
+    Snapshots older than the state are ignored.
+    """
+
+    def __init__(self, *, alpha: float = 0.5, beta: float = 0.3, damping: float = 0.9) -> None:
+        if not 0 < damping <= 1:
+            raise ValueError("damping must be in (0, 1]")
+        self.alpha = alpha
+        self.beta = beta
+        self.damping = damping
+        self._states: Dict[str, HoltState] = {}
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def update(self, key: str, record: TrendRecord) -> None:
+        """Account for the current snapshot of ``record``, stored under ``key``."""
+
+        state = self._states.get(key)
+        if state is None:
+            self._states[key] = self._replay(record)
+        else:
+            self._observe(state, record.timestamp.timestamp(), record.views)
+
+    def rebuild(self, records: Iterable[Tuple[str, TrendRecord]]) -> None:
+        """Replace every state by replaying ``(key, record)`` pairs, e.g. after loading a store."""
+
+        self._states = {key: self._replay(record) for key, record in records}
+
+    def discard(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._states.pop(key, None)
+
+    def state(self, record: TrendRecord) -> HoltState:
+        """The state of ``record``, replayed from its history if it was never updated."""
+
+        state = self._states.get(f"{record.platform}:{record.external_id}")
+        return self._replay(record) if state is None else state
+
+    def project(self, record: TrendRecord, horizon_hours: int = 6, state: Optional[HoltState] = None) -> TrendForecast:
+        """Forecast ``record`` from its state (or ``state``) alone."""
+
+        state = self.state(record) if state is None else state
+        last_timestamp = record.last_timestamp()
+        # The record may be newer than its state if it was never merged through a store.
+        lag = max(last_timestamp.timestamp() - state.updated_at, 0) / 3600
+        projections = [
+            (
+                last_timestamp + timedelta(hours=hour),
+                max(state.level + state.trend * self._damped_sum(lag + hour), 0),
+            )
+            for hour in range(1, horizon_hours + 1)
+        ]
+        return TrendForecast(
+            record=record,
+            horizon_hours=horizon_hours,
+            projected_views=projections,
+            projected_engagement_rate=_project_engagement(record),
+        )
+
+    def lazy(self, records: Sequence[TrendRecord], horizon_hours: int = 6) -> "HoltForecasts":
+        return HoltForecasts(list(records), horizon_hours, self)
+
+    def _replay(self, record: TrendRecord) -> HoltState:
+        times, views = record.view_series()
+        state = HoltState(level=float(views[0]), trend=0.0, updated_at=times[0])
+        for timestamp, value in zip(times[1:], views[1:]):
+            self._observe(state, timestamp, value)
+        return state
+
+    def _observe(self, state: HoltState, timestamp: float, views: float) -> None:
+        elapsed = (timestamp - state.updated_at) / 3600
+        if elapsed <= 0:
+            return
+        if state.samples == 1:
+            # Two samples are needed before there is a trend to smooth.
+            state.trend = (views - state.level) / elapsed
+            state.level = float(views)
+        else:
+            predicted = state.level + state.trend * self._damped_sum(elapsed)
+            level = self.alpha * views + (1 - self.alpha) * predicted
+            carried = state.trend * self.damping**elapsed
+            state.trend = self.beta * (level - state.level) / elapsed + (1 - self.beta) * carried
+            state.level = level
+        state.updated_at = timestamp
+        state.samples += 1
+
+    def _damped_sum(self, hours: float) -> float:
+        """``damping + damping**2 + ...`` over ``hours`` (fractional hours allowed)."""
+
+        damping = self.damping
+        if damping == 1:
+            return hours
+        return damping * (1 - damping**hours) / (1 - damping)
+
+
+@dataclass(slots=True)
+class HoltForecasts(Sequence[TrendForecast]):
+    """Holt projections for ``records``, each computed from its state when accessed."""
+
+    records: List[TrendRecord]
+    horizon_hours: int
+    index: HoltIndex
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @overload
+    def __getitem__(self, index: int) -> TrendForecast: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[TrendForecast]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[TrendForecast, List[TrendForecast]]:
+        if isinstance(index, slice):
+            return [self.index.project(record, self.horizon_hours) for record in self.records[index]]
+        return self.index.project(self.records[index], self.horizon_hours)
+
+    def __iter__(self) -> Iterator[TrendForecast]:
+        for record in self.records:
+            yield self.index.project(record, self.horizon_hours)
+
+
+class ForecastIndex(Mapping[str, TrendForecast]):
+    """Forecasts keyed by ``platform:external_id``.
+
+    Wraps either result type without materializing it; the key table is
+    built on first access and a ``BatchForecast`` row is only turned into a
+    ``TrendForecast`` when looked up.
+    """
+
+    def __init__(self, forecasts: Sequence[TrendForecast]) -> None:
+        self._forecasts = forecasts
+        self._positions: Optional[Dict[str, int]] = None
+
+    def __getitem__(self, key: str) -> TrendForecast:
+        return self._forecasts[self._table()[key]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table())
+
+    def __len__(self) -> int:
+        return len(self._forecasts)
+
+    def _table(self) -> Dict[str, int]:
+        if self._positions is None:
+            forecasts = self._forecasts
+            records = forecasts.records if isinstance(forecasts, (BatchForecast, LazyForecasts, HoltForecasts)) else [
+                entry.record for entry in forecasts
+            ]
+            self._positions = {
+                f"{record.platform}:{record.external_id}": position for position, record in enumerate(records)
+            }
+        return self._positions
+
+
+def find_forecast(forecasts: Sequence[TrendForecast], record: TrendRecord) -> Optional[TrendForecast]:
+    """Return the forecast for ``record`` from either result type."""
+
+    if isinstance(forecasts, BatchForecast):
+        return forecasts.lookup(record)
+    if isinstance(forecasts, LazyForecasts):
+        if not any(item is record for item in forecasts.records):
+            return None
+        return forecasts.cache.get(record, forecasts.horizon_hours, resolution=forecasts.resolution)
+    if isinstance(forecasts, HoltForecasts):
+        if not any(item is record for item in forecasts.records):
+            return None
+        return forecasts.index.project(record, forecasts.horizon_hours)
+    return next((entry for entry in forecasts if entry.record == record), None)
+
+
+def _version(
+    record: TrendRecord, horizon_hours: int, resolution: Optional[float]
+) -> Tuple[str, Tuple[Any, ...]]:
+    """Cache key and version of ``record``'s forecast."""
+
+    times = record.history.timestamps
+    return f"{record.platform}:{record.external_id}", (
+        record.timestamp,
+        record.views,
+        record.likes,
+        record.comments,
+        record.shares,
+        len(times),
+        times[-1] if times else None,
+        horizon_hours,
+        resolution,
+    )
+
+
 def _bootstrap_snapshots(record: TrendRecord) -> List[MetricSnapshot]:
     snapshot = record.current_snapshot()
     earlier = MetricSnapshot(
@@ -62,7 +582,7 @@ def _snapshots_to_series(snapshots: List[MetricSnapshot]) -> Tuple[List[float],
     return [snap.timestamp.timestamp() for snap in snapshots], [snap.views for snap in snapshots]
 
 
-def _linear_regression(xs: List[float], ys: List[float]) -> Tuple[float, float]:
+def _linear_regression(xs: Sequence[float], ys: Sequence[float]) -> Tuple[float, float]:
     n = len(xs)
     if n == 0:
         return 0.0, 0.0
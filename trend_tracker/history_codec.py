@@ -0,0 +1,441 @@
+"""Delta-encoded, varint-packed snapshot history archives.
+
+Consecutive snapshots of a meme differ by small amounts, so an archive
+stores timestamps as deltas of deltas and counters as deltas from the
+previous sample. Each value is zigzag-mapped and packed as a LEB128 varint,
+which makes a meme polled at a steady interval cost a few bytes per
+snapshot. Every record gets its own block, optionally zlib-compressed, and
+an index at the end of the file maps keys to blocks, so ``DeltaArchive``
+decodes one record's history without reading the others.
+
+Layout, little endian::
+
+    magic   b"TTHD\\x01"
+    flags   u8                 bit 0: blocks are zlib-compressed
+    blocks  one per record, in index order
+    index   per record: u32 key length, UTF-8 key, u64 offset, u32 length, u32 samples
+    footer  u64 index offset, u32 records
+
+A block holds ``2 + 5 * samples`` varints: the sample count, the block
+flags (bit 0: naive timestamps, bits 1-2: time encoding), then the
+timestamp, views, likes, comments and shares columns in turn.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from itertools import accumulate
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .compat import numpy_available
+from .data_models import SnapshotHistory
+
+DELTA_MAGIC = b"TTHD\x01"
+_HEADER = len(DELTA_MAGIC) + 1
+_COMPRESSED = 1
+_INDEX_KEY = struct.Struct("<I")
+_INDEX_ENTRY = struct.Struct("<QII")
+_FOOTER = struct.Struct("<QI")
+
+# How a block stores its timestamps: whole epoch seconds, epoch microseconds,
+# or the raw float64 bits when neither reproduces them exactly.
+_SECONDS = 0
+_MICROS = 1
+_BITS = 2
+# Beyond this, epoch microseconds no longer fit in a float64 mantissa.
+_MAX_SECONDS = 2.0**53 / 1e6
+
+_MASK = (1 << 64) - 1
+_SIGN = 1 << 63
+
+BufferLike = Union[bytes, memoryview, mmap.mmap]
+
+
+class DeltaArchive:
+    """Read access to an archive written by ``save_delta_histories``.
+
+    Only the index is parsed on open; ``get`` decodes a single record's
+    block. Use as a context manager, or call ``close()``.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]) -> None:
+        self.path = str(path)
+        self._handle = open(self.path, "rb")
+        try:
+            self._buffer = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._handle.close()
+            raise ValueError(f"Not a delta history archive: {self.path}") from None
+        buffer = self._buffer
+        if len(buffer) < _HEADER + _FOOTER.size or buffer[: len(DELTA_MAGIC)] != DELTA_MAGIC:
+            self.close()
+            raise ValueError(f"Not a delta history archive: {self.path}")
+        self.compressed = bool(buffer[len(DELTA_MAGIC)] & _COMPRESSED)
+        index_offset, count = _FOOTER.unpack_from(buffer, len(buffer) - _FOOTER.size)
+        self._data_end = index_offset
+        # key -> (offset, length, samples)
+        self._index: Dict[str, Tuple[int, int, int]] = {}
+        offset = index_offset
+        for _ in range(count):
+            (key_length,) = _INDEX_KEY.unpack_from(buffer, offset)
+            offset += _INDEX_KEY.size
+            key = buffer[offset : offset + key_length].decode("utf-8")
+            offset += key_length
+            self._index[key] = _INDEX_ENTRY.unpack_from(buffer, offset)
+            offset += _INDEX_ENTRY.size
+
+    def __enter__(self) -> "DeltaArchive":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def keys(self) -> List[str]:
+        return list(self._index)
+
+    def samples(self, key: str) -> int:
+        """Number of snapshots stored for ``key``, read from the index."""
+
+        return self._index[key][2]
+
+    def get(self, key: str) -> Optional[SnapshotHistory]:
+        """Decode the history stored under ``key``, or ``None`` when absent."""
+
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        history, _ = _decode_block(self._block(entry))
+        return history
+
+    def load_all(self) -> Dict[str, SnapshotHistory]:
+        """Decode every history, vectorized when NumPy is available."""
+
+        if not self._index:
+            return {}
+        if numpy_available():
+            if self.compressed:
+                data = b"".join(self._block(entry) for entry in self._index.values())
+            else:
+                data = self._buffer[_HEADER : self._data_end]
+            return _decode_all_numpy(list(self._index), [entry[2] for entry in self._index.values()], data)
+        return {key: _decode_block(self._block(entry))[0] for key, entry in self._index.items()}
+
+    def close(self) -> None:
+        if not self._buffer.closed:
+            self._buffer.close()
+        self._handle.close()
+
+    def _block(self, entry: Tuple[int, int, int]) -> bytes:
+        offset, length, _ = entry
+        block = self._buffer[offset : offset + length]
+        return zlib.decompress(block) if self.compressed else block
+
+
+def save_delta_histories(path: str, histories: Dict[str, SnapshotHistory], *, compress: bool = False) -> None:
+    """Write keyed histories as a delta archive, one block per key."""
+
+    keys = list(histories)
+    values = [histories[key] for key in keys]
+    if numpy_available() and values:
+        blob, offsets = _encode_all_numpy(values)
+        blocks: Sequence[Any] = [blob[start:end] for start, end in zip(offsets, offsets[1:])]
+    else:
+        blocks = [_encode_block(history) for history in values]
+    if compress:
+        blocks = [zlib.compress(block) for block in blocks]
+    with open(path, "wb") as handle:
+        handle.write(DELTA_MAGIC + bytes((_COMPRESSED if compress else 0,)))
+        index: List[bytes] = []
+        offset = _HEADER
+        for key, block, history in zip(keys, blocks, values):
+            handle.write(block)
+            encoded = key.encode("utf-8")
+            index.append(_INDEX_KEY.pack(len(encoded)) + encoded + _INDEX_ENTRY.pack(offset, len(block), len(history)))
+            offset += len(block)
+        handle.write(b"".join(index))
+        handle.write(_FOOTER.pack(offset, len(keys)))
+        handle.flush()
+        os.fsync(handle.fileno())
+
+
+def load_delta_histories(path: str) -> Dict[str, SnapshotHistory]:
+    """Read every history of an archive written by ``save_delta_histories``."""
+
+    with DeltaArchive(path) as archive:
+        return archive.load_all()
+
+
+def _encode_block(history: SnapshotHistory) -> bytes:
+    encoding, times = _time_values(history.timestamps)
+    out = bytearray()
+    _put_varints(out, (len(history), (1 if history._naive else 0) | encoding << 1))
+    deltas = _deltas(times)
+    _put_varints(out, map(_zigzag, deltas[:1] + _deltas(deltas[1:])))
+    for column in (history.views, history.likes, history.comments, history.shares):
+        _put_varints(out, map(_zigzag, _deltas(column.tolist())))
+    return bytes(out)
+
+
+def _decode_block(data: BufferLike, offset: int = 0) -> Tuple[SnapshotHistory, int]:
+    (count, flags), offset = _get_varints(data, offset, 2)
+    columns: List[List[int]] = []
+    for _ in range(5):
+        values, offset = _get_varints(data, offset, count)
+        columns.append([_unzigzag(value) for value in values])
+    second = columns[0]
+    deltas = second[:1] + list(accumulate(second[1:]))
+    times = _wrapped(list(accumulate(deltas)))
+    encoding = flags >> 1
+    if encoding == _SECONDS:
+        timestamps = array("d", map(float, times))
+    elif encoding == _MICROS:
+        timestamps = array("d", [value / 1_000_000 for value in times])
+    else:
+        timestamps = array("d", array("q", times).tobytes())
+    counters = [array("q", _wrapped(list(accumulate(column)))) for column in columns[1:]]
+    naive = bool(flags & 1) if count else None
+    return SnapshotHistory.from_columns(timestamps, *counters, naive=naive), offset
+
+
+def _time_values(timestamps: array) -> Tuple[int, List[int]]:
+    """Pick the smallest exact integer form of ``timestamps``."""
+
+    if all(abs(value) < _MAX_SECONDS for value in timestamps):
+        if all(value.is_integer() for value in timestamps):
+            return _SECONDS, [int(value) for value in timestamps]
+        micros = [round(value * 1e6) for value in timestamps]
+        if all(micro / 1_000_000 == value for micro, value in zip(micros, timestamps)):
+            return _MICROS, micros
+    return _BITS, array("q", timestamps.tobytes()).tolist()
+
+
+def _deltas(values: List[int]) -> List[int]:
+    return values[:1] + [current - previous for previous, current in zip(values, values[1:])]
+
+
+def _zigzag(value: int) -> int:
+    value = ((value + _SIGN) & _MASK) - _SIGN
+    return ((value << 1) ^ (value >> 63)) & _MASK
+
+
+def _unzigzag(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+
+def _wrapped(values: List[int]) -> List[int]:
+    """Bring sums of wrapped deltas back into the int64 range."""
+
+    if values and (max(values) >= _SIGN or min(values) < -_SIGN):
+        return [((value + _SIGN) & _MASK) - _SIGN for value in values]
+    return values
+
+
+def _put_varints(out: bytearray, values: Any) -> None:
+    append = out.append
+    for value in values:
+        while value > 0x7F:
+            append((value & 0x7F) | 0x80)
+            value >>= 7
+        append(value)
+
+
+def _get_varints(data: BufferLike, offset: int, count: int) -> Tuple[List[int], int]:
+    values = []
+    for _ in range(count):
+        byte = data[offset]
+        offset += 1
+        value = byte & 0x7F
+        shift = 7
+        while byte & 0x80:
+            byte = data[offset]
+            offset += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+        values.append(value)
+    return values, offset
+
+
+def _encode_all_numpy(histories: List[SnapshotHistory]) -> Tuple[bytes, List[int]]:
+    """Encode every block in one vectorized pass; return the bytes and block offsets.
+
+    Produces exactly the bytes ``_encode_block`` would, block after block.
+    """
+
+    import numpy as np
+
+    lengths = np.fromiter((len(history) for history in histories), dtype=np.int64, count=len(histories))
+    samples = int(lengths.sum())
+    starts = np.cumsum(lengths) - lengths
+    nonempty = lengths > 0
+    first = starts[nonempty]
+    spans = lengths[nonempty]
+    # ``bytes.join`` reads the typed arrays' buffers directly, much faster than
+    # wrapping each one in NumPy before concatenating.
+    columns = [
+        np.frombuffer(b"".join([getattr(history, name) for history in histories]), dtype=dtype)
+        for name, dtype in (
+            ("timestamps", np.float64),
+            ("views", np.int64),
+            ("likes", np.int64),
+            ("comments", np.int64),
+            ("shares", np.int64),
+        )
+    ]
+    timestamps = columns[0]
+    with np.errstate(invalid="ignore", over="ignore"):
+        small = np.abs(timestamps) < _MAX_SECONDS
+        whole = timestamps == np.floor(timestamps)
+        micros = np.rint(timestamps * 1e6)
+        exact = micros / 1e6 == timestamps
+        encodings = np.zeros(len(histories), dtype=np.int64)
+        if samples:
+            small_block = np.logical_and.reduceat(small, first)
+            whole_block = np.logical_and.reduceat(whole, first)
+            exact_block = np.logical_and.reduceat(exact, first)
+            encodings[nonempty] = np.where(
+                small_block & whole_block, _SECONDS, np.where(small_block & exact_block, _MICROS, _BITS)
+            )
+        per_sample = np.repeat(encodings[nonempty], spans)
+        times = np.where(
+            per_sample == _SECONDS,
+            timestamps.astype(np.int64),
+            np.where(per_sample == _MICROS, micros.astype(np.int64), timestamps.view(np.int64)),
+        )
+        deltas = _segment_diff(np, times, first)
+        deltas[first] = 0
+        second = _segment_diff(np, deltas, first)
+        second[first] = times[first]
+        encoded = [_zigzag_numpy(np, second)] + [
+            _zigzag_numpy(np, _segment_diff(np, column, first)) for column in columns[1:]
+        ]
+
+    naive = np.fromiter((1 if history._naive else 0 for history in histories), dtype=np.int64, count=len(histories))
+    positions = 2 * np.arange(len(histories), dtype=np.int64) + 5 * starts
+    stream = np.empty(2 * len(histories) + 5 * samples, dtype=np.uint64)
+    stream[positions] = lengths
+    stream[positions + 1] = naive | encodings << 1
+    within = np.arange(samples, dtype=np.int64) - np.repeat(first, spans)
+    base = np.repeat(positions[nonempty] + 2, spans) + within
+    span = np.repeat(spans, spans)
+    for column, values in enumerate(encoded):
+        stream[base + column * span] = values
+
+    sizes = np.ones(len(stream), dtype=np.int64)
+    for shift in range(7, 64, 7):
+        sizes += stream >= np.uint64(1 << shift)
+    ends = np.cumsum(sizes)
+    begins = ends - sizes
+    out = np.empty(int(ends[-1]), dtype=np.uint8)
+    for byte in range(int(sizes.max())):
+        selected = np.flatnonzero(sizes > byte)
+        chunk = (stream[selected] >> np.uint64(7 * byte)) & np.uint64(0x7F)
+        chunk |= (sizes[selected] > byte + 1).astype(np.uint64) << np.uint64(7)
+        out[begins[selected] + byte] = chunk
+    offsets = begins[positions].tolist()
+    offsets.append(int(ends[-1]))
+    return out.tobytes(), offsets
+
+
+def _decode_all_numpy(keys: List[str], counts: List[int], data: BufferLike) -> Dict[str, SnapshotHistory]:
+    """Decode contiguous blocks holding ``counts`` samples each, in one pass."""
+
+    import numpy as np
+
+    raw = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(raw < 0x80)
+    lengths = np.asarray(counts, dtype=np.int64)
+    samples = int(lengths.sum())
+    if len(ends) != 2 * len(keys) + 5 * samples or (len(ends) and ends[-1] != len(raw) - 1):
+        raise ValueError("Corrupt delta history archive")
+    begins = np.empty_like(ends)
+    begins[0] = 0
+    begins[1:] = ends[:-1] + 1
+    sizes = ends - begins + 1
+    stream = np.zeros(len(ends), dtype=np.uint64)
+    for byte in range(int(sizes.max())):
+        selected = np.flatnonzero(sizes > byte)
+        stream[selected] |= (raw[begins[selected] + byte] & 0x7F).astype(np.uint64) << np.uint64(7 * byte)
+
+    starts = np.cumsum(lengths) - lengths
+    positions = 2 * np.arange(len(keys), dtype=np.int64) + 5 * starts
+    if not np.array_equal(stream[positions], lengths.astype(np.uint64)):
+        raise ValueError("Corrupt delta history archive")
+    flags = stream[positions + 1].astype(np.int64)
+    nonempty = lengths > 0
+    first = starts[nonempty]
+    spans = lengths[nonempty]
+    within = np.arange(samples, dtype=np.int64) - np.repeat(first, spans)
+    base = np.repeat(positions[nonempty] + 2, spans) + within
+    span = np.repeat(spans, spans)
+    decoded = [_unzigzag_numpy(np, stream[base + column * span]) for column in range(5)]
+
+    with np.errstate(over="ignore"):
+        second = decoded[0]
+        shifted = second.copy()
+        shifted[first] = 0
+        deltas = _segment_sum(np, shifted, first, spans)
+        deltas[first] = second[first]
+        times = _segment_sum(np, deltas, first, spans)
+        counters = [_segment_sum(np, column, first, spans) for column in decoded[1:]]
+    per_sample = np.repeat(flags[nonempty] >> 1, spans)
+    timestamps = np.where(
+        per_sample == _SECONDS,
+        times.astype(np.float64),
+        np.where(per_sample == _MICROS, times / 1e6, times.view(np.float64)),
+    )
+
+    blobs = [memoryview(column.tobytes()) for column in [timestamps] + counters]
+    histories: Dict[str, SnapshotHistory] = {}
+    for key, start, count, flag in zip(keys, (8 * starts).tolist(), counts, flags.tolist()):
+        end = start + 8 * count
+        columns = []
+        for typecode, blob in zip("dqqqq", blobs):
+            column = array(typecode)
+            column.frombytes(blob[start:end])
+            columns.append(column)
+        histories[key] = SnapshotHistory.from_columns(*columns, naive=bool(flag & 1) if count else None)
+    return histories
+
+
+def _segment_diff(np: Any, values: Any, first: Any) -> Any:
+    """Differences from the previous sample, restarting at every block start."""
+
+    result = np.empty_like(values)
+    if len(values):
+        result[0] = values[0]
+        np.subtract(values[1:], values[:-1], out=result[1:])
+        result[first] = values[first]
+    return result
+
+
+def _segment_sum(np: Any, values: Any, first: Any, spans: Any) -> Any:
+    """Running sums restarting at every block start; inverse of ``_segment_diff``."""
+
+    totals = np.cumsum(values)
+    if not len(values):
+        return totals
+    return totals - np.repeat(totals[first] - values[first], spans)
+
+
+def _zigzag_numpy(np: Any, values: Any) -> Any:
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+
+def _unzigzag_numpy(np: Any, values: Any) -> Any:
+    return (values >> np.uint64(1)).view(np.int64) ^ -(values & np.uint64(1)).view(np.int64)
+
+
+__all__ = ["DELTA_MAGIC", "DeltaArchive", "load_delta_histories", "save_delta_histories"]
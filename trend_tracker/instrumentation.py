@@ -0,0 +1,330 @@
+"""Timings, counters and profiling for the tracker pipeline."""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Callable, ContextManager, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .config import TrackerConfig
+
+
+Labels = Tuple[Tuple[str, str], ...]
+
+HISTORY_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+_HELP = {
+    "stage_seconds": "Wall-clock seconds spent per pipeline stage.",
+    "source_fetch_seconds": "Seconds from a source's first request to its last record.",
+    "source_records_total": "Records delivered per source.",
+    "source_payload_bytes_total": "Payload bytes read per source.",
+    "source_errors_total": "Failed fetches per source.",
+    "source_timeouts_total": "Fetches that missed their deadline per source.",
+    "polls_total": "Completed full polls.",
+    "refreshes_total": "Completed targeted refreshes.",
+    "records_processed_total": "Merged records analyzed.",
+    "store_records": "Records held by the store.",
+    "history_length": "Snapshots of history per merged record.",
+    "forecast_cache_hits": "Forecasts served from the cache since start.",
+    "forecast_cache_misses": "Forecasts computed since start because the cache had none or a stale one.",
+    "forecast_cache_entries": "Forecasts held by the cache.",
+    "metrics_cache_hits": "Memes whose metrics were reused because they did not change, since start.",
+    "metrics_cache_misses": "Memes scored from scratch since start.",
+}
+
+
+class MetricEvent(NamedTuple):
+    """What hooks receive for every timing, counter or gauge update."""
+
+    kind: str  # "timing", "counter" or "gauge"
+    name: str
+    value: float
+    labels: Dict[str, str]
+
+
+Hook = Callable[[MetricEvent], None]
+
+
+class Instrumentation:
+    """Collect per-stage timings and counters and export them.
+
+    Timings are kept as Prometheus summaries (count, sum and max), counters
+    as running totals and gauges as last values. Every update is also passed
+    to the registered hooks, for forwarding to StatsD, logs or tests.
+    ``profile_interval`` attaches a ``SamplingProfiler`` that runs while
+    ``profiling()`` is active.
+    """
+
+    enabled = True
+
+    def __init__(self, *, namespace: str = "trend_tracker", profile_interval: Optional[float] = None) -> None:
+        self.namespace = namespace
+        self.profiler = SamplingProfiler(profile_interval) if profile_interval else None
+        self._lock = threading.Lock()
+        self._hooks: List[Hook] = []
+        self._timings: Dict[Tuple[str, Labels], List[float]] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Tuple[Tuple[float, ...], List[float]]] = {}
+
+    def add_hook(self, hook: Hook) -> None:
+        self._hooks.append(hook)
+
+    def timer(self, stage: str, **labels: str) -> ContextManager[None]:
+        """Time the enclosed block as ``stage``."""
+
+        return self._timer(stage, labels)
+
+    def record_timing(self, name: str, seconds: float, **labels: str) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            summary = self._timings.get(key)
+            if summary is None:
+                summary = self._timings[key] = [0, 0.0, 0.0]
+            summary[0] += 1
+            summary[1] += seconds
+            summary[2] = max(summary[2], seconds)
+        self._emit("timing", name, seconds, labels)
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        self._emit("counter", name, value, labels)
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+        self._emit("gauge", name, value, labels)
+
+    def observe(self, name: str, values: Iterable[float], buckets: Tuple[float, ...], **labels: str) -> None:
+        """Add ``values`` to a histogram with upper bounds ``buckets``."""
+
+        key = (name, _labels(labels))
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                # Per-bucket counts, then +Inf, then the running sum.
+                entry = self._histograms[key] = (buckets, [0] * (len(buckets) + 2))
+            counts = entry[1]
+            total = 0.0
+            for value in values:
+                counts[bisect_left(buckets, value)] += 1
+                total += value
+            counts[-1] += total
+
+    @contextmanager
+    def profiling(self) -> Iterator[None]:
+        """Sample the calling thread's stack while the block runs, if enabled."""
+
+        if self.profiler is None:
+            yield
+            return
+        self.profiler.start()
+        try:
+            yield
+        finally:
+            self.profiler.stop()
+
+    def snapshot(self) -> Dict[str, object]:
+        """Plain-data copy of everything recorded so far."""
+
+        with self._lock:
+            return {
+                "timings": {
+                    _render_key(name, labels): {"count": count, "sum": total, "max": peak}
+                    for (name, labels), (count, total, peak) in self._timings.items()
+                },
+                "counters": {_render_key(*key): value for key, value in self._counters.items()},
+                "gauges": {_render_key(*key): value for key, value in self._gauges.items()},
+                "histograms": {
+                    _render_key(name, labels): {"buckets": list(buckets), "counts": counts[:-1], "sum": counts[-1]}
+                    for (name, labels), (buckets, counts) in self._histograms.items()
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+
+        lines: List[str] = []
+        with self._lock:
+            for name, entries in _by_name(self._timings).items():
+                full = self._header(lines, name, "summary")
+                for labels, (count, total, _) in entries:
+                    lines.append(f"{full}_sum{_format_labels(labels)} {_number(total)}")
+                    lines.append(f"{full}_count{_format_labels(labels)} {count}")
+            for kind, table in (("counter", self._counters), ("gauge", self._gauges)):
+                for name, entries in _by_name(table).items():
+                    full = self._header(lines, name, kind)
+                    for labels, value in entries:
+                        lines.append(f"{full}{_format_labels(labels)} {_number(value)}")
+            for name, entries in _by_name(self._histograms).items():
+                full = self._header(lines, name, "histogram")
+                for labels, (buckets, counts) in entries:
+                    cumulative = 0
+                    for bound, count in zip(buckets + (float("inf"),), counts):
+                        cumulative += count
+                        bucket_labels = labels + (("le", _number(bound)),)
+                        lines.append(f"{full}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                    lines.append(f"{full}_sum{_format_labels(labels)} {_number(counts[-1])}")
+                    lines.append(f"{full}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    @contextmanager
+    def _timer(self, stage: str, labels: Dict[str, str]) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_timing("stage_seconds", time.perf_counter() - started, stage=stage, **labels)
+
+    def _emit(self, kind: str, name: str, value: float, labels: Dict[str, str]) -> None:
+        if self._hooks:
+            event = MetricEvent(kind, name, value, labels)
+            for hook in self._hooks:
+                hook(event)
+
+    def _header(self, lines: List[str], name: str, kind: str) -> str:
+        full = f"{self.namespace}_{name}"
+        if name in _HELP:
+            lines.append(f"# HELP {full} {_HELP[name]}")
+        lines.append(f"# TYPE {full} {kind}")
+        return full
+
+
+class NullInstrumentation(Instrumentation):
+    """Stand-in used when instrumentation is off; every call does nothing."""
+
+    enabled = False
+
+    def __init__(self) -> None:
+        super().__init__()
+
+    def add_hook(self, hook: Hook) -> None:
+        raise RuntimeError("Instrumentation is disabled; pass an Instrumentation instance to add hooks")
+
+    def timer(self, stage: str, **labels: str) -> ContextManager[None]:
+        return _NULL_CONTEXT
+
+    def record_timing(self, name: str, seconds: float, **labels: str) -> None:
+        pass
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        pass
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        pass
+
+    def observe(self, name: str, values: Iterable[float], buckets: Tuple[float, ...], **labels: str) -> None:
+        pass
+
+    def profiling(self) -> ContextManager[None]:
+        return _NULL_CONTEXT
+
+
+class SamplingProfiler:
+    """Statistical profiler that samples one thread's stack from a helper thread.
+
+    Every ``interval`` seconds the target thread's current frame is read via
+    ``sys._current_frames()``, so the profiled code runs at full speed apart
+    from the sampler competing for the GIL. ``collapsed()`` returns the
+    samples in the folded-stack format read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float = 0.005, *, max_depth: int = 64) -> None:
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, thread_id: Optional[int] = None) -> None:
+        if self._thread is not None:
+            return
+        target = threading.get_ident() if thread_id is None else thread_id
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(target,), name="trend-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+    def top(self, limit: int = 20) -> List[Tuple[str, int]]:
+        """Functions that were on top of the stack most often."""
+
+        leaves: Counter = Counter()
+        for stack, count in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(limit)
+
+    def _run(self, target: int) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                continue
+            stack: List[str] = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+
+def build_instrumentation(config: TrackerConfig) -> Instrumentation:
+    """Create the instrumentation selected in the configuration."""
+
+    if not config.instrument and not config.profile_interval:
+        return NullInstrumentation()
+    return Instrumentation(profile_interval=config.profile_interval)
+
+
+_NULL_CONTEXT = nullcontext()
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _by_name(table: Dict[Tuple[str, Labels], object]) -> Dict[str, List[Tuple[Labels, object]]]:
+    grouped: Dict[str, List[Tuple[Labels, object]]] = {}
+    for (name, labels), value in sorted(table.items()):
+        grouped.setdefault(name, []).append((labels, value))
+    return grouped
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _render_key(name: str, labels: Labels) -> str:
+    return f"{name}{_format_labels(labels)}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
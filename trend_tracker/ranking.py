@@ -0,0 +1,183 @@
+"""Incremental top-K ranking of memes by virality score."""
+
+from __future__ import annotations
+
+import heapq
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from .analyzer import TrendMetrics
+
+
+# Higher scores first; ties go to the greater platform, then external id, so
+# the order never depends on which meme was fetched first.
+Rank = Tuple[float, str, str]
+
+
+def rank_of(metric: TrendMetrics) -> Rank:
+    record = metric.record
+    return (metric.virality_score, record.platform, record.external_id)
+
+
+class _Board:
+    """Keys of the ``capacity`` best ranks within one scope.
+
+    ``heap`` is a min-heap over the members that may hold outdated entries;
+    an entry only counts while it matches the member's current rank. When a
+    member drops or leaves, a key outside the board could overtake it, so the
+    board is marked stale and rebuilt from all entries on the next read.
+    """
+
+    __slots__ = ("capacity", "members", "heap", "stale")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.members: Dict[str, Rank] = {}
+        self.heap: List[Tuple[Rank, str]] = []
+        self.stale = False
+
+    def offer(self, key: str, rank: Rank) -> None:
+        if self.stale:
+            return
+        members = self.members
+        previous = members.get(key)
+        if previous is not None:
+            if rank < previous:
+                self.stale = True
+                return
+            members[key] = rank
+            self._push(rank, key)
+            return
+        if len(members) < self.capacity:
+            members[key] = rank
+            self._push(rank, key)
+            return
+        floor_rank, floor_key = self._floor()
+        if rank > floor_rank:
+            heapq.heappop(self.heap)
+            del members[floor_key]
+            members[key] = rank
+            self._push(rank, key)
+
+    def remove(self, key: str) -> None:
+        if self.members.pop(key, None) is not None:
+            self.stale = True
+
+    def rebuild(self, candidates: Iterable[Tuple[Rank, str]]) -> None:
+        best = heapq.nlargest(self.capacity, candidates)
+        self.members = {key: rank for rank, key in best}
+        self.heap = best[::-1]
+        heapq.heapify(self.heap)
+        self.stale = False
+
+    def ordered(self) -> List[str]:
+        return sorted(self.members, key=self.members.__getitem__, reverse=True)
+
+    def _floor(self) -> Tuple[Rank, str]:
+        heap, members = self.heap, self.members
+        while members.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0]
+
+    def _push(self, rank: Rank, key: str) -> None:
+        heapq.heappush(self.heap, (rank, key))
+        if len(self.heap) > 2 * self.capacity + 16:
+            self.heap = [(rank, key) for key, rank in self.members.items()]
+            heapq.heapify(self.heap)
+
+
+class TopKRanking:
+    """Keep the ``capacity`` most viral memes overall and per platform.
+
+    ``update`` costs ``O(log capacity)`` per changed meme. Only when a ranked
+    meme loses score or is discarded is its board rebuilt, in
+    ``O(n log capacity)``, the next time it is read. Memes are ordered by
+    ``rank_of``. Only the best ``capacity`` are ever ranked, so ``top``
+    cannot return more than that.
+    """
+
+    def __init__(self, capacity: int = 50) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._entries: Dict[str, Tuple[Rank, TrendMetrics]] = {}
+        self._boards: Dict[Optional[str], _Board] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def reset(self, metrics: Iterable[TrendMetrics]) -> None:
+        """Replace the ranking with ``metrics``."""
+
+        self._entries.clear()
+        self._boards.clear()
+        self.update(metrics)
+
+    def load(self, metrics: Sequence[TrendMetrics], leaders: Mapping[Optional[str], Iterable[int]]) -> None:
+        """Replace the ranking with ``metrics`` whose best positions are known.
+
+        ``leaders`` maps ``None`` and each platform to positions in ``metrics``
+        that include that scope's top ``capacity`` by ``rank_of``, e.g. the
+        merged shard rankings of ``ShardedAnalytics``. The boards are built
+        from those alone, so no per-meme heap work is done; the result matches
+        ``reset``.
+        """
+
+        self._entries.clear()
+        self._boards.clear()
+        entries = self._entries
+        keys: List[str] = []
+        for metric in metrics:
+            record = metric.record
+            key = f"{record.platform}:{record.external_id}"
+            entries[key] = (rank_of(metric), metric)
+            keys.append(key)
+        for scope, positions in leaders.items():
+            candidates = {keys[position] for position in positions}
+            board = self._boards[scope] = _Board(self.capacity)
+            board.rebuild((entries[key][0], key) for key in candidates)
+
+    def metrics(self) -> Iterator[TrendMetrics]:
+        """Latest metrics of every meme known to the ranking, not just the top ones."""
+
+        for _, metric in self._entries.values():
+            yield metric
+
+    def update(self, metrics: Iterable[TrendMetrics]) -> None:
+        """Insert new memes and re-score known ones."""
+
+        entries = self._entries
+        for metric in metrics:
+            record = metric.record
+            key = f"{record.platform}:{record.external_id}"
+            rank = rank_of(metric)
+            entries[key] = (rank, metric)
+            self._board(None).offer(key, rank)
+            self._board(record.platform).offer(key, rank)
+
+    def discard(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._boards[None].remove(key)
+                self._boards[entry[1].record.platform].remove(key)
+
+    def top(self, limit: Optional[int] = None, *, platform: Optional[str] = None) -> List[TrendMetrics]:
+        """Return up to ``limit`` (at most ``capacity``) metrics, best first."""
+
+        board = self._boards.get(platform)
+        if board is None:
+            return []
+        if board.stale:
+            board.rebuild(
+                (rank, key)
+                for key, (rank, metric) in self._entries.items()
+                if platform is None or metric.record.platform == platform
+            )
+        keys = board.ordered()[:limit]
+        return [self._entries[key][1] for key in keys]
+
+    def _board(self, platform: Optional[str]) -> _Board:
+        board = self._boards.get(platform)
+        if board is None:
+            board = self._boards[platform] = _Board(self.capacity)
+        return board
@@ -0,0 +1,90 @@
+"""Tiered retention of snapshot history."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Optional
+
+from .config import TrackerConfig
+from .data_models import SnapshotHistory
+
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+
+
+@dataclass(slots=True)
+class RetentionPolicy:
+    """How long snapshots are kept at each resolution.
+
+    Snapshots newer than ``raw_window`` seconds are kept as polled. Older
+    ones are rolled up to one sample per hour until ``hourly_window``, then to
+    one per day, and dropped past ``max_age`` when it is set. Ages are
+    measured from a record's latest snapshot, so compacting the same history
+    always gives the same result. ``raw_window=None`` disables rollups.
+
+    Records that no poll has returned for ``ttl`` seconds are evicted from the
+    store; ``ttl=None`` keeps them forever.
+    """
+
+    raw_window: Optional[float] = 6 * HOUR
+    hourly_window: float = 7 * DAY
+    max_age: Optional[float] = None
+    ttl: Optional[float] = None
+    sweep_interval: float = HOUR  # how often the store looks for expired records
+
+    def __post_init__(self) -> None:
+        if self.raw_window is not None and not 0 < self.raw_window <= self.hourly_window:
+            raise ValueError("raw_window must be positive and no longer than hourly_window")
+        if self.max_age is not None and self.raw_window is not None and self.max_age < self.raw_window:
+            raise ValueError("max_age must not be shorter than raw_window")
+
+    def compact(self, history: SnapshotHistory, reference: float) -> SnapshotHistory:
+        """Return ``history`` rolled up relative to the epoch ``reference``.
+
+        The history itself is returned when nothing needs to change.
+        """
+
+        if self.raw_window is None:
+            return history
+        timestamps = history.timestamps
+        raw_start = bisect_left(timestamps, reference - self.raw_window)
+        if raw_start == 0:
+            return history
+        hourly_start = bisect_left(timestamps, reference - self.hourly_window, 0, raw_start)
+        oldest = 0
+        if self.max_age is not None:
+            oldest = bisect_left(timestamps, reference - self.max_age, 0, hourly_start)
+        kept = history.rollup_indices(DAY, oldest, hourly_start)
+        kept += history.rollup_indices(HOUR, hourly_start, raw_start)
+        if oldest == 0 and len(kept) == raw_start:
+            return history
+        kept.extend(range(raw_start, len(timestamps)))
+        return history.select(kept)
+
+    def needs_compaction(self, length: int, compacted_length: int) -> bool:
+        """Whether a history that had ``compacted_length`` samples after its
+        last compaction has grown enough to be compacted again.
+
+        Waiting for the history to grow by half keeps the cost of rollups
+        constant per appended snapshot.
+        """
+
+        return self.raw_window is not None and length >= compacted_length * 3 // 2 + 16
+
+    def expired(self, last_seen: float, now: float) -> bool:
+        return self.ttl is not None and now - last_seen > self.ttl
+
+
+def build_retention_policy(config: TrackerConfig) -> Optional[RetentionPolicy]:
+    """Create the policy described by the configuration, if any."""
+
+    if config.retention_raw_hours is None and config.record_ttl_days is None:
+        return None
+    return RetentionPolicy(
+        raw_window=None if config.retention_raw_hours is None else config.retention_raw_hours * HOUR,
+        hourly_window=config.retention_hourly_days * DAY,
+        max_age=None if config.retention_max_age_days is None else config.retention_max_age_days * DAY,
+        ttl=None if config.record_ttl_days is None else config.record_ttl_days * DAY,
+    )
@@ -0,0 +1,154 @@
+"""Adaptive refresh scheduling for individual memes."""
+
+from __future__ import annotations
+
+import heapq
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .analyzer import TrendMetrics
+
+
+@dataclass(slots=True)
+class ScheduleEntry:
+    key: str
+    interval: float
+    due_at: float
+    heat: float = 0.0
+
+
+class AdaptiveScheduler:
+    """Decide which memes to refresh next within a global request budget.
+
+    Every observed meme gets a refresh interval derived from its "heat": the
+    share of its views gained per hour plus any positive acceleration. Hot
+    memes are refreshed as often as every ``min_interval`` seconds. Memes
+    whose heat stays below ``stale_heat`` back off exponentially towards
+    ``max_interval``. At most ``budget`` refreshes are handed out per
+    ``budget_window`` seconds; when more are due, the hottest and most
+    overdue go first.
+
+    Due times are kept in a heap, so a tick only looks at the memes that
+    are due. Rescheduled memes leave stale heap items behind, which are
+    skipped when popped and dropped whenever the heap grows to twice the
+    number of memes.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_interval: float = 60.0,
+        max_interval: float = 3600.0,
+        base_interval: float = 900.0,
+        budget: int = 100,
+        budget_window: float = 900.0,
+        stale_heat: float = 0.001,
+        backoff: float = 2.0,
+        sensitivity: float = 50.0,
+    ) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.base_interval = base_interval
+        self.budget = budget
+        self.budget_window = budget_window
+        self.stale_heat = stale_heat
+        self.backoff = backoff
+        self.sensitivity = sensitivity
+        self._entries: Dict[str, ScheduleEntry] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._window_start: Optional[float] = None
+        self._spent = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def observe(self, metrics: Iterable[TrendMetrics], now: Optional[float] = None) -> None:
+        """Reschedule memes that were just fetched, based on their metrics."""
+
+        now = time.monotonic() if now is None else now
+        for metric in metrics:
+            record = metric.record
+            key = f"{record.platform}:{record.external_id}"
+            heat = _heat(metric)
+            entry = self._entries.get(key)
+            if heat < self.stale_heat:
+                previous = entry.interval if entry is not None else self.base_interval
+                interval = previous * self.backoff
+            else:
+                interval = self.base_interval / (1 + heat * self.sensitivity)
+            interval = min(max(interval, self.min_interval), self.max_interval)
+            if entry is None:
+                self._entries[key] = ScheduleEntry(key=key, interval=interval, due_at=now + interval, heat=heat)
+            else:
+                entry.interval = interval
+                entry.due_at = now + interval
+                entry.heat = heat
+            self._push(key, now + interval)
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """Return the keys to refresh now and charge them to the budget."""
+
+        now = time.monotonic() if now is None else now
+        if self._window_start is None or now - self._window_start >= self.budget_window:
+            self._window_start = now
+            self._spent = 0
+        remaining = self.budget - self._spent
+        if remaining <= 0:
+            return []
+        heap = self._heap
+        overdue: Dict[str, ScheduleEntry] = {}
+        while heap and heap[0][0] <= now:
+            due_at, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry.due_at == due_at:
+                overdue[key] = entry
+        chosen = heapq.nlargest(
+            remaining,
+            overdue.values(),
+            key=lambda entry: (entry.heat + 1e-9) * (1 + (now - entry.due_at) / entry.interval),
+        )
+        self._spent += len(chosen)
+        for entry in chosen:
+            # Pushed back until ``observe`` reschedules it from fresh metrics,
+            # so a meme no source can refresh does not drain the budget.
+            entry.due_at = now + entry.interval
+        for entry in overdue.values():
+            heapq.heappush(heap, (entry.due_at, entry.key))
+        return [entry.key for entry in chosen]
+
+    def next_wakeup(self) -> Optional[float]:
+        """When ``due`` may next return keys: the earliest due time, or the
+        start of the next budget window once the current one is spent."""
+
+        heap = self._heap
+        while heap:
+            due_at, key = heap[0]
+            entry = self._entries.get(key)
+            if entry is not None and entry.due_at == due_at:
+                break
+            heapq.heappop(heap)
+        next_due = heap[0][0] if heap else None
+        if next_due is None or self._window_start is None or self._spent < self.budget:
+            return next_due
+        return max(next_due, self._window_start + self.budget_window)
+
+    def forget(self, keys: Iterable[str]) -> None:
+        """Stop scheduling ``keys``, e.g. memes the store evicted."""
+
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def _push(self, key: str, due_at: float) -> None:
+        heap = self._heap
+        if len(heap) < 2 * len(self._entries) + 64:
+            heapq.heappush(heap, (due_at, key))
+        else:
+            # The rebuilt heap already holds ``key`` at its new due time.
+            heap[:] = [(entry.due_at, entry.key) for entry in self._entries.values()]
+            heapq.heapify(heap)
+
+
+def _heat(metric: TrendMetrics) -> float:
+    views = max(metric.record.views, 1)
+    return (max(metric.velocity_per_hour, 0.0) + max(metric.acceleration_per_hour, 0.0)) / views
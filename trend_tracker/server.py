@@ -0,0 +1,411 @@
+"""Asyncio HTTP API serving the latest poll from memory.
+
+Endpoints (all ``GET``, JSON bodies):
+
+- ``/health``: snapshot version, generation time and meme count.
+- ``/top?limit=10&platform=tiktok``: best memes by virality score, overall
+  or within one platform.
+- ``/memes/<platform>/<external_id>``: one meme's metrics and history.
+- ``/memes/<platform>/<external_id>/forecast?hours=6``: its projected views.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import json
+import logging
+import threading
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .analyzer import TrendMetrics
+from .config import TrackerConfig
+from .data_models import TrendRecord
+from .forecaster import HoltForecasts, HoltIndex, HoltState, forecast
+from .tracker import TrackerResult
+
+
+logger = logging.getLogger(__name__)
+
+_MAX_HEADERS = 100
+_MAX_FORECAST_HOURS = 168
+# (route, arguments) a response was built for; see ``ReadAPI._route``.
+RouteKey = Tuple[Any, ...]
+
+
+@dataclass(slots=True)
+class Snapshot:
+    """An immutable view of one poll, with the responses built from it so far.
+
+    ``memes`` maps ``platform:external_id`` to metrics whose records are
+    detached copies, so the tracker can keep merging into its own records
+    while the snapshot is being read. With the "holt" forecast model,
+    ``holt_states`` holds copies of the memes' smoothing states.
+    ``responses`` caches complete HTTP responses by request target and
+    ``routes`` by parsed route; both are only filled, never changed, so a
+    response stays valid for the life of the snapshot.
+    """
+
+    version: int
+    generated_at: str
+    memes: Dict[str, TrendMetrics]
+    ranked: List[TrendMetrics]
+    by_platform: Dict[str, List[TrendMetrics]]
+    holt: Optional[HoltIndex] = field(default=None, repr=False)
+    holt_states: Dict[str, HoltState] = field(default_factory=dict, repr=False)
+    responses: Dict[bytes, bytes] = field(default_factory=dict, repr=False)
+    routes: Dict[RouteKey, bytes] = field(default_factory=dict, repr=False)
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+
+class ReadAPI:
+    """Serve the latest published ``TrackerResult`` over HTTP/1.1.
+
+    ``publish`` runs on the polling thread: it copies what the endpoints
+    need into a new ``Snapshot``, renders the default responses and then
+    swaps the snapshot in with a single assignment. Requests are handled on
+    the API's own event loop and only ever read the current snapshot, so
+    they never wait for a poll. A response body is serialized once per
+    snapshot and served from the cache afterwards, with an ``ETag`` of the
+    snapshot version for conditional requests. Caches hold at most
+    ``max_cached`` responses per snapshot; rarer requests beyond that are
+    rendered each time.
+    """
+
+    def __init__(
+        self,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        ranking_size: int = 50,
+        horizon_hours: int = 6,
+        resolution: Optional[float] = None,
+        max_cached: int = 100_000,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.ranking_size = ranking_size
+        self.horizon_hours = horizon_hours
+        self.resolution = resolution
+        self.max_cached = max_cached
+        self._snapshot: Optional[Snapshot] = None
+        self._publish_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def snapshot(self) -> Optional[Snapshot]:
+        return self._snapshot
+
+    def publish(self, result: TrackerResult) -> Snapshot:
+        """Make ``result`` the snapshot served from now on; safe from any thread."""
+
+        with self._publish_lock:
+            previous = self._snapshot
+            reused = previous.memes if previous is not None else {}
+            reused_states = previous.holt_states if previous is not None else {}
+            holt = result.forecasts.index if isinstance(result.forecasts, HoltForecasts) else None
+            memes: Dict[str, TrendMetrics] = {}
+            holt_states: Dict[str, HoltState] = {}
+            if result.load_histories is not None:
+                # Copies serve the history endpoint, so they need more than the newest samples.
+                result.load_histories([metric.record for metric in result.metrics])
+            for metric in [*result.metrics, *result.ranked]:
+                record = metric.record
+                key = f"{record.platform}:{record.external_id}"
+                if key in memes:
+                    continue
+                # Memes this poll did not touch, e.g. ranked memes from earlier polls, keep their copies.
+                copy = reused.get(key)
+                unchanged = copy is not None and _same_metrics(copy, metric)
+                memes[key] = copy if unchanged else replace(metric, record=_detach(record))
+                if holt is not None:
+                    state = reused_states.get(key) if unchanged else None
+                    holt_states[key] = replace(holt.state(record)) if state is None else state
+            ranked = [memes[_key(metric.record)] for metric in result.ranked[: self.ranking_size]]
+            platforms: Dict[str, List[TrendMetrics]] = {}
+            for metric in memes.values():
+                platforms.setdefault(metric.record.platform, []).append(metric)
+            by_platform = {
+                platform: heapq.nlargest(self.ranking_size, members, key=_virality)
+                for platform, members in platforms.items()
+            }
+            snapshot = Snapshot(
+                version=previous.version + 1 if previous is not None else 1,
+                generated_at=datetime.now(timezone.utc).isoformat(),
+                memes=memes,
+                ranked=ranked,
+                by_platform=by_platform,
+                holt=holt,
+                holt_states=holt_states,
+            )
+            for target in (b"/health", b"/top"):
+                self.respond(target, snapshot=snapshot)
+            self._snapshot = snapshot
+        logger.debug("Published snapshot %d with %d memes", snapshot.version, len(memes))
+        return snapshot
+
+    def respond(
+        self, target: bytes, *, if_none_match: Optional[bytes] = None, snapshot: Optional[Snapshot] = None
+    ) -> bytes:
+        """The complete HTTP response to ``GET target``."""
+
+        snapshot = self._snapshot if snapshot is None else snapshot
+        if snapshot is None:
+            return _response(HTTPStatus.SERVICE_UNAVAILABLE, {"error": "no poll has completed yet"})
+        if if_none_match is not None and if_none_match.decode("latin-1") == snapshot.etag:
+            return _response(HTTPStatus.NOT_MODIFIED, None, etag=snapshot.etag)
+        response = snapshot.responses.get(target)
+        if response is not None:
+            return response
+        route = self._route(target)
+        response = snapshot.routes.get(route)
+        if response is None:
+            status, payload = self._render(snapshot, route)
+            response = _response(status, payload, etag=snapshot.etag)
+            if len(snapshot.routes) < self.max_cached:
+                snapshot.routes[route] = response
+        if len(snapshot.responses) < self.max_cached:
+            snapshot.responses[target] = response
+        return response
+
+    def start(self) -> None:
+        """Serve on a background thread; returns once the socket is listening."""
+
+        started = threading.Event()
+        failure: List[BaseException] = []
+
+        def run() -> None:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._loop = loop
+            try:
+                self._server = loop.run_until_complete(
+                    asyncio.start_server(self._serve_connection, self.host, self.port)
+                )
+            except BaseException as exc:
+                failure.append(exc)
+                started.set()
+                loop.close()
+                return
+            self.port = self._server.sockets[0].getsockname()[1]
+            started.set()
+            try:
+                loop.run_forever()
+            finally:
+                self._server.close()
+                # Idle keep-alive connections would otherwise outlive the loop.
+                connections = asyncio.all_tasks(loop)
+                for task in connections:
+                    task.cancel()
+                loop.run_until_complete(asyncio.gather(*connections, return_exceptions=True))
+                loop.run_until_complete(self._server.wait_closed())
+                loop.close()
+
+        self._thread = threading.Thread(target=run, name="trend-api", daemon=True)
+        self._thread.start()
+        started.wait()
+        if failure:
+            raise failure[0]
+        logger.info("Serving the read API on http://%s:%d", self.host, self.port)
+
+    def stop(self) -> None:
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = self._thread = None
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer requests on one connection until the client closes it.
+
+        Connections are kept alive for HTTP/1.1 clients unless they send
+        ``Connection: close``; request bodies are not supported.
+        """
+
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers: Dict[bytes, bytes] = {}
+                for _ in range(_MAX_HEADERS):
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.partition(b":")
+                    headers[name.strip().lower()] = value.strip()
+                parts = request_line.split()
+                if len(parts) != 3:
+                    writer.write(_response(HTTPStatus.BAD_REQUEST, {"error": "malformed request line"}))
+                    break
+                method, target, protocol = parts
+                if method != b"GET":
+                    writer.write(_response(HTTPStatus.METHOD_NOT_ALLOWED, {"error": "only GET is supported"}))
+                    break
+                writer.write(self.respond(target, if_none_match=headers.get(b"if-none-match")))
+                await writer.drain()
+                connection = headers.get(b"connection", b"").lower()
+                if connection == b"close" or (protocol != b"HTTP/1.1" and connection != b"keep-alive"):
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Shutting down; ending quietly keeps asyncio from logging the connection's task as failed.
+            pass
+        finally:
+            writer.close()
+
+    def _route(self, target: bytes) -> RouteKey:
+        """Parse ``target`` into a key that equivalent requests share."""
+
+        parts = urlsplit(target.decode("latin-1"))
+        query = {name: values[-1] for name, values in parse_qs(parts.query).items()}
+        segments = [unquote(segment) for segment in parts.path.strip("/").split("/")]
+        if segments == ["health"]:
+            return ("health",)
+        if segments == ["top"]:
+            return ("top", query.get("platform"), query.get("limit", "10"))
+        if len(segments) == 3 and segments[0] == "memes":
+            return ("meme", f"{segments[1]}:{segments[2]}")
+        if len(segments) == 4 and segments[0] == "memes" and segments[3] == "forecast":
+            return ("forecast", f"{segments[1]}:{segments[2]}", query.get("hours", str(self.horizon_hours)))
+        return ("missing", parts.path)
+
+    def _render(self, snapshot: Snapshot, route: RouteKey) -> Tuple[HTTPStatus, Dict[str, Any]]:
+        kind = route[0]
+        header = {"version": snapshot.version, "generated_at": snapshot.generated_at}
+        if kind == "health":
+            return HTTPStatus.OK, {**header, "memes": len(snapshot.memes)}
+        if kind == "top":
+            _, platform, limit = route
+            if not limit.isdigit():
+                return HTTPStatus.BAD_REQUEST, {"error": "limit must be a non-negative integer"}
+            ranked = snapshot.ranked if platform is None else snapshot.by_platform.get(platform, [])
+            memes = [_meme_payload(metric) for metric in ranked[: min(int(limit), self.ranking_size)]]
+            return HTTPStatus.OK, {**header, "platform": platform, "memes": memes}
+        if kind in ("meme", "forecast"):
+            metric = snapshot.memes.get(route[1])
+            if metric is None:
+                return HTTPStatus.NOT_FOUND, {"error": f"unknown meme {route[1]}"}
+            if kind == "meme":
+                return HTTPStatus.OK, {**header, **_meme_payload(metric), "history": _history_payload(metric.record)}
+            hours = route[2]
+            if not hours.isdigit() or not 1 <= int(hours) <= _MAX_FORECAST_HOURS:
+                return HTTPStatus.BAD_REQUEST, {"error": f"hours must be between 1 and {_MAX_FORECAST_HOURS}"}
+            if snapshot.holt is not None:
+                projection = snapshot.holt.project(metric.record, int(hours), snapshot.holt_states[route[1]])
+            else:
+                projection = forecast([metric.record], int(hours), resolution=self.resolution)[0]
+            return HTTPStatus.OK, {
+                **header,
+                "key": route[1],
+                "horizon_hours": projection.horizon_hours,
+                "projected_views": [
+                    {"timestamp": timestamp.isoformat(), "views": views}
+                    for timestamp, views in projection.projected_views
+                ],
+                "projected_engagement_rate": projection.projected_engagement_rate,
+            }
+        return HTTPStatus.NOT_FOUND, {"error": f"no such endpoint {route[1]}"}
+
+
+def build_read_api(config: TrackerConfig) -> Optional[ReadAPI]:
+    """Create the read API if a port is configured."""
+
+    if config.api_port is None:
+        return None
+    return ReadAPI(
+        host=config.api_host,
+        port=config.api_port,
+        ranking_size=config.ranking_size,
+        resolution=config.forecast_resolution,
+    )
+
+
+def _detach(record: TrendRecord) -> TrendRecord:
+    """A copy of ``record`` that later merges into the original do not touch."""
+
+    return replace(record, tags=list(record.tags), history=record.history.copy())
+
+
+def _same_metrics(copy: TrendMetrics, metric: TrendMetrics) -> bool:
+    """Whether ``copy`` still describes ``metric`` and its record's latest snapshot."""
+
+    original, record = copy.record, metric.record
+    return (
+        copy.virality_score == metric.virality_score
+        and copy.velocity_per_hour == metric.velocity_per_hour
+        and copy.acceleration_per_hour == metric.acceleration_per_hour
+        and original.timestamp == record.timestamp
+        and original.views == record.views
+        and original.likes == record.likes
+        and original.comments == record.comments
+        and original.shares == record.shares
+        and len(original.history) == len(record.history)
+    )
+
+
+def _key(record: TrendRecord) -> str:
+    return f"{record.platform}:{record.external_id}"
+
+
+def _virality(metric: TrendMetrics) -> float:
+    return metric.virality_score
+
+
+def _meme_payload(metric: TrendMetrics) -> Dict[str, Any]:
+    record = metric.record
+    return {
+        "platform": record.platform,
+        "external_id": record.external_id,
+        "title": record.title,
+        "author": record.author,
+        "url": record.url,
+        "country": record.country,
+        "tags": record.tags,
+        "timestamp": record.timestamp.isoformat(),
+        "views": record.views,
+        "likes": record.likes,
+        "comments": record.comments,
+        "shares": record.shares,
+        "engagement_rate": metric.engagement_rate,
+        "velocity_per_hour": metric.velocity_per_hour,
+        "acceleration_per_hour": metric.acceleration_per_hour,
+        "virality_score": metric.virality_score,
+    }
+
+
+def _history_payload(record: TrendRecord) -> List[Dict[str, Any]]:
+    return [
+        {
+            "timestamp": snapshot.timestamp.isoformat(),
+            "views": snapshot.views,
+            "likes": snapshot.likes,
+            "comments": snapshot.comments,
+            "shares": snapshot.shares,
+        }
+        for snapshot in record.iter_history()
+    ]
+
+
+def _response(status: HTTPStatus, payload: Optional[Dict[str, Any]], *, etag: Optional[str] = None) -> bytes:
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    head = [f"HTTP/1.1 {status.value} {status.phrase}"]
+    if payload is not None:
+        head.append("Content-Type: application/json")
+    if status is not HTTPStatus.NOT_MODIFIED:
+        head.append(f"Content-Length: {len(body)}")
+    if etag is not None:
+        head.extend([f"ETag: {etag}", "Cache-Control: no-cache"])
+    return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+
+__all__ = ["ReadAPI", "Snapshot", "build_read_api"]
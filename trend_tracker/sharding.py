@@ -0,0 +1,356 @@
+"""Metrics, forecasts and rankings computed across a pool of worker processes."""
+
+from __future__ import annotations
+
+import logging
+import zlib
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from datetime import datetime
+from operator import attrgetter, itemgetter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .analyzer import MetricsBatch, _as_of_epoch, _utc_epoch, score_columns
+from .compat import numpy_available
+from .config import TrackerConfig
+from .data_models import TrendRecord
+from .forecaster import BatchForecast, fit_columns
+
+
+logger = logging.getLogger(__name__)
+
+_TIMESTAMP = attrgetter("timestamp")
+_TZINFO = attrgetter("tzinfo")
+_PLATFORM = attrgetter("platform")
+_HISTORY_TIMES = attrgetter("history.timestamps")
+_HISTORY_VIEWS = attrgetter("history.views")
+_COUNTERS = tuple(attrgetter(name) for name in ("views", "likes", "comments", "shares"))
+_SCORE = itemgetter(0)
+
+
+@dataclass(slots=True)
+class Shard:
+    """Columns of the records that hash to one shard, in their original order.
+
+    Only plain arrays cross the process boundary: ``positions`` in the full
+    batch, platform codes, timestamps, the four counters, and each record's
+    history flattened into ``times``/``views`` with ``lengths`` samples per
+    record. Without forecasts, only the last three samples are sent.
+
+    A key that occurs more than once in a batch is ranked like ``TopKRanking``
+    ranks it: by its last occurrence (``ranked``).
+    """
+
+    positions: Any
+    ranked: Any
+    platforms: Any
+    epochs: Any
+    freshness_epochs: Any
+    counters: Any
+    lengths: Any
+    times: Any
+    views: Any
+
+
+@dataclass(slots=True)
+class ShardResult:
+    """What a worker sends back: metric columns, its leaders and optional fits."""
+
+    positions: Any
+    engagement_rate: Any
+    velocity_per_hour: Any
+    acceleration_per_hour: Any
+    virality_score: Any
+    leaders: Dict[Optional[int], List[Tuple[float, int]]]
+    forecast: Optional[BatchForecast] = None
+
+
+@dataclass(slots=True)
+class ShardedOutcome:
+    """Merged results, aligned with the records passed to ``analyze``.
+
+    ``leaders`` maps ``None`` and each platform to the positions of the best
+    ``ranking_size`` memes by virality, plus any tied with the last of them:
+    shards cannot see the keys that break ties, ``TopKRanking.load`` can.
+    """
+
+    metrics: MetricsBatch
+    leaders: Dict[Optional[str], List[int]]
+    forecasts: Optional[BatchForecast] = None
+
+
+class ShardedAnalytics:
+    """Split records by key hash across a process pool and merge the results.
+
+    Each record's ``platform:external_id`` key is hashed with CRC32 so a meme
+    always lands on the same shard. Shards travel as NumPy arrays rather than
+    pickled ``TrendRecord`` objects, workers run the same vectorized kernels
+    as ``calculate_metrics_batch`` and ``forecast_batch``, and each returns
+    its metric columns plus its own top ``ranking_size`` per scope. The parent
+    scatters the columns back and merges the small shard rankings, so
+    results match the single-process path exactly.
+
+    This is an experiment, not a speed-up: the parent still reads every
+    record to build the columns, which is most of the scoring work (about
+    nine tenths of it on 300k memes with three samples each), so only the
+    arithmetic runs in parallel and the transfers can cost more than it
+    saves. Requires NumPy.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        *,
+        shards: Optional[int] = None,
+        ranking_size: int = 50,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be positive")
+        if not numpy_available():
+            raise RuntimeError("Sharded analytics needs NumPy")
+        self.workers = workers
+        self.shards = shards or workers
+        self.ranking_size = ranking_size
+        self._executor = executor
+
+    def analyze(
+        self,
+        records: Sequence[TrendRecord],
+        *,
+        as_of: Optional[datetime] = None,
+        horizon_hours: Optional[int] = None,
+        resolution: Optional[float] = None,
+    ) -> ShardedOutcome:
+        """Score ``records`` and, with ``horizon_hours``, fit their forecasts.
+
+        ``resolution`` resamples histories for the forecasts as in
+        ``forecast_batch``; metrics always use the raw samples.
+        """
+
+        import numpy as np
+
+        records = list(records)
+        now = _as_of_epoch(as_of)
+        count = len(records)
+        platforms = sorted(set(map(_PLATFORM, records)))
+        shards = _split(np, records, platforms, self.shards, full_history=horizon_hours is not None)
+        arguments = (now, self.ranking_size, horizon_hours, resolution)
+        if len(shards) == 1:
+            results = [_analyze_shard(shard, *arguments) for shard in shards]
+        else:
+            executor = self._pool()
+            futures = [executor.submit(_analyze_shard, shard, *arguments) for shard in shards]
+            results = [future.result() for future in futures]
+
+        engagement, velocity, acceleration, virality = (np.empty(count) for _ in range(4))
+        for result in results:
+            engagement[result.positions] = result.engagement_rate
+            velocity[result.positions] = result.velocity_per_hour
+            acceleration[result.positions] = result.acceleration_per_hour
+            virality[result.positions] = result.virality_score
+        metrics = MetricsBatch(records, engagement, velocity, acceleration, virality)
+
+        leaders: Dict[Optional[str], List[int]] = {}
+        for code in [None, *range(len(platforms))]:
+            candidates = [entry for result in results for entry in result.leaders.get(code, ())]
+            if candidates:
+                candidates.sort(key=_SCORE, reverse=True)
+                cut = _with_ties([score for score, _ in candidates], self.ranking_size)
+                leaders[None if code is None else platforms[code]] = [position for _, position in candidates[:cut]]
+
+        forecasts = None
+        if horizon_hours is not None:
+            forecasts = _merge_forecasts(np, records, horizon_hours, results)
+        return ShardedOutcome(metrics=metrics, leaders=leaders, forecasts=forecasts)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Forking a process that runs fetch and compaction threads can
+            # deadlock the child, so workers always start from scratch.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+
+def build_sharded_analytics(config: TrackerConfig) -> Optional[ShardedAnalytics]:
+    """Create the process pool selected in the configuration, if any."""
+
+    if config.analytics_workers <= 1:
+        return None
+    if not numpy_available():
+        logger.warning("Sharded analytics needs NumPy; computing metrics in-process")
+        return None
+    return ShardedAnalytics(config.analytics_workers, ranking_size=config.ranking_size)
+
+
+def _split(
+    np: Any, records: List[TrendRecord], platforms: List[str], shards: int, *, full_history: bool
+) -> List[Shard]:
+    count = len(records)
+    codes = {platform: code for code, platform in enumerate(platforms)}
+    platform_codes = np.fromiter(map(codes.__getitem__, map(_PLATFORM, records)), dtype=np.int16, count=count)
+    timestamps = list(map(_TIMESTAMP, records))
+    epochs = np.fromiter(map(datetime.timestamp, timestamps), dtype=np.float64, count=count)
+    freshness_epochs = epochs
+    if not all(map(_TZINFO, timestamps)):
+        freshness_epochs = np.fromiter(map(_utc_epoch, timestamps), dtype=np.float64, count=count)
+    counters = np.empty((count, 4), dtype=np.int64)
+    for column, getter in enumerate(_COUNTERS):
+        counters[:, column] = np.fromiter(map(getter, records), dtype=np.int64, count=count)
+
+    history_times = list(map(_HISTORY_TIMES, records))
+    lengths = np.fromiter(map(len, history_times), dtype=np.int64, count=count)
+    times = np.frombuffer(b"".join(history_times), dtype=np.float64)
+    views = np.frombuffer(b"".join(map(_HISTORY_VIEWS, records)), dtype=np.int64)
+    owners = np.repeat(np.arange(count), lengths)
+    if not full_history:
+        # Metrics only read the last three samples of each history.
+        ends = np.cumsum(lengths)
+        keep = np.repeat(ends, lengths) - np.arange(times.size) <= 3
+        times, views, owners = times[keep], views[keep], owners[keep]
+        lengths = np.minimum(lengths, 3)
+
+    keys = [f"{record.platform}:{record.external_id}" for record in records]
+    ranked = np.ones(count, dtype=bool)
+    if len(set(keys)) < count:
+        last = {key: position for position, key in enumerate(keys)}
+        ranked = np.zeros(count, dtype=bool)
+        ranked[list(last.values())] = True
+
+    # Small integer shard ids let the stable sorts below run as radix sorts.
+    assignment = np.fromiter(
+        (zlib.crc32(key.encode("utf-8")) % shards for key in keys), dtype=np.int16, count=count
+    )
+    rows = np.argsort(assignment, kind="stable")
+    row_bounds = np.searchsorted(assignment[rows], np.arange(shards + 1))
+    sample_assignment = assignment[owners]
+    samples = np.argsort(sample_assignment, kind="stable")
+    sample_bounds = np.searchsorted(sample_assignment[samples], np.arange(shards + 1))
+    result: List[Shard] = []
+    for shard in range(shards):
+        selected = rows[row_bounds[shard] : row_bounds[shard + 1]]
+        if not selected.size:
+            continue
+        taken = samples[sample_bounds[shard] : sample_bounds[shard + 1]]
+        result.append(
+            Shard(
+                positions=selected,
+                ranked=ranked[selected],
+                platforms=platform_codes[selected],
+                epochs=epochs[selected],
+                freshness_epochs=freshness_epochs[selected],
+                counters=counters[selected],
+                lengths=lengths[selected],
+                times=times[taken],
+                views=views[taken],
+            )
+        )
+    return result
+
+
+def _analyze_shard(
+    shard: Shard, now: float, ranking_size: int, horizon_hours: Optional[int], resolution: Optional[float]
+) -> ShardResult:
+    import numpy as np
+
+    count = len(shard.positions)
+    lengths = shard.lengths
+    ends = np.cumsum(lengths)
+    last_times = np.full((count, 4), -np.inf)
+    last_views = np.zeros((count, 4), dtype=np.float64)
+    for offset in (1, 2, 3):
+        rows = np.flatnonzero(lengths >= offset)
+        if not rows.size:
+            break
+        last_times[rows, 3 - offset] = shard.times[ends[rows] - offset]
+        last_views[rows, 3 - offset] = shard.views[ends[rows] - offset]
+    last_times[:, 3] = shard.epochs
+    last_views[:, 3] = shard.counters[:, 0]
+    engagement, velocity, acceleration, virality = score_columns(
+        np, now, shard.counters, shard.freshness_epochs, lengths, last_times, last_views
+    )
+
+    order = np.argsort(-virality, kind="stable")
+    order = order[shard.ranked[order]]
+    leaders: Dict[Optional[int], List[Tuple[float, int]]] = {}
+    for code in [None, *np.unique(shard.platforms).tolist()]:
+        best = order if code is None else order[shard.platforms[order] == code]
+        scores = virality[best].tolist()
+        cut = _with_ties(scores, ranking_size)
+        leaders[code] = list(zip(scores[:cut], shard.positions[best[:cut]].tolist()))
+
+    forecast = None
+    if horizon_hours is not None:
+        times, views = shard.times, shard.views
+        if resolution:
+            times, views, lengths = _resample(np, times, views, lengths, resolution)
+        counters = [shard.counters[:, column] for column in range(4)]
+        forecast = fit_columns(np, [], horizon_hours, shard.epochs, counters, lengths, times, views)
+    return ShardResult(
+        positions=shard.positions,
+        engagement_rate=engagement,
+        velocity_per_hour=velocity,
+        acceleration_per_hour=acceleration,
+        virality_score=virality,
+        leaders=leaders,
+        forecast=forecast,
+    )
+
+
+def _with_ties(scores: List[float], limit: int) -> int:
+    """How many of the descending ``scores`` make the top ``limit``, counting ties with the last of them."""
+
+    cut = min(limit, len(scores))
+    while cut < len(scores) and scores[cut] == scores[cut - 1]:
+        cut += 1
+    return cut
+
+
+def _resample(np: Any, times: Any, views: Any, lengths: Any, resolution: float) -> Tuple[Any, Any, Any]:
+    """Keep the last sample per ``resolution`` bucket, like ``SnapshotHistory.resample``."""
+
+    if not times.size:
+        return times, views, lengths
+    owners = np.repeat(np.arange(len(lengths)), lengths)
+    buckets = times // resolution
+    keep = np.ones(times.size, dtype=bool)
+    keep[:-1] = (buckets[:-1] != buckets[1:]) | (owners[:-1] != owners[1:])
+    return times[keep], views[keep], np.bincount(owners[keep], minlength=len(lengths))
+
+
+def _merge_forecasts(
+    np: Any, records: List[TrendRecord], horizon_hours: int, results: List[ShardResult]
+) -> BatchForecast:
+    count = len(records)
+    anchors = np.empty(count)
+    slopes = np.empty(count)
+    intercepts = np.empty(count)
+    projected = np.empty((count, horizon_hours))
+    engagement = np.empty(count)
+    for result in results:
+        fit, rows = result.forecast, result.positions
+        anchors[rows] = fit.anchors
+        slopes[rows] = fit.slopes
+        intercepts[rows] = fit.intercepts
+        projected[rows] = fit.projected_views
+        engagement[rows] = fit.projected_engagement_rate
+    return BatchForecast(
+        records=records,
+        horizon_hours=horizon_hours,
+        hours=np.arange(1, horizon_hours + 1),
+        anchors=anchors,
+        slopes=slopes,
+        intercepts=intercepts,
+        projected_views=projected,
+        projected_engagement_rate=engagement,
+    )
@@ -0,0 +1,479 @@
+"""SQLite-backed persistence with indexed historical queries."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from array import array
+from datetime import datetime, timezone
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .clustering import ClusterIndex
+from .data_models import MetricSnapshot, SnapshotHistory, TrendRecord
+from .forecaster import HoltIndex
+from .instrumentation import Instrumentation
+from .retention import DAY, HOUR, RetentionPolicy
+from .storage import TrendStore, _adopt, _merge, _moved, _serialize_record
+from .tags import TagIndex
+
+
+_SQLITE_HEADER = b"SQLite format 3\x00"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    platform TEXT NOT NULL,
+    external_id TEXT NOT NULL,
+    title TEXT,
+    author TEXT,
+    url TEXT,
+    caption TEXT,
+    language TEXT,
+    tags TEXT,
+    country TEXT,
+    timestamp REAL NOT NULL,
+    aware INTEGER NOT NULL,
+    views INTEGER NOT NULL,
+    likes INTEGER NOT NULL,
+    comments INTEGER NOT NULL,
+    shares INTEGER NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (platform, external_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS records_last_seen ON records (last_seen);
+CREATE INDEX IF NOT EXISTS records_platform_views ON records (platform, views DESC);
+CREATE TABLE IF NOT EXISTS snapshots (
+    platform TEXT NOT NULL,
+    external_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    aware INTEGER NOT NULL,
+    views INTEGER NOT NULL,
+    likes INTEGER NOT NULL,
+    comments INTEGER NOT NULL,
+    shares INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_key_timestamp ON snapshots (platform, external_id, timestamp);
+"""
+
+_SNAPSHOT_COLUMNS = "timestamp, aware, views, likes, comments, shares"
+_IDENTITY = itemgetter(0, 1)
+_BATCH_KEYS = 1024  # identities looked up per query, well under SQLite's parameter limit
+# Samples read back per record when merging a poll: the newest orders and
+# dedups the poll, and scoring reads no further back than three.
+_MERGE_TAIL = 3
+
+_TAIL_QUERY = """
+SELECT s.platform, s.external_id, s.timestamp, s.aware, s.views, s.likes, s.comments, s.shares
+FROM wanted JOIN snapshots AS s ON s.rowid IN (
+    SELECT rowid FROM snapshots
+    WHERE platform = wanted.platform AND external_id = wanted.external_id
+    ORDER BY timestamp DESC, rowid DESC LIMIT ?
+)
+ORDER BY s.platform, s.external_id, s.timestamp, s.rowid
+"""
+
+_RECORD_COLUMNS = (
+    "platform, external_id, title, author, url, caption, language, tags, country, "
+    "timestamp, aware, views, likes, comments, shares"
+)
+
+_UPSERT_RECORD = f"""
+INSERT INTO records ({_RECORD_COLUMNS}, last_seen)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (platform, external_id) DO UPDATE SET
+    title = excluded.title,
+    author = excluded.author,
+    url = excluded.url,
+    caption = excluded.caption,
+    language = excluded.language,
+    tags = excluded.tags,
+    country = excluded.country,
+    timestamp = excluded.timestamp,
+    aware = excluded.aware,
+    views = excluded.views,
+    likes = excluded.likes,
+    comments = excluded.comments,
+    shares = excluded.shares,
+    last_seen = excluded.last_seen
+"""
+
+_INSERT_SNAPSHOT = """
+INSERT INTO snapshots (platform, external_id, timestamp, aware, views, likes, comments, shares)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Keeps the latest snapshot of every (record, bucket) in a time range.
+_ROLL_UP_SNAPSHOTS = """
+DELETE FROM snapshots WHERE rowid IN (
+    SELECT rowid FROM (
+        SELECT rowid, ROW_NUMBER() OVER (
+            PARTITION BY platform, external_id, CAST(timestamp / ? AS INTEGER)
+            ORDER BY timestamp DESC, rowid DESC
+        ) AS position
+        FROM snapshots WHERE timestamp >= ? AND timestamp < ?
+    ) WHERE position > 1
+)
+"""
+
+
+class SQLiteTrendStore(TrendStore):
+    """Keep records and their snapshot history in indexed SQLite tables.
+
+    Only the records touched by a poll are read back, with just their newest
+    samples, and each poll is written in a single transaction, so a poll
+    costs the same after months of history. Records returned by ``update``
+    therefore hold a short history: enough to score them, while
+    ``load_histories`` reads the rest for the ones that are reported,
+    exported or served. ``records`` and the query helpers load whole
+    histories. The query helpers hit the indexes directly, so dashboards can
+    look up recent or top records without loading the state.
+
+    Retention runs as periodic SQL sweeps; unlike the file stores, snapshot
+    ages are measured from the sweep time rather than each record's latest
+    snapshot.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        retention: Optional[RetentionPolicy] = None,
+        archive_path: Optional[str] = None,
+        tag_index: Optional[TagIndex] = None,
+        holt_index: Optional[HoltIndex] = None,
+        max_extra: int = 0,
+        instrumentation: Optional[Instrumentation] = None,
+        cluster_index: Optional[ClusterIndex] = None,
+    ) -> None:
+        super().__init__(
+            path,
+            retention=retention,
+            archive_path=archive_path,
+            tag_index=tag_index,
+            holt_index=holt_index,
+            max_extra=max_extra,
+            instrumentation=instrumentation,
+            cluster_index=cluster_index,
+        )
+        if not _is_database(self.path):
+            raise ValueError(f"{self.path} is not an SQLite database; point the state path at a .db file")
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+        # Records returned by the last update that only hold their newest samples.
+        self._partial: Dict[int, TrendRecord] = {}
+
+    def save(self) -> None:
+        self._connection.commit()
+
+    def _open(self) -> None:
+        pass  # Tables are queried on demand.
+
+    def update(self, records: Iterable[TrendRecord], *, save: bool = True) -> List[TrendRecord]:
+        # Every poll is committed as one transaction, whatever ``save`` says.
+        self._ensure_open()
+        merged: List[TrendRecord] = []
+        record_rows: List[Tuple[object, ...]] = []
+        snapshot_rows: List[Tuple[object, ...]] = []
+        pending: Dict[Tuple[str, str], TrendRecord] = {}
+        changed: Set[str] = set()
+        seen_at = time.time()
+        partial: Dict[int, TrendRecord] = {}
+        with self._connection:
+            for chunk in self._timed(records, "merge"):
+                # Two queries per chunk read back the records it touches and their newest samples.
+                missing = {(record.platform, record.external_id) for record in chunk}.difference(pending)
+                loaded = {
+                    (record.platform, record.external_id): record for record in self._load(missing, tail=_MERGE_TAIL)
+                }
+                for record in chunk:
+                    identity = (record.platform, record.external_id)
+                    stored = pending.get(identity) or loaded.get(identity)
+                    if stored is None:
+                        merged_record = _adopt(record, self.max_extra)
+                        snapshots = record.history
+                        changed.add(self._key(record))
+                    else:
+                        # ``_merge`` works in place, so read the stored snapshot first.
+                        snapshots = [stored.current_snapshot()]
+                        if _moved(stored, record):
+                            changed.add(self._key(record))
+                        if identity in loaded and len(stored.history) >= _MERGE_TAIL:
+                            partial[id(stored)] = stored
+                        merged_record = _merge(stored, record, self.max_extra)
+                    snapshot_rows.extend(_snapshot_row(identity, snap) for snap in snapshots)
+                    record_rows.append(_record_row(merged_record) + (seen_at,))
+                    pending[identity] = merged_record
+                    if self.tag_index is not None:
+                        self.tag_index.update(self._key(record), merged_record, now=seen_at)
+                    if self.holt_index is not None:
+                        self.holt_index.update(self._key(record), merged_record)
+                    merged.append(merged_record)
+            started = time.perf_counter()
+            self._connection.executemany(_INSERT_SNAPSHOT, snapshot_rows)
+            self._connection.executemany(_UPSERT_RECORD, record_rows)
+        # Leaving the block commits, which belongs to the write.
+        self.instrumentation.record_timing("stage_seconds", time.perf_counter() - started, stage="save")
+        self._partial = partial
+        self.changed = changed
+        self.evicted = self.evict_expired(seen_at)
+        return merged
+
+    def evict_expired(self, now: Optional[float] = None, *, force: bool = False) -> List[str]:
+        """Apply the retention policy: drop stale records and roll up old snapshots."""
+
+        policy = self.retention
+        if policy is None:
+            return []
+        now = time.time() if now is None else now
+        if not force and now < self._next_sweep:
+            return []
+        self._next_sweep = now + policy.sweep_interval
+        expired: List[Tuple[str, str]] = []
+        with self._connection:
+            if policy.ttl is not None:
+                cutoff = now - policy.ttl
+                expired = self._connection.execute(
+                    "SELECT platform, external_id FROM records WHERE last_seen < ?", (cutoff,)
+                ).fetchall()
+                if expired and self.archive_path is not None:
+                    self._archive(expired)
+                self._connection.executemany(
+                    "DELETE FROM snapshots WHERE platform = ? AND external_id = ?", expired
+                )
+                self._connection.execute("DELETE FROM records WHERE last_seen < ?", (cutoff,))
+            if policy.raw_window is not None:
+                raw_start = now - policy.raw_window
+                hourly_start = now - policy.hourly_window
+                self._connection.execute(_ROLL_UP_SNAPSHOTS, (HOUR, hourly_start, raw_start))
+                self._connection.execute(_ROLL_UP_SNAPSHOTS, (DAY, float("-inf"), hourly_start))
+                if policy.max_age is not None:
+                    self._connection.execute("DELETE FROM snapshots WHERE timestamp < ?", (now - policy.max_age,))
+        keys = [f"{platform}:{external_id}" for platform, external_id in expired]
+        if self.tag_index is not None:
+            self.tag_index.discard(keys, now=now)
+        if self.holt_index is not None:
+            self.holt_index.discard(keys)
+        if self.cluster_index is not None:
+            self.cluster_index.discard(keys)
+        return keys
+
+    def _archive(self, identities: List[Tuple[str, str]]) -> None:
+        with open(self.archive_path, "a", encoding="utf-8") as handle:
+            for start in range(0, len(identities), _BATCH_KEYS):
+                for record in self._load(identities[start : start + _BATCH_KEYS]):
+                    handle.write(json.dumps(_serialize_record(record)) + "\n")
+
+    def records(self) -> List[TrendRecord]:
+        rows = self._connection.execute(f"SELECT {_RECORD_COLUMNS} FROM records").fetchall()
+        samples = self._connection.execute(
+            f"SELECT platform, external_id, {_SNAPSHOT_COLUMNS} FROM snapshots "
+            "ORDER BY platform, external_id, timestamp, rowid"
+        )
+        histories = _group_histories(samples)
+        records = list(map(_row_to_record, rows))
+        for record in records:
+            history = histories.get((record.platform, record.external_id))
+            if history is not None:
+                record.history = history
+        return records
+
+    def count(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def recent(self, hours: float, *, with_history: bool = False) -> List[TrendRecord]:
+        """Return records seen by a poll within the last ``hours`` hours."""
+
+        cutoff = time.time() - hours * 3600
+        rows = self._connection.execute(
+            f"SELECT {_RECORD_COLUMNS} FROM records WHERE last_seen >= ? ORDER BY last_seen DESC",
+            (cutoff,),
+        ).fetchall()
+        return self._build(rows, with_history)
+
+    def history(self, key: str, since: Optional[datetime] = None) -> List[MetricSnapshot]:
+        """Return stored snapshots for ``platform:external_id`` ordered by time."""
+
+        platform, _, external_id = key.partition(":")
+        query = f"SELECT {_SNAPSHOT_COLUMNS} FROM snapshots WHERE platform = ? AND external_id = ?"
+        params: List[object] = [platform, external_id]
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(since.timestamp())
+        rows = self._connection.execute(query + " ORDER BY timestamp, rowid", params).fetchall()
+        return [_row_to_snapshot(row) for row in rows]
+
+    def top_by_views(
+        self, platform: str, limit: int = 10, *, with_history: bool = False
+    ) -> List[TrendRecord]:
+        """Return the ``limit`` most viewed records for ``platform``."""
+
+        rows = self._connection.execute(
+            f"SELECT {_RECORD_COLUMNS} FROM records WHERE platform = ? ORDER BY views DESC LIMIT ?",
+            (platform, limit),
+        ).fetchall()
+        return self._build(rows, with_history)
+
+    def load_histories(self, records: Iterable[TrendRecord]) -> None:
+        """Give records returned by the last ``update`` their whole history back."""
+
+        partial = [record for record in records if self._partial.pop(id(record), None) is record]
+        for start in range(0, len(partial), _BATCH_KEYS):
+            batch = partial[start : start + _BATCH_KEYS]
+            histories = self._histories([(record.platform, record.external_id) for record in batch])
+            for record in batch:
+                record.history = histories.get((record.platform, record.external_id), SnapshotHistory())
+
+    def _load(self, identities: Iterable[Tuple[str, str]], *, tail: Optional[int] = None) -> List[TrendRecord]:
+        """Records for up to ``_BATCH_KEYS`` identities, with their last ``tail`` samples or all of them."""
+
+        wanted = list(identities)
+        if not wanted:
+            return []
+        params = [part for identity in wanted for part in identity]
+        rows = self._connection.execute(
+            _wanted(len(wanted)) + f"SELECT {_RECORD_COLUMNS} FROM records JOIN wanted USING (platform, external_id)",
+            params,
+        ).fetchall()
+        histories = self._histories(wanted, tail=tail)
+        records = list(map(_row_to_record, rows))
+        for record in records:
+            history = histories.get((record.platform, record.external_id))
+            if history is not None:
+                record.history = history
+        return records
+
+    def _histories(
+        self, identities: List[Tuple[str, str]], *, tail: Optional[int] = None
+    ) -> Dict[Tuple[str, str], SnapshotHistory]:
+        params: List[object] = [part for identity in identities for part in identity]
+        if tail is None:
+            query = (
+                f"SELECT platform, external_id, {_SNAPSHOT_COLUMNS} FROM snapshots JOIN wanted "
+                "USING (platform, external_id) ORDER BY platform, external_id, timestamp, snapshots.rowid"
+            )
+        else:
+            # Each key's newest samples come straight off the index, however long its history.
+            query = _TAIL_QUERY
+            params.append(tail)
+        samples = self._connection.execute(_wanted(len(identities)) + query, params)
+        return _group_histories(samples)
+
+    def _build(self, rows: Sequence[Tuple[object, ...]], with_history: bool) -> List[TrendRecord]:
+        records = [_row_to_record(row) for row in rows]
+        if with_history:
+            for start in range(0, len(records), _BATCH_KEYS):
+                batch = records[start : start + _BATCH_KEYS]
+                histories = self._histories([(record.platform, record.external_id) for record in batch])
+                for record in batch:
+                    record.history = histories.get((record.platform, record.external_id), record.history)
+        return records
+
+
+def _wanted(count: int) -> str:
+    """A ``wanted (platform, external_id)`` table of ``count`` parameter pairs."""
+
+    return f"WITH wanted (platform, external_id) AS (VALUES {', '.join(['(?, ?)'] * count)}) "
+
+
+def _group_histories(samples: Iterable[Tuple[object, ...]]) -> Dict[Tuple[str, str], SnapshotHistory]:
+    """Histories from snapshot rows that lead with their key and come grouped by it, in time order."""
+
+    histories: Dict[Tuple[str, str], SnapshotHistory] = {}
+    for identity, group in groupby(samples, key=_IDENTITY):
+        _, _, timestamps, aware, views, likes, comments, shares = zip(*group)
+        histories[identity] = SnapshotHistory.from_columns(
+            array("d", timestamps),
+            array("q", views),
+            array("q", likes),
+            array("q", comments),
+            array("q", shares),
+            naive=not aware[0],
+        )
+    return histories
+
+
+def _record_row(record: TrendRecord) -> Tuple[object, ...]:
+    return (
+        record.platform,
+        record.external_id,
+        record.title,
+        record.author,
+        record.url,
+        record.caption,
+        record.language,
+        json.dumps(record.tags),
+        record.country,
+        record.timestamp.timestamp(),
+        int(record.timestamp.tzinfo is not None),
+        record.views,
+        record.likes,
+        record.comments,
+        record.shares,
+    )
+
+
+def _snapshot_row(identity: Tuple[str, str], snap: MetricSnapshot) -> Tuple[object, ...]:
+    return (
+        identity[0],
+        identity[1],
+        snap.timestamp.timestamp(),
+        int(snap.timestamp.tzinfo is not None),
+        snap.views,
+        snap.likes,
+        snap.comments,
+        snap.shares,
+    )
+
+
+def _row_to_record(row: Sequence[object]) -> TrendRecord:
+    return TrendRecord(
+        platform=row[0],
+        external_id=row[1],
+        title=row[2],
+        author=row[3],
+        url=row[4],
+        caption=row[5],
+        language=row[6],
+        tags=json.loads(row[7]) if row[7] else [],
+        country=row[8],
+        timestamp=_from_epoch(row[9], row[10]),
+        views=row[11],
+        likes=row[12],
+        comments=row[13],
+        shares=row[14],
+    )
+
+
+def _row_to_snapshot(row: Sequence[object]) -> MetricSnapshot:
+    return MetricSnapshot(
+        timestamp=_from_epoch(row[0], row[1]),
+        views=row[2],
+        likes=row[3],
+        comments=row[4],
+        shares=row[5],
+    )
+
+
+def _from_epoch(value: float, aware: int) -> datetime:
+    if aware:
+        return datetime.fromtimestamp(value, timezone.utc)
+    return datetime.fromtimestamp(value)
+
+
+def _is_database(path: Path) -> bool:
+    """Whether ``path`` is missing, empty or starts with the SQLite header."""
+
+    try:
+        with open(path, "rb") as handle:
+            header = handle.read(len(_SQLITE_HEADER))
+    except FileNotFoundError:
+        return True
+    return not header or header == _SQLITE_HEADER
@@ -3,93 +3,733 @@
 from __future__ import annotations
 
 import json
+import logging
+import os
+import threading
+import time
+from itertools import islice
+from operator import attrgetter
 from pathlib import Path
-from typing import Dict, Iterable, List
+from sys import intern
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-from .data_models import MetricSnapshot, TrendRecord
+from .clustering import ClusterIndex, build_cluster_index
+from .config import TrackerConfig
+from .data_sources.streaming import chunked
+from .data_models import MetricSnapshot, SnapshotHistory, TrendRecord, load_histories, save_histories
+from .forecaster import HoltIndex
+from .history_codec import save_delta_histories
+from .instrumentation import Instrumentation, NullInstrumentation
+from .retention import RetentionPolicy, build_retention_policy
+from .tags import TagIndex
+
+
+logger = logging.getLogger(__name__)
+
+_COUNTERS = attrgetter("views", "likes", "comments", "shares")
+_MERGE_CHUNK = 1024  # records merged between two reads of the clock
 
 
 class TrendStore:
-    """Persist history to disk so the tracker can compute deltas over time."""
+    """Persist history to disk so the tracker can compute deltas over time.
+
+    With a ``retention`` policy, histories are rolled up as they grow and
+    records that have not been polled within the policy's TTL are dropped,
+    after being appended to ``archive_path`` as JSON lines when it is set.
+
+    After every ``update``, ``changed`` holds the keys whose record is new,
+    moved a counter, went back in time or had its history rewritten. The
+    other records only gained a flat snapshot, which lets ``MetricsCache``
+    reuse their previous metrics. ``evicted`` holds the keys its retention
+    sweep dropped, so schedulers and rankings can forget them too.
+
+    A ``tag_index`` and a ``holt_index`` (smoothed forecasting state) are
+    kept up to date with every merged and evicted record. Evicted records
+    are also discarded from a ``cluster_index``, which the tracker fills.
+    ``instrumentation`` times the ``merge`` and ``save`` stages; time spent
+    waiting for a streamed ``update`` argument to produce records is left
+    out of ``merge``.
+
+    Incoming records are merged into the stored ones in place: the stored
+    record's snapshot is appended to its history and its fields take the
+    new values. ``update`` returns the stored records, so records handed
+    out by earlier updates (and the metrics and results built on them)
+    keep changing with later polls; copy a record to keep it as it was.
+    Repeated strings (platform, author, language, country and tags) are
+    interned, and ``TrendRecord.extra`` keeps at most ``max_extra`` fields,
+    none by default, since nothing reads or persists them.
 
-    def __init__(self, path: str) -> None:
+    The state file is only read on first use, so opening a store is free for
+    runs that never touch it. A state file that fails to load raises on every
+    use, and the store is never saved over it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        history_format: str = "json",
+        retention: Optional[RetentionPolicy] = None,
+        archive_path: Optional[str] = None,
+        tag_index: Optional[TagIndex] = None,
+        holt_index: Optional[HoltIndex] = None,
+        max_extra: int = 0,
+        history_compression: bool = False,
+        instrumentation: Optional[Instrumentation] = None,
+        cluster_index: Optional[ClusterIndex] = None,
+    ) -> None:
+        if history_format not in ("json", "columnar", "delta"):
+            raise ValueError(f"Unsupported history format: {history_format}")
         self.path = Path(path)
+        self.history_format = history_format
+        self.history_compression = history_compression
+        self.retention = retention
+        self.archive_path = Path(archive_path) if archive_path else None
+        self.tag_index = tag_index
+        self.holt_index = holt_index
+        self.cluster_index = cluster_index
+        self.max_extra = max_extra
+        self.instrumentation = instrumentation or NullInstrumentation()
         self._cache: Dict[str, TrendRecord] = {}
-        if self.path.exists():
-            self._load()
+        self._last_seen: Dict[str, float] = {}
+        self._compacted: Dict[str, int] = {}
+        self.changed: Set[str] = set()
+        self.evicted: List[str] = []
+        self._next_sweep = 0.0
+        self._sequence = 0
+        self._generation = 0
+        self._history_file: Optional[str] = None
+        self._opened = False
+        self._opening = False
 
     def _key(self, record: TrendRecord) -> str:
         return f"{record.platform}:{record.external_id}"
 
+    def _ensure_open(self) -> None:
+        # ``_opening`` stops the recursion from ``_open`` merging a log replay.
+        if self._opened or self._opening:
+            return
+        self._opening = True
+        try:
+            self._open()
+        except BaseException:
+            # Forget whatever was read, so a failed load is retried on next use
+            # and never saved over the state file.
+            self._reset()
+            raise
+        finally:
+            self._opening = False
+        self._opened = True
+        if self.tag_index is not None or self.holt_index is not None:
+            records = self.records()
+            if self.tag_index is not None:
+                self.tag_index.rebuild((self._key(record), record) for record in records)
+            if self.holt_index is not None:
+                self.holt_index.rebuild((self._key(record), record) for record in records)
+
+    def _reset(self) -> None:
+        self._cache.clear()
+        self._last_seen.clear()
+        self._compacted.clear()
+        self._sequence = 0
+        self._generation = 0
+        self._history_file = None
+
+    def _open(self) -> None:
+        """Read the persisted state; called once, on first use."""
+
+        if self.path.exists():
+            self._load()
+
     def _load(self) -> None:
         raw = json.loads(self.path.read_text(encoding="utf-8"))
+        histories: Dict[str, SnapshotHistory] = {}
+        if isinstance(raw, dict):
+            # Written by ``LogStructuredTrendStore`` or with columnar history.
+            self._sequence = int(raw.get("sequence", 0))
+            self._generation = int(raw.get("generation", 0))
+            self._history_file = raw.get("history_file")
+            if self._history_file:
+                histories = load_histories(str(self.path.with_name(self._history_file)))
+            raw = raw.get("records", [])
+        loaded_at = time.time()
         for payload in raw:
+            last_seen = payload.pop("last_seen", None)
             record = TrendRecord.from_dict(payload, payload.get("platform", "unknown"))
-            self._cache[self._key(record)] = record
+            key = self._key(record)
+            if key in histories:
+                record.history = histories[key]
+            self._cache[key] = _adopt(record, self.max_extra)
+            # State written before retention existed counts as seen now.
+            self._last_seen[key] = loaded_at if last_seen is None else float(last_seen)
 
     def save(self) -> None:
-        serialized: List[Dict[str, object]] = []
-        for record in self._cache.values():
-            payload = {
-                "platform": record.platform,
-                "id": record.external_id,
-                "title": record.title,
-                "author": record.author,
-                "url": record.url,
-                "caption": record.caption,
-                "language": record.language,
-                "tags": record.tags,
-                "country": record.country,
-                "timestamp": record.timestamp.isoformat(),
-                "views": record.views,
-                "likes": record.likes,
-                "comments": record.comments,
-                "shares": record.shares,
-                "history": [
-                    {
-                        "timestamp": snap.timestamp.isoformat(),
-                        "views": snap.views,
-                        "likes": snap.likes,
-                        "comments": snap.comments,
-                        "shares": snap.shares,
-                    }
-                    for snap in record.history
-                ],
-            }
-            serialized.append(payload)
-        self.path.write_text(json.dumps(serialized, indent=2), encoding="utf-8")
+        self._ensure_open()
+        with self.instrumentation.timer("save"):
+            self._write_state(*self._snapshot_state())
+
+    def update(self, records: Iterable[TrendRecord], *, save: bool = True) -> List[TrendRecord]:
+        """Merge a poll and return the merged records.
+
+        The state file is rewritten unless ``save`` is false, in which case the
+        poll only reaches disk with the next ``save``.
+        """
+
+        merged = self._merge_all(records)
+        self.evicted = self.evict_expired()
+        if save:
+            self.save()
+        return merged
+
+    def evict_expired(self, now: Optional[float] = None, *, force: bool = False) -> List[str]:
+        """Drop records not polled within the retention TTL and return their keys.
+
+        The scan runs at most once per ``retention.sweep_interval`` unless
+        ``force`` is set.
+        """
+
+        policy = self.retention
+        if policy is None or policy.ttl is None:
+            return []
+        now = time.time() if now is None else now
+        if not force and now < self._next_sweep:
+            return []
+        self._ensure_open()
+        self._next_sweep = now + policy.sweep_interval
+        expired = [key for key, seen in self._last_seen.items() if policy.expired(seen, now)]
+        if expired:
+            self._evict(expired)
+        return expired
+
+    def records(self) -> List[TrendRecord]:
+        self._ensure_open()
+        return list(self._cache.values())
+
+    def load_histories(self, records: Iterable[TrendRecord]) -> None:
+        """Make sure records returned by ``update`` hold their whole history.
+
+        Stores that merge against a short history, like the SQLite store, read
+        the rest here; records of this store always hold all of it.
+        """
+
+    def count(self) -> int:
+        """Number of records held, without materializing them."""
+
+        self._ensure_open()
+        return len(self._cache)
+
+    def close(self) -> None:
+        """Release resources held by the store."""
+
+    def _snapshot_state(self) -> Tuple[List[Dict[str, object]], Optional[Dict[str, SnapshotHistory]]]:
+        """Serialize the cache, copying histories when they go to a separate file."""
+
+        self._ensure_open()
+        columnar = self.history_format != "json"
+        last_seen = self._persisted_last_seen()
+        payloads = [
+            _serialize_record(record, include_history=not columnar, last_seen=last_seen.get(key))
+            for key, record in self._cache.items()
+        ]
+        if not columnar:
+            return payloads, None
+        return payloads, {key: record.history.copy() for key, record in self._cache.items()}
+
+    def _write_state(
+        self,
+        payloads: List[Dict[str, object]],
+        histories: Optional[Dict[str, SnapshotHistory]],
+        *,
+        sequence: Optional[int] = None,
+    ) -> None:
+        """Atomically replace the state file.
+
+        Columnar and delta histories go to a new ``<path>.<generation>.hist``
+        archive that the state file points at, so the pair is switched by a
+        single rename.
+        """
+
+        if histories is None and sequence is None:
+            _write_atomic(self.path, json.dumps(payloads, indent=2))
+            self._discard_history_file(None)
+            return
+        document: Dict[str, object] = {"sequence": sequence or 0, "records": payloads}
+        history_file = None
+        if histories is not None:
+            self._generation += 1
+            history_file = f"{self.path.name}.{self._generation}.hist"
+            if self.history_format == "delta":
+                save_delta_histories(
+                    str(self.path.with_name(history_file)), histories, compress=self.history_compression
+                )
+            else:
+                save_histories(str(self.path.with_name(history_file)), histories)
+            document.update(generation=self._generation, history_file=history_file)
+        _write_atomic(self.path, json.dumps(document))
+        self._discard_history_file(history_file)
+
+    def _persisted_last_seen(self) -> Dict[str, float]:
+        # Poll times only matter for the TTL; without a policy the state stays as before.
+        return self._last_seen if self.retention is not None else {}
+
+    def _discard_history_file(self, current: Optional[str]) -> None:
+        previous, self._history_file = self._history_file, current
+        if previous and previous != current:
+            self.path.with_name(previous).unlink(missing_ok=True)
+
+    def _merge_all(self, records: Iterable[TrendRecord], seen_at: Optional[float] = None) -> List[TrendRecord]:
+        """Merge ``records`` into the cache and note the keys they changed."""
+
+        self._ensure_open()
+        merged: List[TrendRecord] = []
+        changed: Set[str] = set()
+        seen_at = time.time() if seen_at is None else seen_at
+        for chunk in self._timed(records, "merge"):
+            merged.extend(self._merge_chunk(chunk, seen_at, changed))
+        self.changed = changed
+        return merged
+
+    def _merge_chunk(
+        self,
+        records: List[TrendRecord],
+        seen_at: float,
+        changed: Set[str],
+        fresh: Optional[List[bool]] = None,
+    ) -> List[TrendRecord]:
+        """Merge one chunk into the cache, adding the keys it changed to ``changed``.
+
+        ``fresh`` collects whether each record was new to the store.
+        """
 
-    def update(self, records: Iterable[TrendRecord]) -> List[TrendRecord]:
         merged: List[TrendRecord] = []
         for record in records:
             key = self._key(record)
-            if key in self._cache:
-                stored = self._cache[key]
-                history = stored.history + [stored.current_snapshot()]
-                merged_record = TrendRecord(
-                    platform=record.platform,
-                    external_id=record.external_id,
-                    title=record.title or stored.title,
-                    author=record.author or stored.author,
-                    url=record.url or stored.url,
-                    caption=record.caption or stored.caption,
-                    language=record.language or stored.language,
-                    tags=record.tags or stored.tags,
-                    country=record.country or stored.country,
-                    timestamp=record.timestamp,
-                    views=record.views,
-                    likes=record.likes,
-                    comments=record.comments,
-                    shares=record.shares,
-                    history=history,
-                    extra=record.extra or stored.extra,
-                )
+            stored = self._cache.get(key)
+            if fresh is not None:
+                fresh.append(stored is None)
+            if stored is None:
+                merged_record = _adopt(record, self.max_extra)
+                changed.add(key)
             else:
-                merged_record = record
+                if _moved(stored, record):
+                    changed.add(key)
+                merged_record = _merge(stored, record, self.max_extra)
+            if self.retention is not None and self._retain(key, merged_record):
+                changed.add(key)
             self._cache[key] = merged_record
+            self._last_seen[key] = seen_at
+            if self.tag_index is not None:
+                self.tag_index.update(key, merged_record, now=seen_at)
+            if self.holt_index is not None:
+                self.holt_index.update(key, merged_record)
             merged.append(merged_record)
-        self.save()
         return merged
 
-    def records(self) -> List[TrendRecord]:
-        return list(self._cache.values())
+    def _timed(self, records: Iterable[TrendRecord], stage: str) -> Iterator[List[TrendRecord]]:
+        """Chunks of ``records``; the time the caller spends on them is recorded as ``stage``."""
+
+        spent = 0.0
+        for chunk in chunked(records, _MERGE_CHUNK):
+            started = time.perf_counter()
+            yield chunk
+            spent += time.perf_counter() - started
+        self.instrumentation.record_timing("stage_seconds", spent, stage=stage)
+
+    def _retain(self, key: str, record: TrendRecord) -> bool:
+        """Compact ``record``'s history when it has grown enough; return whether it did."""
+
+        length = len(record.history)
+        if not self.retention.needs_compaction(length, self._compacted.get(key, 0)):
+            return False
+        record.history = self.retention.compact(record.history, record.last_timestamp().timestamp())
+        self._compacted[key] = len(record.history)
+        return True
+
+    def _evict(self, keys: List[str]) -> None:
+        evicted = [self._cache.pop(key) for key in keys if key in self._cache]
+        for key in keys:
+            self._last_seen.pop(key, None)
+            self._compacted.pop(key, None)
+        if self.tag_index is not None:
+            self.tag_index.discard(keys)
+        if self.holt_index is not None:
+            self.holt_index.discard(keys)
+        if self.cluster_index is not None:
+            self.cluster_index.discard(keys)
+        if evicted and self.archive_path is not None:
+            with open(self.archive_path, "a", encoding="utf-8") as handle:
+                for record in evicted:
+                    handle.write(json.dumps(_serialize_record(record)) + "\n")
+        logger.info("Evicted %d records not seen within the retention TTL", len(evicted))
+
+
+class LogStructuredTrendStore(TrendStore):
+    """Store that appends each poll to a log instead of rewriting the state file.
+
+    The state is rebuilt on startup from the compacted base at ``path`` plus the
+    batches recorded in ``<path>.log``. A poll is logged as one batch per chunk
+    of records, and every batch is written as a single line carrying a sequence
+    number, so a torn write is detected and discarded on the next load. Compaction folds the log into a new base once the log grows past
+    ``compact_threshold`` bytes; the base records the last sequence it contains,
+    which keeps a crash between replacing the base and truncating the log from
+    replaying batches twice.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        history_format: str = "json",
+        retention: Optional[RetentionPolicy] = None,
+        archive_path: Optional[str] = None,
+        compact_threshold: int = 32 * 1024 * 1024,
+        background_compaction: bool = False,
+        tag_index: Optional[TagIndex] = None,
+        holt_index: Optional[HoltIndex] = None,
+        max_extra: int = 0,
+        history_compression: bool = False,
+        instrumentation: Optional[Instrumentation] = None,
+        cluster_index: Optional[ClusterIndex] = None,
+    ) -> None:
+        self.log_path = Path(f"{path}.log")
+        self.compact_threshold = compact_threshold
+        self.background_compaction = background_compaction
+        self._lock = threading.RLock()
+        # Held for a whole compaction, so two never write the base file at once.
+        self._compaction_lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        self._log_size = 0
+        super().__init__(
+            path,
+            history_format=history_format,
+            retention=retention,
+            archive_path=archive_path,
+            tag_index=tag_index,
+            holt_index=holt_index,
+            max_extra=max_extra,
+            history_compression=history_compression,
+            instrumentation=instrumentation,
+            cluster_index=cluster_index,
+        )
+
+    def save(self) -> None:
+        self.compact()
+
+    def update(self, records: Iterable[TrendRecord], *, save: bool = True) -> List[TrendRecord]:
+        # Appending to the log is cheap, so every poll is persisted whatever ``save`` says.
+        merged: List[TrendRecord] = []
+        changed: Set[str] = set()
+        merging = saving = 0.0
+        with self._lock:
+            self._ensure_open()
+        seen_at = time.time()
+        # A streamed poll is merged and logged a chunk at a time, never held whole;
+        # the lock is only taken around each chunk, not while waiting on the source.
+        for chunk in chunked(records, _MERGE_CHUNK):
+            with self._lock:
+                started = time.perf_counter()
+                fresh: List[bool] = []
+                batch = self._merge_chunk(chunk, seen_at, changed, fresh)
+                logged = time.perf_counter()
+                # Records seen for the first time keep the history they arrived with.
+                self._append_batch(batch, fresh)
+                saving += time.perf_counter() - logged
+                merging += logged - started
+            merged.extend(batch)
+        self.instrumentation.record_timing("stage_seconds", merging, stage="merge")
+        self.instrumentation.record_timing("stage_seconds", saving, stage="save")
+        with self._lock:
+            self.changed = changed
+            self.evicted = self.evict_expired()
+        if self._log_size >= self.compact_threshold:
+            if self.background_compaction:
+                self._start_background_compaction()
+            else:
+                self.compact()
+        return merged
+
+    def compact(self) -> None:
+        """Fold the log into a fresh base file.
+
+        Compactions never overlap: a ``save`` during a background compaction
+        waits for it and then folds whatever was logged since.
+        """
+
+        with self._compaction_lock, self.instrumentation.timer("compact"):
+            with self._lock:
+                self._ensure_open()
+                sequence = self._sequence
+                payloads, histories = self._snapshot_state()
+            self._write_state(payloads, histories, sequence=sequence)
+            with self._lock:
+                self._truncate_log(sequence)
+
+    def close(self) -> None:
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def _open(self) -> None:
+        super()._open()
+        if self.log_path.exists():
+            self._replay_log()
+
+    def _evict(self, keys: List[str]) -> None:
+        with self._lock:
+            super()._evict(keys)
+            self._append_line({"seq": self._sequence + 1, "evicted": keys})
+
+    def _append_batch(self, records: List[TrendRecord], fresh: List[bool]) -> None:
+        last_seen = self._persisted_last_seen()
+        self._append_line(
+            {
+                "seq": self._sequence + 1,
+                "records": [
+                    _serialize_record(
+                        record, include_history=is_fresh, last_seen=last_seen.get(self._key(record))
+                    )
+                    for record, is_fresh in zip(records, fresh)
+                ],
+            }
+        )
+
+    def _append_line(self, batch: Dict[str, object]) -> None:
+        self._sequence = int(batch["seq"])
+        line = (json.dumps(batch, separators=(",", ":")) + "\n").encode("utf-8")
+        with open(self.log_path, "ab") as handle:
+            handle.write(line)
+            handle.flush()
+            os.fsync(handle.fileno())
+        self._log_size += len(line)
+
+    def _replay_log(self) -> None:
+        valid_bytes = 0
+        with open(self.log_path, "rb") as handle:
+            for line in handle:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    batch = json.loads(line)
+                except ValueError:
+                    break
+                valid_bytes += len(line)
+                sequence = int(batch["seq"])
+                if sequence <= self._sequence:
+                    continue
+                for payload in batch.get("records", ()):
+                    seen_at = payload.pop("last_seen", None)
+                    self._merge_all(
+                        [TrendRecord.from_dict(payload, payload.get("platform", "unknown"))],
+                        seen_at,
+                    )
+                for key in batch.get("evicted", ()):
+                    self._cache.pop(key, None)
+                    self._last_seen.pop(key, None)
+                    self._compacted.pop(key, None)
+                self._sequence = sequence
+        if valid_bytes < self.log_path.stat().st_size:
+            logger.warning("Discarding torn batch at the end of %s", self.log_path)
+            with open(self.log_path, "r+b") as handle:
+                handle.truncate(valid_bytes)
+        self._log_size = valid_bytes
+
+    def _truncate_log(self, sequence: int) -> None:
+        if not self.log_path.exists():
+            self._log_size = 0
+            return
+        if sequence == self._sequence:
+            self.log_path.write_bytes(b"")
+            self._log_size = 0
+            return
+        # Batches appended while a background compaction was writing the base
+        # must survive the truncation.
+        retained: List[bytes] = []
+        with open(self.log_path, "rb") as handle:
+            for line in handle:
+                if int(json.loads(line)["seq"]) > sequence:
+                    retained.append(line)
+        payload = b"".join(retained)
+        _write_atomic(self.log_path, payload)
+        self._log_size = len(payload)
+
+    def _start_background_compaction(self) -> None:
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, name="trend-store-compactor", daemon=True)
+        self._compactor.start()
+
+
+def build_store(config: TrackerConfig, path: Optional[str] = None) -> TrendStore:
+    """Create the store backend selected in the configuration."""
+
+    path = path or config.storage_path
+    retention = build_retention_policy(config)
+    tag_index = TagIndex(half_life=config.tag_half_life) if config.tag_index else None
+    holt_index = build_holt_index(config)
+    cluster_index = build_cluster_index(config)
+    if config.storage_backend == "json":
+        return TrendStore(
+            path,
+            history_format=config.history_format,
+            retention=retention,
+            archive_path=config.archive_path,
+            tag_index=tag_index,
+            holt_index=holt_index,
+            cluster_index=cluster_index,
+            max_extra=config.max_extra_fields,
+            history_compression=config.history_compression,
+        )
+    if config.storage_backend == "log":
+        return LogStructuredTrendStore(
+            path,
+            history_format=config.history_format,
+            retention=retention,
+            archive_path=config.archive_path,
+            tag_index=tag_index,
+            holt_index=holt_index,
+            cluster_index=cluster_index,
+            max_extra=config.max_extra_fields,
+            history_compression=config.history_compression,
+        )
+    if config.storage_backend == "sqlite":
+        from .sqlite_storage import SQLiteTrendStore
+
+        return SQLiteTrendStore(
+            path,
+            retention=retention,
+            archive_path=config.archive_path,
+            tag_index=tag_index,
+            holt_index=holt_index,
+            cluster_index=cluster_index,
+            max_extra=config.max_extra_fields,
+        )
+    raise ValueError(f"Unsupported storage backend: {config.storage_backend}")
+
+
+def build_holt_index(config: TrackerConfig) -> Optional[HoltIndex]:
+    """Create the smoothing state the "holt" forecast model reads, if it is selected."""
+
+    if config.forecast_model == "linear":
+        return None
+    if config.forecast_model != "holt":
+        raise ValueError(f"Unsupported forecast model: {config.forecast_model}")
+    return HoltIndex(alpha=config.holt_alpha, beta=config.holt_beta, damping=config.holt_damping)
+
+
+def _moved(stored: TrendRecord, record: TrendRecord) -> bool:
+    """Whether ``record`` changes a counter of ``stored`` or is older than its newest snapshot."""
+
+    if _COUNTERS(record) != _COUNTERS(stored):
+        return True
+    try:
+        return record.timestamp < stored.last_timestamp()
+    except TypeError:  # naive against aware
+        return True
+
+
+def _merge(stored: TrendRecord, record: TrendRecord, max_extra: int = 0) -> TrendRecord:
+    """Fold ``record`` into ``stored`` in place and return ``stored``.
+
+    ``stored``'s current snapshot joins its history and its fields take
+    ``record``'s values, except where those are empty. ``record`` may be
+    ``stored`` itself, e.g. when a source answers 304 and hands back the
+    records it returned last time; like an identical copy would, that adds a
+    flat snapshot and leaves the fields alone.
+    """
+
+    stored.history.append(stored.current_snapshot())
+    if record is stored:
+        return stored
+    stored.title = record.title or stored.title
+    stored.author = _intern(record.author) or stored.author
+    stored.url = record.url or stored.url
+    stored.caption = record.caption or stored.caption
+    stored.language = _intern(record.language) or stored.language
+    if record.tags and record.tags != stored.tags:
+        stored.tags = [_intern(tag) for tag in record.tags]
+    stored.country = _intern(record.country) or stored.country
+    stored.timestamp = record.timestamp
+    stored.views = record.views
+    stored.likes = record.likes
+    stored.comments = record.comments
+    stored.shares = record.shares
+    if record.extra and max_extra:
+        stored.extra = _capped(record.extra, max_extra)
+    return stored
+
+
+def _adopt(record: TrendRecord, max_extra: int = 0) -> TrendRecord:
+    """Prepare a record the store sees for the first time: intern its repeated
+    strings and cap its ``extra`` fields."""
+
+    record.platform = _intern(record.platform)
+    record.author = _intern(record.author)
+    record.language = _intern(record.language)
+    record.country = _intern(record.country)
+    if record.tags:
+        record.tags = [_intern(tag) for tag in record.tags]
+    if len(record.extra) > max_extra:
+        if max_extra:
+            record.extra = _capped(record.extra, max_extra)
+        else:
+            record.extra.clear()
+    return record
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return intern(value) if type(value) is str else value
+
+
+def _capped(extra: Dict[str, object], limit: int) -> Dict[str, object]:
+    if len(extra) <= limit:
+        return extra
+    return dict(islice(extra.items(), limit))
+
+
+def _serialize_record(
+    record: TrendRecord, *, include_history: bool = True, last_seen: Optional[float] = None
+) -> Dict[str, object]:
+    payload: Dict[str, object] = {
+        "platform": record.platform,
+        "id": record.external_id,
+        "title": record.title,
+        "author": record.author,
+        "url": record.url,
+        "caption": record.caption,
+        "language": record.language,
+        "tags": record.tags,
+        "country": record.country,
+        "timestamp": record.timestamp.isoformat(),
+        "views": record.views,
+        "likes": record.likes,
+        "comments": record.comments,
+        "shares": record.shares,
+    }
+    if last_seen is not None:
+        payload["last_seen"] = last_seen
+    if include_history:
+        payload["history"] = [_serialize_snapshot(snap) for snap in record.history]
+    return payload
+
+
+def _serialize_snapshot(snap: MetricSnapshot) -> Dict[str, object]:
+    return {
+        "timestamp": snap.timestamp.isoformat(),
+        "views": snap.views,
+        "likes": snap.likes,
+        "comments": snap.comments,
+        "shares": snap.shares,
+    }
+
+
+def _write_atomic(path: Path, data: object) -> None:
+    """Write ``data`` to ``path`` so readers only ever see the old or new file."""
+
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    mode = "wb" if isinstance(data, bytes) else "w"
+    encoding = None if isinstance(data, bytes) else "utf-8"
+    with open(tmp_path, mode, encoding=encoding) as handle:
+        handle.write(data)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,90 @@
+"""Plain-data report summaries, cached next to the state for report-only runs.
+
+This module only depends on the standard library, so rendering a cached
+report does not import the tracker, the stores or any data source.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+SUMMARY_VERSION = 1
+
+Summary = Dict[str, Any]
+
+
+def summary_path(state_path: Union[str, Path]) -> Path:
+    """Where the summary of the state at ``state_path`` is cached."""
+
+    return Path(f"{state_path}.summary.json")
+
+
+def write_summary(path: Union[str, Path], summary: Summary) -> None:
+    """Atomically replace the cached summary at ``path``."""
+
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_text(json.dumps(summary), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def load_summary(path: Union[str, Path]) -> Summary:
+    summary = json.loads(Path(path).read_text(encoding="utf-8"))
+    if summary.get("version") != SUMMARY_VERSION:
+        raise ValueError(f"Unsupported summary version in {path}: {summary.get('version')}")
+    return summary
+
+
+def render_summary(summary: Summary) -> str:
+    """Format a summary built by ``TrendTracker.summarize`` as the text report."""
+
+    limit = summary["limit"]
+    lines = [
+        "Live Meme Trend Tracker",
+        "======================",
+        f"Generated at: {summary['generated_at']}Z",
+        "",
+        f"Top {limit} Memes by Virality Score:",
+        "",
+    ]
+    for meme in summary["memes"]:
+        lines.extend(
+            [
+                f"[{meme['platform']}] {meme['title'] or 'Untitled'}",
+                f"  Creator: {meme['author']} | Views: {meme['views']:,} | Engagement: {meme['engagement_rate']:.2%}",
+                f"  Velocity: {meme['velocity_per_hour']:,.0f} views/hr | Accel: {meme['acceleration_per_hour']:,.0f}",
+                f"  Virality Score: {meme['virality_score']:.2f} | "
+                f"Projected Views (+{meme['horizon_hours']}h): {meme['projected_views']:,.0f}",
+                f"  URL: {meme['url']}",
+                "",
+            ]
+        )
+    tags: List[Dict[str, Any]] = summary.get("tags", [])
+    if tags:
+        lines.extend(["Top Accelerating Hashtags:", ""])
+        for tag in tags:
+            lines.append(
+                f"  #{tag['tag']}: {tag['records']:,} clips | Views: {tag['views']:,} | "
+                f"Velocity: {tag['velocity_per_hour']:,.0f} views/hr | Accel: {tag['acceleration_per_hour']:,.0f}"
+            )
+        lines.append("")
+    clusters: List[Dict[str, Any]] = summary.get("clusters", [])
+    if clusters:
+        lines.extend([f"Top {len(clusters)} Clusters by Velocity:", ""])
+        for cluster in clusters:
+            lines.extend(
+                [
+                    f"[{', '.join(cluster['platforms'])}] {cluster['title'] or 'Untitled'} ({cluster['size']} clips)",
+                    f"  Views: {cluster['views']:,} | Velocity: {cluster['velocity_per_hour']:,.0f} views/hr",
+                    f"  Best Virality Score: {cluster['virality_score']:.2f} | "
+                    f"Projected Views: {cluster['projected_views']:,.0f}",
+                    "",
+                ]
+            )
+    return "\n".join(lines)
+
+
+__all__ = ["load_summary", "render_summary", "summary_path", "write_summary"]
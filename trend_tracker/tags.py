@@ -0,0 +1,235 @@
+"""Inverted hashtag index with running per-tag aggregates."""
+
+from __future__ import annotations
+
+import heapq
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .analyzer import segment_velocity
+from .data_models import TrendRecord
+
+
+# (platform, country); ``None`` stands for every platform or every country.
+Scope = Tuple[Optional[str], Optional[str]]
+# What a record adds to its tags: tags, platform, country, views, velocity.
+Contribution = Tuple[Tuple[str, ...], str, Optional[str], int, float]
+
+
+@dataclass(slots=True)
+class TagStats:
+    """Running totals of one tag within one scope.
+
+    ``growth`` is an exponentially weighted moving average of
+    ``velocity_per_hour`` over time, as of ``updated_at`` (epoch seconds).
+    """
+
+    tag: str
+    records: int = 0
+    views: int = 0
+    velocity_per_hour: float = 0.0
+    growth: float = 0.0
+    updated_at: float = 0.0
+
+
+@dataclass(slots=True)
+class TagTrend:
+    """A tag's aggregates read at one instant, as returned by queries."""
+
+    tag: str
+    records: int
+    views: int
+    velocity_per_hour: float
+    growth: float
+
+    @property
+    def acceleration_per_hour(self) -> float:
+        """How far current velocity is above its moving average."""
+
+        return self.velocity_per_hour - self.growth
+
+
+_ORDERINGS = {
+    "acceleration": lambda trend: trend.acceleration_per_hour,
+    "velocity": lambda trend: trend.velocity_per_hour,
+    "views": lambda trend: trend.views,
+    "records": lambda trend: trend.records,
+    "growth": lambda trend: trend.growth,
+}
+
+
+class TagIndex:
+    """Map tags to record keys and keep per-tag aggregates up to date.
+
+    ``update`` is called with every merged record and only touches the tags
+    of that record: its previous contribution (views and latest velocity) is
+    subtracted and the new one added, overall, per platform, per country and
+    per platform and country. Tags are lower-cased without a leading ``#``.
+
+    ``growth`` averages a tag's summed velocity with a time-based half-life,
+    treating velocity as constant between updates, so ``top(by="acceleration")``
+    lists the tags whose memes gain views faster than they used to.
+    """
+
+    def __init__(self, *, half_life: float = 3600.0) -> None:
+        self.half_life = half_life
+        self._postings: Dict[str, Set[str]] = {}
+        self._contributions: Dict[str, Contribution] = {}
+        self._scopes: Dict[Scope, Dict[str, TagStats]] = {}
+
+    def __len__(self) -> int:
+        return len(self._postings)
+
+    def update(self, key: str, record: TrendRecord, *, now: Optional[float] = None) -> None:
+        """Account for the latest state of ``record``, stored under ``key``."""
+
+        tags = _normalize(record.tags)
+        previous = self._contributions.get(key)
+        if not tags and previous is None:
+            return
+        contribution = (tags, record.platform, record.country, record.views, _latest_velocity(record))
+        if contribution == previous:
+            return
+        if tags:
+            self._contributions[key] = contribution
+        else:
+            del self._contributions[key]
+        self._apply(key, previous, contribution if tags else None, time.time() if now is None else now)
+
+    def rebuild(self, records: Iterable[Tuple[str, TrendRecord]], *, now: Optional[float] = None) -> None:
+        """Replace the index with ``(key, record)`` pairs, e.g. after loading a store.
+
+        Without earlier updates to average over, every tag's ``growth`` starts
+        at its current velocity.
+        """
+
+        self._postings.clear()
+        self._contributions.clear()
+        self._scopes.clear()
+        now = time.time() if now is None else now
+        for key, record in records:
+            self.update(key, record, now=now)
+        for table in self._scopes.values():
+            for stats in table.values():
+                stats.growth = stats.velocity_per_hour
+
+    def discard(self, keys: Iterable[str], *, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        for key in keys:
+            previous = self._contributions.pop(key, None)
+            if previous is not None:
+                self._apply(key, previous, None, now)
+
+    def keys(self, tag: str) -> Set[str]:
+        """Keys of the records carrying ``tag``."""
+
+        normalized = _normalize((tag,))
+        return set(self._postings.get(normalized[0], ())) if normalized else set()
+
+    def stats(
+        self, tag: str, *, platform: Optional[str] = None, country: Optional[str] = None, now: Optional[float] = None
+    ) -> Optional[TagTrend]:
+        normalized = _normalize((tag,))
+        stats = self._scopes.get((platform, country), {}).get(normalized[0]) if normalized else None
+        if stats is None:
+            return None
+        return self._read(stats, time.time() if now is None else now)
+
+    def top(
+        self,
+        limit: int = 10,
+        *,
+        platform: Optional[str] = None,
+        country: Optional[str] = None,
+        by: str = "acceleration",
+        now: Optional[float] = None,
+    ) -> List[TagTrend]:
+        """The ``limit`` best tags within a platform and/or country, by ``by``.
+
+        ``by`` is one of "acceleration", "velocity", "views", "records" or
+        "growth". The cost grows with the number of tags in the scope, not
+        with the number of records.
+        """
+
+        ordering = _ORDERINGS.get(by)
+        if ordering is None:
+            raise ValueError(f"Unsupported tag ordering: {by}")
+        now = time.time() if now is None else now
+        table = self._scopes.get((platform, country), {})
+        return heapq.nlargest(limit, (self._read(stats, now) for stats in table.values()), key=ordering)
+
+    def _apply(self, key: str, previous: Optional[Contribution], current: Optional[Contribution], now: float) -> None:
+        """Move ``key``'s share of every (scope, tag) cell from ``previous`` to ``current``.
+
+        Both sides are applied as one delta per cell, so a record whose views
+        change does not momentarily empty its tags and reset their averages.
+        """
+
+        deltas: Dict[Tuple[Scope, str], List[float]] = {}
+        for contribution, sign in ((previous, -1), (current, 1)):
+            if contribution is None:
+                continue
+            tags, platform, country, views, velocity = contribution
+            for tag in tags:
+                for scope in _scopes(platform, country):
+                    delta = deltas.setdefault((scope, tag), [0, 0, 0.0])
+                    delta[0] += sign
+                    delta[1] += sign * views
+                    delta[2] += sign * velocity
+        old_tags = set(previous[0]) if previous is not None else set()
+        new_tags = set(current[0]) if current is not None else set()
+        for tag in old_tags - new_tags:
+            postings = self._postings[tag]
+            postings.discard(key)
+            if not postings:
+                del self._postings[tag]
+        for tag in new_tags - old_tags:
+            self._postings.setdefault(tag, set()).add(key)
+        for (scope, tag), (records, views, velocity) in deltas.items():
+            table = self._scopes.setdefault(scope, {})
+            stats = table.get(tag)
+            if stats is None:
+                stats = table[tag] = TagStats(tag, updated_at=now)
+            stats.growth = self._decayed(stats, now)
+            stats.updated_at = max(stats.updated_at, now)
+            stats.records += records
+            if stats.records <= 0:
+                del table[tag]
+                continue
+            stats.views += views
+            stats.velocity_per_hour += velocity
+
+    def _decayed(self, stats: TagStats, now: float) -> float:
+        elapsed = now - stats.updated_at
+        if elapsed <= 0:
+            return stats.growth
+        weight = 0.5 ** (elapsed / self.half_life)
+        return stats.growth * weight + stats.velocity_per_hour * (1 - weight)
+
+    def _read(self, stats: TagStats, now: float) -> TagTrend:
+        return TagTrend(stats.tag, stats.records, stats.views, stats.velocity_per_hour, self._decayed(stats, now))
+
+
+def _scopes(platform: str, country: Optional[str]) -> Tuple[Scope, ...]:
+    if country is None:
+        return ((None, None), (platform, None))
+    return ((None, None), (platform, None), (None, country), (platform, country))
+
+
+def _normalize(tags: Iterable[str]) -> Tuple[str, ...]:
+    normalized = dict.fromkeys(tag.lstrip("#").lower() for tag in tags if tag)
+    normalized.pop("", None)
+    return tuple(normalized)
+
+
+def _latest_velocity(record: TrendRecord) -> float:
+    """Views per hour between the last history sample and the current snapshot."""
+
+    history = record.history
+    if not len(history):
+        return 0.0
+    return segment_velocity(history.timestamps[-1], record.timestamp.timestamp(), history.views[-1], record.views)
+
+
+__all__ = ["TagIndex", "TagStats", "TagTrend"]
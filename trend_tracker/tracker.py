@@ -2,28 +2,88 @@
 
 from __future__ import annotations
 
+import heapq
 import logging
-from dataclasses import dataclass
-from datetime import datetime
-from typing import List, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import chain
+from pathlib import Path
+from queue import Empty, Full, Queue
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
 
-from .analyzer import TrendMetrics, calculate_metrics
+from .analyzer import MetricsCache, TrendMetrics, compute_metrics
+from .clustering import ClusterIndex, ClusterSummary, build_cluster_index
 from .config import TrackerConfig, load_config
 from .data_models import TrendRecord
 from .data_sources import build_instagram_source, build_tiktok_source
 from .data_sources.base import TrendDataSource
-from .forecaster import TrendForecast, forecast
-from .storage import TrendStore
+from .data_sources.streaming import chunked
+from .forecaster import ForecastCache, ForecastIndex, TrendForecast
+from .instrumentation import HISTORY_BUCKETS, Instrumentation, build_instrumentation
+from .ranking import TopKRanking, rank_of
+from .sharding import ShardedAnalytics, build_sharded_analytics
+from .storage import TrendStore, build_store
+from .summary import SUMMARY_VERSION, Summary, render_summary, write_summary
 
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
+class SourceReport:
+    """Outcome of fetching from one data source during a poll."""
+
+    name: str
+    platform: str
+    records: int = 0
+    latency: float = 0.0
+    error: Optional[str] = None
+    timed_out: bool = False
+    payload_bytes: int = 0
+    normalize_seconds: float = 0.0
+
+
 @dataclass(slots=True)
 class TrackerResult:
+    """Outcome of a poll or refresh.
+
+    ``metrics`` follow the order of ``fetched``; ``ranked`` holds the best of
+    them by virality score, up to ``config.ranking_size``. ``forecasts``
+    follow ``metrics``, then cover any ranked meme a refresh did not fetch,
+    so every ranked meme has a forecast. With clustering
+    enabled, ``clusters`` groups the near-duplicates among every meme ranked
+    so far, fastest growing first. ``evicted`` lists the keys the store's
+    retention sweep dropped during this poll. Merged records may only carry
+    their newest samples; ``load_histories`` fills in the rest for readers
+    of the whole history.
+    """
+
     fetched: List[TrendRecord]
     metrics: List[TrendMetrics]
-    forecasts: List[TrendForecast]
+    forecasts: Sequence[TrendForecast]
+    sources: List[SourceReport] = field(default_factory=list)
+    ranked: List[TrendMetrics] = field(default_factory=list)
+    forecast_index: Optional[ForecastIndex] = None
+    clusters: List[ClusterSummary] = field(default_factory=list)
+    evicted: List[str] = field(default_factory=list)
+    load_histories: Optional[Callable[[Iterable[TrendRecord]], None]] = None
+
+    def __post_init__(self) -> None:
+        if self.forecast_index is None:
+            self.forecast_index = ForecastIndex(self.forecasts)
+
+    def top(self, limit: int = 10) -> List[TrendMetrics]:
+        return self.ranked[:limit]
+
+    def forecast_for(self, record: TrendRecord) -> Optional[TrendForecast]:
+        return self.forecast_index.get(f"{record.platform}:{record.external_id}")
+
+    def cluster_forecast(self, cluster: ClusterSummary) -> List[Tuple[int, float]]:
+        """Projected views of a cluster's memes summed per hour ahead."""
+
+        return cluster.projected_views(self.forecast_for)
 
 
 class TrendTracker:
@@ -35,61 +95,431 @@ class TrendTracker:
         *,
         tiktok_source: Optional[TrendDataSource] = None,
         instagram_source: Optional[TrendDataSource] = None,
+        sources: Optional[Sequence[TrendDataSource]] = None,
         storage: Optional[TrendStore] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        analytics: Optional[ShardedAnalytics] = None,
+        clusters: Optional[ClusterIndex] = None,
     ) -> None:
         self.config = config or load_config()
-        self.store = storage or TrendStore(self.config.storage_path)
-        self.tiktok_source = tiktok_source or build_tiktok_source(self.config.tiktok)
-        self.instagram_source = instagram_source or build_instagram_source(self.config.instagram)
+        self.store = storage or build_store(self.config)
+        self.instrumentation = instrumentation or build_instrumentation(self.config)
+        if not self.store.instrumentation.enabled:
+            # The store times its own merge and save stages.
+            self.store.instrumentation = self.instrumentation
+        self.ranking = TopKRanking(self.config.ranking_size)
+        self.forecast_cache = ForecastCache(self.config.forecast_cache_size)
+        self.metrics_cache = MetricsCache()
+        self._pool_leaders: Optional[Dict[Optional[str], List[int]]] = None
+        self.analytics = analytics or build_sharded_analytics(self.config)
+        if clusters is None:
+            clusters = getattr(self.store, "cluster_index", None)
+            if clusters is None:
+                clusters = build_cluster_index(self.config)
+        # The store discards the memes it evicts from the index.
+        self.store.cluster_index = clusters
+        self.clusters = clusters
+        if sources is not None:
+            self.sources = list(sources)
+        else:
+            self.tiktok_source = tiktok_source or build_tiktok_source(self.config.tiktok)
+            self.instagram_source = instagram_source or build_instagram_source(self.config.instagram)
+            self.sources = [self.tiktok_source, self.instagram_source]
 
     def run_once(self) -> TrackerResult:
         """Fetch latest data, compute analytics, and produce forecasts."""
 
-        logger.info("Fetching fresh data from TikTok and Instagram")
+        logger.info("Fetching fresh data from %d sources", len(self.sources))
+        reports = [
+            SourceReport(name=source.name or source.platform, platform=source.platform) for source in self.sources
+        ]
+        received = [(source.bytes_received, source.normalize_seconds) for source in self.sources]
+        with self.instrumentation.profiling():
+            # Fetching, normalizing and merging overlap, so "ingest" is their
+            # wall-clock time; the store and the sources time their own parts.
+            with self.instrumentation.timer("ingest"):
+                merged_records = self.store.update(self._ingest(reports))
+            for report, source, (bytes_before, seconds_before) in zip(reports, self.sources, received):
+                report.payload_bytes = source.bytes_received - bytes_before
+                report.normalize_seconds = source.normalize_seconds - seconds_before
+            logger.debug("Fetched %d records", len(merged_records))
+            return self._analyze(merged_records, reports, full=True)
+
+    def close(self) -> None:
+        """Stop the analytics worker processes and close the store."""
+
+        try:
+            if self.analytics is not None:
+                self.analytics.close()
+        finally:
+            self.store.close()
+
+    @property
+    def supports_refresh(self) -> bool:
+        """Whether any source can re-fetch individual records."""
+
+        return any(source.supports_item_refresh for source in self.sources)
+
+    def refresh(self, keys: Iterable[str]) -> TrackerResult:
+        """Re-fetch only the given ``platform:external_id`` keys.
+
+        Each platform's ids go to the first source of that platform that
+        supports item refreshes; keys no source can serve are skipped. The
+        store is not saved, so the JSON store is not rewritten on every
+        refresh; refreshed snapshots reach disk with the next full poll or
+        ``save``. The log and SQLite stores persist them right away.
+        """
+
+        wanted: Dict[str, List[str]] = {}
+        for key in keys:
+            platform, _, external_id = key.partition(":")
+            wanted.setdefault(platform, []).append(external_id)
         fetched: List[TrendRecord] = []
-        for source in (self.tiktok_source, self.instagram_source):
+        reports: List[SourceReport] = []
+        for platform, external_ids in wanted.items():
+            source = next(
+                (item for item in self.sources if item.platform == platform and item.supports_item_refresh), None
+            )
+            if source is None:
+                continue
+            report = SourceReport(name=source.name or source.platform, platform=platform)
+            started = time.monotonic()
+            received = source.bytes_received
+            normalized = source.normalize_seconds
             try:
-                fetched.extend(source.fetch_latest())
+                with self.instrumentation.timer("refresh_fetch"):
+                    records = source.fetch_items(external_ids)
             except Exception as exc:  # pragma: no cover - defensive logging
-                logger.exception("Failed to fetch data from %s", source.platform)
-        logger.debug("Fetched %d records", len(fetched))
-
-        merged_records = self.store.update(fetched)
-        metrics = calculate_metrics(merged_records)
-        forecasts = forecast([metric.record for metric in metrics])
-        metrics.sort(key=lambda m: m.virality_score, reverse=True)
-        return TrackerResult(fetched=merged_records, metrics=metrics, forecasts=forecasts)
-
-    def render_report(self, result: TrackerResult, *, limit: int = 10) -> str:
-        """Format the results in a human-readable table."""
-
-        lines = [
-            "Live Meme Trend Tracker",
-            "======================",
-            f"Generated at: {datetime.utcnow().isoformat()}Z",
-            "",
-            f"Top {limit} Memes by Virality Score:",
-            "",
-        ]
-        for metric in result.metrics[:limit]:
-            record = metric.record
-            forecast_entry = next((f for f in result.forecasts if f.record == record), None)
-            future_views = (
-                forecast_entry.projected_views[-1][1]
-                if forecast_entry and forecast_entry.projected_views
-                else record.views
+                report.error = f"{type(exc).__name__}: {exc}"
+                logger.exception("Failed to refresh records from %s", report.name)
+            else:
+                report.records = len(records)
+                fetched.extend(records)
+            report.latency = time.monotonic() - started
+            report.payload_bytes = source.bytes_received - received
+            report.normalize_seconds = source.normalize_seconds - normalized
+            reports.append(report)
+        with self.instrumentation.timer("refresh_merge"):
+            merged_records = self.store.update(fetched, save=False)
+        return self._analyze(merged_records, reports, full=False)
+
+    def _analyze(
+        self, merged_records: List[TrendRecord], reports: List[SourceReport], *, full: bool
+    ) -> TrackerResult:
+        """Score and forecast ``merged_records``.
+
+        A full poll replaces the ranking; a refresh only re-scores the memes
+        it fetched, so ``ranked`` still covers everything seen in the last poll.
+        Memes the store did not mark as changed reuse their previous metrics.
+        When the analytics pool scored a full poll, its shard rankings seed
+        the boards instead of offering every meme to them.
+        """
+
+        instrumentation = self.instrumentation
+        self._pool_leaders = None
+        evicted = list(self.store.evicted)
+        with instrumentation.timer("metrics"):
+            metrics = self.metrics_cache.compute(
+                merged_records,
+                self.store.changed,
+                as_of=datetime.now(timezone.utc),
+                full=full,
+                score=self._score,
             )
-            lines.extend(
-                [
-                    f"[{record.platform}] {record.title or 'Untitled'}",
-                    f"  Creator: {record.author} | Views: {record.views:,} | Engagement: {metric.engagement_rate:.2%}",
-                    f"  Velocity: {metric.velocity_per_hour:,.0f} views/hr | Accel: {metric.acceleration_per_hour:,.0f}",
-                    f"  Virality Score: {metric.virality_score:.2f} | Projected Views (+{forecast_entry.horizon_hours}h): {future_views:,.0f}",
-                    f"  URL: {record.url}",
-                    "",
-                ]
+        with instrumentation.timer("rank"):
+            if full and self._pool_leaders is not None:
+                self.ranking.load(metrics, self._leaders(metrics, self._pool_leaders))
+            elif full:
+                self.ranking.reset(metrics)
+            else:
+                self.ranking.update(metrics)
+            self.ranking.discard(evicted)
+        clusters: List[ClusterSummary] = []
+        if self.clusters is not None:
+            with instrumentation.timer("cluster"):
+                self.clusters.update(merged_records)
+                clusters = self.clusters.summarize(self.ranking.metrics())
+        ranked = self.ranking.top()
+        # Ranked memes outlive this poll and get forecast later, so they keep their whole history.
+        self.store.load_histories([metric.record for metric in ranked])
+        records = [metric.record for metric in metrics]
+        if not full:
+            # ``ranked`` keeps memes this refresh did not fetch; they need forecasts too.
+            fetched = {id(record) for record in records}
+            records.extend(metric.record for metric in ranked if id(metric.record) not in fetched)
+        # Forecasts are computed on access, so only reported memes pay for them.
+        holt_index = getattr(self.store, "holt_index", None)
+        forecasts: Sequence[TrendForecast]
+        if holt_index is not None:
+            forecasts = holt_index.lazy(records)
+        else:
+            forecasts = self.forecast_cache.lazy(
+                records, resolution=self.config.forecast_resolution, prepare=self.store.load_histories
             )
-        return "\n".join(lines)
+        if instrumentation.enabled:
+            self._record_poll(merged_records, reports, full=full)
+        return TrackerResult(
+            fetched=merged_records,
+            metrics=metrics,
+            forecasts=forecasts,
+            sources=reports,
+            ranked=ranked,
+            clusters=clusters,
+            evicted=evicted,
+            load_histories=self.store.load_histories,
+        )
 
+    def _score(self, records: List[TrendRecord], *, as_of: datetime) -> List[TrendMetrics]:
+        """Score records, in shards across the analytics pool when one is configured."""
+
+        analytics = self.analytics
+        if analytics is not None:
+            outcome = analytics.analyze(records, as_of=as_of)
+            self._pool_leaders = outcome.leaders
+            return outcome.metrics.to_metrics()
+        return compute_metrics(records, as_of=as_of)
+
+    def _leaders(
+        self, metrics: List[TrendMetrics], scored_leaders: Dict[Optional[str], List[int]]
+    ) -> Dict[Optional[str], List[int]]:
+        """Leader positions in ``metrics`` for ``TopKRanking.load``.
+
+        The pool only ranked the memes the metrics cache re-scored, so its
+        positions are mapped back into ``metrics`` and joined by the best
+        cached memes of each scope.
+        """
+
+        scored = self.metrics_cache.scored
+        leaders = {scope: [scored[position] for position in positions] for scope, positions in scored_leaders.items()}
+        if len(scored) == len(metrics):
+            return leaders
+        flags = bytearray(len(metrics))
+        for position in scored:
+            flags[position] = 1
+        by_platform: Dict[str, List[int]] = {}
+        for position, metric in enumerate(metrics):
+            if not flags[position]:
+                by_platform.setdefault(metric.record.platform, []).append(position)
+        capacity = self.ranking.capacity
+
+        def best(positions: Iterable[int]) -> List[int]:
+            return heapq.nlargest(capacity, positions, key=lambda position: rank_of(metrics[position]))
+
+        for platform, positions in by_platform.items():
+            leaders.setdefault(platform, []).extend(best(positions))
+        leaders.setdefault(None, []).extend(best(chain.from_iterable(by_platform.values())))
+        return leaders
+
+    def _record_poll(self, merged_records: List[TrendRecord], reports: List[SourceReport], *, full: bool) -> None:
+        instrumentation = self.instrumentation
+        instrumentation.increment("polls_total" if full else "refreshes_total")
+        instrumentation.increment("records_processed_total", len(merged_records))
+        for report in reports:
+            failed = report.error is not None and not report.timed_out
+            instrumentation.record_timing("source_fetch_seconds", report.latency, source=report.name)
+            instrumentation.record_timing(
+                "stage_seconds", report.normalize_seconds, stage="normalize", source=report.name
+            )
+            instrumentation.increment("source_records_total", report.records, source=report.name)
+            instrumentation.increment("source_payload_bytes_total", report.payload_bytes, source=report.name)
+            instrumentation.increment("source_errors_total", int(failed), source=report.name)
+            instrumentation.increment("source_timeouts_total", int(report.timed_out), source=report.name)
+        instrumentation.observe("history_length", (len(record.history) for record in merged_records), HISTORY_BUCKETS)
+        instrumentation.set_gauge("store_records", self.store.count())
+        self._record_cache()
+
+    def _record_cache(self) -> None:
+        cache = self.forecast_cache
+        self.instrumentation.set_gauge("forecast_cache_hits", cache.hits)
+        self.instrumentation.set_gauge("forecast_cache_misses", cache.misses)
+        self.instrumentation.set_gauge("forecast_cache_entries", len(cache))
+        self.instrumentation.set_gauge("metrics_cache_hits", self.metrics_cache.hits)
+        self.instrumentation.set_gauge("metrics_cache_misses", self.metrics_cache.misses)
+
+    def _ingest(self, reports: List[SourceReport]) -> Iterator[TrendRecord]:
+        """Stream records from every source concurrently into the caller.
+
+        Workers iterate ``source.iter_latest()`` and hand over chunks of
+        ``config.ingest_chunk_size`` records through a bounded queue, so the
+        store consumes records while they are still being downloaded and no
+        source is ever held in memory as a whole. Each source's deadline
+        starts when a worker picks it up and defaults to
+        ``config.fetch_timeout`` unless the source sets ``timeout``. A source
+        that misses it keeps the chunks already delivered and is reported as
+        timed out; its worker is abandoned rather than waited for.
+        """
+
+        chunks: Queue = Queue(maxsize=max(2 * self.config.fetch_workers, 2))
+        started: Dict[int, float] = {}
+        cancelled: Set[int] = set()
+
+        def offer(index: int, item: Tuple[int, Optional[List[TrendRecord]], Optional[BaseException]]) -> bool:
+            while index not in cancelled:
+                try:
+                    chunks.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    continue
+            return False
+
+        def produce(index: int) -> None:
+            started[index] = time.monotonic()
+            try:
+                for chunk in chunked(self.sources[index].iter_latest(), self.config.ingest_chunk_size):
+                    if not offer(index, (index, chunk, None)):
+                        return
+            except Exception as exc:
+                offer(index, (index, None, exc))
+            else:
+                offer(index, (index, None, None))
+
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, min(self.config.fetch_workers, len(self.sources) or 1)),
+            thread_name_prefix="trend-fetch",
+        )
+        for index in range(len(self.sources)):
+            executor.submit(produce, index)
+        active = set(range(len(self.sources)))
+        try:
+            while active:
+                now = time.monotonic()
+                deadlines = {
+                    index: started[index] + self._source_timeout(self.sources[index])
+                    for index in active
+                    if index in started
+                }
+                for index, deadline in deadlines.items():
+                    if deadline <= now:
+                        active.discard(index)
+                        cancelled.add(index)
+                        report = reports[index]
+                        report.timed_out = True
+                        report.error = "timed out"
+                        report.latency = now - started[index]
+                        logger.warning("Timed out fetching data from %s after %d records", report.name, report.records)
+                if not active:
+                    break
+                timeout = min((deadline - now for deadline in deadlines.values() if deadline > now), default=0.05)
+                try:
+                    index, chunk, error = chunks.get(timeout=timeout)
+                except Empty:
+                    continue
+                if index not in active:
+                    continue
+                report = reports[index]
+                if chunk is not None:
+                    report.records += len(chunk)
+                    yield from chunk
+                    continue
+                active.discard(index)
+                report.latency = time.monotonic() - started[index]
+                if error is not None:
+                    report.error = f"{type(error).__name__}: {error}"
+                    logger.error("Failed to fetch data from %s", report.name, exc_info=error)
+        finally:
+            cancelled.update(range(len(self.sources)))
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _source_timeout(self, source: TrendDataSource) -> float:
+        return getattr(source, "timeout", None) or self.config.fetch_timeout
+
+    def render_report(
+        self, result: TrackerResult, *, limit: int = 10, summary_path: Optional[Union[str, Path]] = None
+    ) -> str:
+        """Format the results in a human-readable table.
+
+        With ``summary_path``, the summary behind the report is also cached
+        there, for ``render_summary(load_summary(path))`` to print it again
+        without loading the tracker.
+        """
+
+        summary = self.summarize(result, limit=limit)
+        with self.instrumentation.timer("report"):
+            report = render_summary(summary)
+        if summary_path is not None:
+            write_summary(summary_path, summary)
+        if self.instrumentation.enabled:
+            # Forecasts are computed while rendering, so refresh the cache figures.
+            self._record_cache()
+        return report
+
+    def summarize(self, result: TrackerResult, *, limit: int = 10) -> Summary:
+        """Plain data behind the report: the top memes, hashtags and clusters.
+
+        Only ``config.ranking_size`` memes are ranked, so a larger ``limit``
+        raises ``ValueError`` rather than returning a short report.
+        """
+
+        if limit > self.ranking.capacity:
+            raise ValueError(f"limit {limit} exceeds the ranking size {self.ranking.capacity}")
+        instrumentation = self.instrumentation
+        top = result.top(limit)
+        ranked_clusters = result.clusters[:limit]
+        with instrumentation.timer("forecast"):
+            # Forecasts are lazy, so this is where the reported ones are computed.
+            forecasts = [result.forecast_for(metric.record) for metric in top]
+            projections = [result.cluster_forecast(cluster) for cluster in ranked_clusters]
+        with instrumentation.timer("summarize"):
+            memes = []
+            for metric, forecast_entry in zip(top, forecasts):
+                record = metric.record
+                future_views = (
+                    forecast_entry.projected_views[-1][1]
+                    if forecast_entry and forecast_entry.projected_views
+                    else record.views
+                )
+                memes.append(
+                    {
+                        "platform": record.platform,
+                        "title": record.title,
+                        "author": record.author,
+                        "url": record.url,
+                        "views": record.views,
+                        "engagement_rate": metric.engagement_rate,
+                        "velocity_per_hour": metric.velocity_per_hour,
+                        "acceleration_per_hour": metric.acceleration_per_hour,
+                        "virality_score": metric.virality_score,
+                        "horizon_hours": (
+                            forecast_entry.horizon_hours
+                            if forecast_entry
+                            else getattr(result.forecasts, "horizon_hours", 6)
+                        ),
+                        "projected_views": future_views,
+                    }
+                )
+            tags = []
+            tag_index = getattr(self.store, "tag_index", None)
+            if tag_index is not None and len(tag_index):
+                tags = [
+                    {
+                        "tag": trend.tag,
+                        "records": trend.records,
+                        "views": trend.views,
+                        "velocity_per_hour": trend.velocity_per_hour,
+                        "acceleration_per_hour": trend.acceleration_per_hour,
+                    }
+                    for trend in tag_index.top(limit)
+                ]
+            clusters = []
+            for cluster, projected in zip(ranked_clusters, projections):
+                clusters.append(
+                    {
+                        "title": cluster.members[0].record.title,
+                        "platforms": cluster.platforms,
+                        "size": len(cluster),
+                        "views": cluster.views,
+                        "velocity_per_hour": cluster.velocity_per_hour,
+                        "virality_score": cluster.virality_score,
+                        "projected_views": projected[-1][1] if projected else cluster.views,
+                    }
+                )
+        return {
+            "version": SUMMARY_VERSION,
+            "generated_at": datetime.utcnow().isoformat(),
+            "limit": limit,
+            "memes": memes,
+            "tags": tags,
+            "clusters": clusters,
+        }
 
-__all__ = ["TrendTracker", "TrackerResult"]
+__all__ = ["TrendTracker", "TrackerResult", "SourceReport"]